@@ -1,22 +1,46 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, send_file
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash, send_file, send_from_directory, make_response, Response, stream_with_context, g
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
 from functools import wraps
 from datetime import datetime, timedelta
 import os
 import json
+import hashlib
+import base64
 import threading
 import io
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.units import inch
-from dotenv import load_dotenv
 import time
 
-# Import table generation utilities
-from table_generator import TableDetector, HTMLTableGenerator
-import markdown
+
+def load_environment():
+    """Load .env before any module reads its settings (python-dotenv is optional)"""
+    if os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')) \
+            or os.path.exists('.env'):
+        from dotenv import load_dotenv
+        load_dotenv()
+
+
+# Load environment variables
+load_environment()
+
+# Heavy, rarely used dependencies (reportlab, python-docx, markdown, the
+# OpenAI SDK, table_generator) are imported inside the functions that need
+# them, so web and worker processes start without paying for them
+from scheduler import QueryScheduler, PRIORITIES, DEFAULT_PRIORITY, run_cancellable
+from llm_resilience import ResilientCaller
+from job_queue import LeaseKeeper, LEASE_SECONDS, MAX_JOB_ATTEMPTS, WORKER_ID, owner_alive
+from prompt_builder import PromptSection, build_prompt
+from model_router import ModelRouter
+from semantic_cache import SemanticCache, numbers_match
+import knowledge_io
+from document_ingest import ExtractionPool, document_kind, SUPPORTED_EXTENSIONS
+from company_search import CompanySearchIndex
+import query_search
+from ttl_cache import TTLCache
+from password_security import HashingExecutor, HashingBusyError, LoginThrottle, needs_rehash
+from static_assets import AssetManifest, IMMUTABLE_MAX_AGE
+import compression
+import click
 
 # Markdown to HTML converter
 def markdown_to_html(text):
@@ -24,6 +48,7 @@ def markdown_to_html(text):
     if not text:
         return ""
     
+    import markdown
     html = markdown.markdown(
         text,
         extensions=['tables', 'fenced_code', 'nl2br']
@@ -32,18 +57,41 @@ def markdown_to_html(text):
 
 # Register as Jinja filter
 
-# Load environment variables
-load_dotenv()
-
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///research_agent.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///research_agent.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
+app.config['MAX_BATCH_SIZE'] = int(os.getenv('MAX_BATCH_SIZE', 200))
+app.config['KNOWLEDGE_IMPORT_BATCH_SIZE'] = int(os.getenv('KNOWLEDGE_IMPORT_BATCH_SIZE', 500))
+app.config['MAX_DOCUMENT_UPLOAD_MB'] = int(os.getenv('MAX_DOCUMENT_UPLOAD_MB', 50))
+# Whole request body; larger requests get 413 before anything is parsed or saved
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_REQUEST_MB', 200)) * 1024 * 1024
+app.config['USER_CACHE_TTL'] = int(os.getenv('USER_CACHE_TTL', 30))
+
+# 'inline': web processes execute queries themselves.
+# 'worker': web processes only enqueue; worker.py processes execute.
+app.config['QUERY_EXECUTION'] = os.getenv('QUERY_EXECUTION', 'inline')
+
+# gzip/brotli for text responses (see compression.py); PDF/DOCX pass through
+app.config['COMPRESSION_ENABLED'] = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+app.config['COMPRESS_MIN_SIZE'] = compression.COMPRESS_MIN_SIZE
+app.config['COMPRESS_LEVEL'] = compression.COMPRESS_LEVEL
+app.config['BROTLI_QUALITY'] = compression.BROTLI_QUALITY
 
 db = SQLAlchemy(app)
+
+# Password hashing runs on a bounded pool so a login storm cannot take
+# every CPU from query handling; failed logins are throttled per IP/username
+password_hasher = HashingExecutor()
+login_throttle = LoginThrottle()
 app.jinja_env.filters['markdown'] = markdown_to_html
+
+# Templates link CSS/JS through asset_url(), which puts a content hash in the
+# file name so the files can be cached as immutable (see serve_asset)
+assets = AssetManifest(app.static_folder)
+app.jinja_env.globals['asset_url'] = assets.url
 # ============================================================
 # DATABASE MODELS
 # ============================================================
@@ -57,10 +105,14 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = password_hasher.hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return password_hasher.check_password(self.password, password)
+    
+    def password_needs_rehash(self):
+        """True if the stored hash predates the current hashing policy"""
+        return needs_rehash(self.password)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -85,10 +137,387 @@ class Query(db.Model):
     comparison_confidence = db.Column(db.Float, default=0.0)
     table_html = db.Column(db.Text)  # Store generated HTML table
     
+    # Size of the assembled prompt (system instruction + question)
+    prompt_tokens = db.Column(db.Integer, nullable=True)
+    
+    # Set when the answer was reused from a near-duplicate query
+    cached_from_id = db.Column(db.Integer, db.ForeignKey('query.id'), nullable=True)
+    
+    # Route chosen by model_router (route name and model id)
+    model_route = db.Column(db.String(50), nullable=True)
+    model_name = db.Column(db.String(100), nullable=True)
+    
+    # Scheduling: priority level name from scheduler.PRIORITIES
+    priority = db.Column(db.String(20), default=DEFAULT_PRIORITY)
+    
+    # Batch submission (NULL for queries submitted one at a time)
+    batch_id = db.Column(db.Integer, db.ForeignKey('query_batch.id'), nullable=True, index=True)
+    
     user = db.relationship('User', backref=db.backref('queries', lazy='dynamic'))
     
+    # History listings (/history, /api/queries) walk a user's queries newest first.
+    # The filter columns ride along in the index so filtering never touches the
+    # table; only the rows on the returned page are read from it.
+    __table_args__ = (
+        db.Index('ix_query_user_history', 'user_id', 'created_at', 'id',
+                 'status', 'task_type', 'is_comparison_query'),
+        db.Index('ix_query_user_status', 'user_id', 'status', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Query {self.id}>'
+    
+    def copy_answer_from(self, source):
+        """Complete this query with the answer of an earlier near-duplicate"""
+        self.status = 'completed'
+        self.response = source.response
+        self.reasoning = source.reasoning
+        self.table_html = source.table_html
+        self.execution_time = 0.0
+        self.tools_used = 'semantic-cache'
+        self.cached_from_id = source.id
+
+
+class QueryBatch(db.Model):
+    """A group of queries submitted together through the batch API"""
+    __tablename__ = 'query_batch'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String(200), nullable=True)
+    total_queries = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    user = db.relationship('User', backref=db.backref('batches', lazy='dynamic'))
+    queries = db.relationship('Query', backref='batch', lazy='dynamic')
+    
+    def __repr__(self):
+        return f'<QueryBatch {self.id}>'
+    
+    def get_progress(self):
+        """Return aggregate status counts for the batch"""
+        counts = dict(db.session.query(
+            Query.status,
+            db.func.count(Query.id)
+        ).filter(Query.batch_id == self.id).group_by(Query.status).all())
+        
+        completed = counts.get('completed', 0)
+        failed = counts.get('failed', 0)
+        finished = completed + failed + counts.get('cancelled', 0)
+        total = self.total_queries or sum(counts.values())
+        
+        return {
+            'batch_id': self.id,
+            'total': total,
+            'completed': completed,
+            'failed': failed,
+            'processing': counts.get('processing', 0),
+            'cancelled': counts.get('cancelled', 0),
+            'percent_complete': int((finished / total) * 100) if total else 100,
+            'done': finished >= total
+        }
+
+
+class QueryJob(db.Model):
+    """Durable queue entry for a query awaiting or undergoing execution.
+    
+    Workers claim a job by taking a time-limited lease and keep it alive with
+    heartbeats. Jobs whose lease expires (crashed worker, restart) are
+    reclaimed and resumed, or failed after MAX_JOB_ATTEMPTS.
+    """
+    __tablename__ = 'query_job'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    query_id = db.Column(db.Integer, db.ForeignKey('query.id'), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    role = db.Column(db.String(20), default='user')
+    priority = db.Column(db.String(20), default=DEFAULT_PRIORITY)
+    
+    # queued -> running -> done | failed | cancelled
+    status = db.Column(db.String(20), default='queued', index=True)
+    attempts = db.Column(db.Integer, default=0)
+    lease_owner = db.Column(db.String(120), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True, index=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    target = db.relationship('Query', backref=db.backref('job', uselist=False, cascade='all, delete-orphan'))
+    
+    def __repr__(self):
+        return f'<QueryJob {self.id} query={self.query_id} {self.status}>'
+    
+    @staticmethod
+    def enqueue(query, role='user'):
+        """Add a job for a query to the current session (caller commits)"""
+        job = QueryJob(
+            target=query,
+            user_id=query.user_id,
+            role=role,
+            priority=query.priority or DEFAULT_PRIORITY,
+            status='queued'
+        )
+        db.session.add(job)
+        return job
+    
+    @staticmethod
+    def claim(query_id, owner=WORKER_ID):
+        """Atomically take the lease on a queued (or abandoned) job"""
+        now = datetime.utcnow()
+        claimed = QueryJob.query.filter(
+            QueryJob.query_id == query_id,
+            (QueryJob.status == 'queued') |
+            ((QueryJob.status == 'running') & (QueryJob.lease_expires_at < now))
+        ).update({
+            'status': 'running',
+            'lease_owner': owner,
+            'lease_expires_at': now + timedelta(seconds=LEASE_SECONDS),
+            'heartbeat_at': now,
+            'attempts': QueryJob.attempts + 1,
+            'updated_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+        return claimed == 1
+    
+    @staticmethod
+    def heartbeat(owner=WORKER_ID):
+        """Extend every lease held by this worker"""
+        now = datetime.utcnow()
+        renewed = QueryJob.query.filter_by(status='running', lease_owner=owner).update({
+            'lease_expires_at': now + timedelta(seconds=LEASE_SECONDS),
+            'heartbeat_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+        return renewed
+    
+    @staticmethod
+    def finish(query_id, status, error=None):
+        """Record the final state of a job and release its lease"""
+        QueryJob.query.filter(
+            QueryJob.query_id == query_id,
+            QueryJob.status.in_(['queued', 'running'])
+        ).update({
+            'status': status,
+            'last_error': error,
+            'lease_owner': None,
+            'lease_expires_at': None,
+            'updated_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+    
+    @staticmethod
+    def next_queued(limit, exclude_ids=()):
+        """Oldest queued jobs, highest priority first (claiming happens in run_query_job)"""
+        priority_order = db.case(
+            {name: level for name, level in PRIORITIES.items()},
+            value=QueryJob.priority,
+            else_=PRIORITIES['normal']
+        )
+        query = QueryJob.query.filter(QueryJob.status == 'queued')
+        if exclude_ids:
+            query = query.filter(QueryJob.query_id.notin_(list(exclude_ids)))
+        return query.order_by(priority_order, QueryJob.id).limit(limit).all()
+    
+    @staticmethod
+    def reclaim_expired():
+        """
+        Requeue jobs whose lease expired, or fail them once they have used up
+        MAX_JOB_ATTEMPTS.
+        
+        Returns:
+            List of requeued jobs
+        """
+        now = datetime.utcnow()
+        expired = QueryJob.query.filter(
+            QueryJob.status == 'running',
+            QueryJob.lease_expires_at < now
+        ).all()
+        
+        requeued = []
+        for job in expired:
+            exhausted = (job.attempts or 0) >= MAX_JOB_ATTEMPTS
+            error = f'Worker {job.lease_owner} stopped responding'
+            
+            # Conditional update so two processes cannot reclaim the same job
+            taken = QueryJob.query.filter(
+                QueryJob.id == job.id,
+                QueryJob.status == 'running',
+                QueryJob.lease_expires_at < now
+            ).update({
+                'status': 'failed' if exhausted else 'queued',
+                'last_error': error,
+                'lease_owner': None,
+                'lease_expires_at': None,
+                'updated_at': now
+            }, synchronize_session=False)
+            
+            if not taken:
+                continue
+            
+            if exhausted:
+                update_query_status(job.query_id, 'processing', {
+                    'status': 'failed',
+                    'error_message': f'{error}; gave up after {job.attempts} attempts'
+                })
+                print(f"[JOB QUEUE] Query {job.query_id} failed after {job.attempts} attempts")
+            else:
+                requeued.append(job)
+                print(f"[JOB QUEUE] Query {job.query_id} requeued ({error})")
+        
+        db.session.commit()
+        return requeued
+
+
+class UserStats(db.Model):
+    """Materialized per-user query counters, one row per (user, task type, status).
+    
+    Kept in step by the Query mapper events below, in the same transaction as
+    the change, so /api/statistics reads a handful of rows instead of scanning
+    the user's queries. `flask rebuild-user-stats` recomputes it if it drifts.
+    """
+    __tablename__ = 'user_stats'
+    
+    user_id = db.Column(db.Integer, primary_key=True)
+    # '' stands for a NULL task type / status (primary key columns cannot be NULL)
+    task_type = db.Column(db.String(50), primary_key=True, default='')
+    status = db.Column(db.String(20), primary_key=True, default='')
+    query_count = db.Column(db.Integer, nullable=False, default=0)
+    # Sum and count of execution_time over the bucket's queries that have one
+    execution_time_sum = db.Column(db.Float, nullable=False, default=0.0)
+    execution_time_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    @staticmethod
+    def bucket(user_id, task_type, status, execution_time):
+        """Contribution of one query: (key, count, time sum, time count)"""
+        return ((user_id, task_type or '', status or ''), 1,
+                execution_time or 0.0, 0 if execution_time is None else 1)
+    
+    @staticmethod
+    def apply(connection, bucket, sign):
+        """Add (sign=1) or remove (sign=-1) one query's contribution"""
+        (user_id, task_type, status), count, time_sum, time_count = bucket
+        table = UserStats.__table__
+        deltas = {
+            'query_count': table.c.query_count + sign * count,
+            'execution_time_sum': table.c.execution_time_sum + sign * time_sum,
+            'execution_time_count': table.c.execution_time_count + sign * time_count,
+        }
+        updated = connection.execute(table.update().where(
+            table.c.user_id == user_id, table.c.task_type == task_type, table.c.status == status
+        ).values(**deltas))
+        if updated.rowcount == 0 and sign > 0:
+            connection.execute(table.insert().values(
+                user_id=user_id, task_type=task_type, status=status, query_count=count,
+                execution_time_sum=time_sum, execution_time_count=time_count
+            ))
+    
+    @staticmethod
+    def move(connection, old, new):
+        """Re-bucket a query whose status, task type or execution time changed"""
+        if old == new:
+            return
+        if old is not None:
+            UserStats.apply(connection, old, -1)
+        if new is not None:
+            UserStats.apply(connection, new, 1)
+    
+    @staticmethod
+    def for_user(user_id):
+        """Statistics payload for /api/statistics"""
+        rows = UserStats.query.filter_by(user_id=user_id).all()
+        by_status = {}
+        task_breakdown = {}
+        completed_time_sum, completed_time_count = 0.0, 0
+        for row in rows:
+            by_status[row.status] = by_status.get(row.status, 0) + row.query_count
+            task = row.task_type or None
+            task_breakdown[task] = task_breakdown.get(task, 0) + row.query_count
+            if row.status == 'completed':
+                completed_time_sum += row.execution_time_sum
+                completed_time_count += row.execution_time_count
+        
+        return {
+            'total_queries': sum(by_status.values()),
+            'completed_queries': by_status.get('completed', 0),
+            'failed_queries': by_status.get('failed', 0),
+            'task_breakdown': {task: count for task, count in task_breakdown.items() if count},
+            'avg_execution_time': round(completed_time_sum / completed_time_count, 2)
+                if completed_time_count else None
+        }
+    
+    @staticmethod
+    def rebuild():
+        """Recompute every row from the query table"""
+        rows = db.session.query(
+            Query.user_id,
+            db.func.coalesce(Query.task_type, ''),
+            db.func.coalesce(Query.status, ''),
+            db.func.count(Query.id),
+            db.func.coalesce(db.func.sum(Query.execution_time), 0.0),
+            db.func.count(Query.execution_time)
+        ).group_by(Query.user_id, Query.task_type, Query.status).all()
+        
+        UserStats.query.delete()
+        if rows:
+            db.session.execute(db.insert(UserStats), [{
+                'user_id': user_id, 'task_type': task_type, 'status': status, 'query_count': count,
+                'execution_time_sum': time_sum, 'execution_time_count': time_count
+            } for user_id, task_type, status, count, time_sum, time_count in rows])
+        db.session.commit()
+        return len(rows)
+
+
+STATS_COLUMNS = ('user_id', 'task_type', 'status', 'execution_time')
+
+
+def _stored_stats_values(connection, query_id):
+    # Read from the row itself: the instance's old values may have been expired
+    columns = [Query.__table__.c[name] for name in STATS_COLUMNS]
+    return connection.execute(db.select(*columns).where(Query.__table__.c.id == query_id)).first()
+
+
+@event.listens_for(Query, 'after_insert')
+def count_new_query(mapper, connection, target):
+    UserStats.apply(connection, UserStats.bucket(*(getattr(target, name) for name in STATS_COLUMNS)), 1)
+
+
+@event.listens_for(Query, 'before_update')
+def recount_changed_query(mapper, connection, target):
+    histories = [db.inspect(target).attrs[name].history for name in STATS_COLUMNS]
+    if not any(history.has_changes() for history in histories):
+        return
+    old = _stored_stats_values(connection, target.id)
+    if old is None:
+        return
+    new = [history.added[0] if history.added else value for history, value in zip(histories, old)]
+    UserStats.move(connection, UserStats.bucket(*old), UserStats.bucket(*new))
+
+
+@event.listens_for(Query, 'before_delete')
+def uncount_deleted_query(mapper, connection, target):
+    old = _stored_stats_values(connection, target.id)
+    if old is not None:
+        UserStats.apply(connection, UserStats.bucket(*old), -1)
+
+
+def update_query_status(query_id, from_status, values):
+    """Conditional bulk status change (no ORM events) that keeps user_stats in step
+    
+    Returns:
+        True if the query was still in `from_status` and has been updated
+    """
+    row = db.session.query(Query.user_id, Query.task_type, Query.status, Query.execution_time)\
+        .filter_by(id=query_id, status=from_status).first()
+    if row is None:
+        return False
+    changed = Query.query.filter_by(id=query_id, status=from_status)\
+        .update(values, synchronize_session=False)
+    if changed:
+        new = dict(row._mapping, **{k: v for k, v in values.items() if k in row._mapping})
+        UserStats.move(db.session.connection(), UserStats.bucket(*row), UserStats.bucket(**new))
+    return bool(changed)
 
 
 class CompanyInfo(db.Model):
@@ -122,35 +551,39 @@ class CompanyInfo(db.Model):
     def __repr__(self):
         return f'<CompanyInfo {self.company_name}>'
     
-    def get_full_knowledge(self):
-        """Return all company knowledge as formatted text"""
-        text = ""
+    def get_knowledge_sections(self):
+        """Return company knowledge as a list of formatted markdown sections"""
+        sections = []
         
         if self.company_name:
-            text += f"# Company: {self.company_name}\n\n"
+            sections.append(f"# Company: {self.company_name}\n\n")
         
         if self.company_description:
-            text += f"## Description\n{self.company_description}\n\n"
+            sections.append(f"## Description\n{self.company_description}\n\n")
         
         if self.about_company:
-            text += f"## About Us\n{self.about_company}\n\n"
+            sections.append(f"## About Us\n{self.about_company}\n\n")
         
         if self.products_services:
-            text += f"## Products & Services\n{self.products_services}\n\n"
+            sections.append(f"## Products & Services\n{self.products_services}\n\n")
         
         if self.team_info:
-            text += f"## Team\n{self.team_info}\n\n"
+            sections.append(f"## Team\n{self.team_info}\n\n")
         
         if self.company_culture:
-            text += f"## Culture\n{self.company_culture}\n\n"
+            sections.append(f"## Culture\n{self.company_culture}\n\n")
         
         if self.contact_info:
-            text += f"## Contact\n{self.contact_info}\n\n"
+            sections.append(f"## Contact\n{self.contact_info}\n\n")
         
         if self.custom_knowledge:
-            text += f"## Additional Knowledge\n{self.custom_knowledge}\n\n"
+            sections.append(f"## Additional Knowledge\n{self.custom_knowledge}\n\n")
         
-        return text
+        return sections
+    
+    def get_full_knowledge(self):
+        """Return all company knowledge as formatted text"""
+        return "".join(self.get_knowledge_sections())
     
     @staticmethod
     def get_or_create():
@@ -168,7 +601,7 @@ class Knowledge(db.Model):
     __tablename__ = 'knowledge'
     
     id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(200), nullable=False)
+    title = db.Column(db.String(200), nullable=False, index=True)
     category = db.Column(db.String(100), nullable=True)
     content = db.Column(db.Text, nullable=False)
     description = db.Column(db.String(500), nullable=True)
@@ -201,15 +634,10 @@ class Knowledge(db.Model):
         }
     
     @staticmethod
-    def get_all_active_knowledge():
-        """Get all active knowledge entries formatted for AI context"""
+    def get_active_sections():
+        """Get active knowledge entries as (category, markdown) pairs, grouped by category"""
         knowledge_entries = Knowledge.query.filter_by(is_active=True).all()
         
-        if not knowledge_entries:
-            return ""
-        
-        knowledge_text = "# CUSTOM KNOWLEDGE BASE\n\n"
-        
         # Group by category
         by_category = {}
         for entry in knowledge_entries:
@@ -219,13 +647,32 @@ class Knowledge(db.Model):
             by_category[cat].append(entry)
         
         # Format knowledge entries
+        sections = []
         for category, entries in by_category.items():
-            knowledge_text += f"## {category}\n\n"
             for entry in entries:
-                knowledge_text += f"### {entry.title}\n"
+                text = f"### {entry.title}\n"
                 if entry.description:
-                    knowledge_text += f"{entry.description}\n\n"
-                knowledge_text += f"{entry.content}\n\n"
+                    text += f"{entry.description}\n\n"
+                text += f"{entry.content}\n\n"
+                sections.append((category, text))
+        
+        return sections
+    
+    @staticmethod
+    def get_all_active_knowledge():
+        """Get all active knowledge entries formatted for AI context"""
+        sections = Knowledge.get_active_sections()
+        
+        if not sections:
+            return ""
+        
+        knowledge_text = "# CUSTOM KNOWLEDGE BASE\n\n"
+        current_category = None
+        for category, text in sections:
+            if category != current_category:
+                knowledge_text += f"## {category}\n\n"
+                current_category = category
+            knowledge_text += text
         
         return knowledge_text
     
@@ -246,6 +693,73 @@ class Knowledge(db.Model):
         ).all()
 
 
+class DocumentUpload(db.Model):
+    """An uploaded document being turned into Knowledge entries"""
+    __tablename__ = 'document_upload'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    stored_path = db.Column(db.String(500), nullable=True)
+    size_bytes = db.Column(db.Integer, default=0)
+    category = db.Column(db.String(100), nullable=True)
+    
+    # queued -> inserting -> completed / failed
+    status = db.Column(db.String(20), default='queued', index=True)
+    chunks_total = db.Column(db.Integer, default=0)
+    chunks_inserted = db.Column(db.Integer, default=0)
+    error_message = db.Column(db.Text, nullable=True)
+    
+    # WORKER_ID of the process extracting the file
+    owner = db.Column(db.String(100), nullable=True)
+    
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f'<DocumentUpload {self.filename}>'
+    
+    @staticmethod
+    def claim(upload, owner=WORKER_ID):
+        """Atomically take over an interrupted upload; False if another process got it first"""
+        previous_owner = DocumentUpload.owner.is_(None) if upload.owner is None \
+            else DocumentUpload.owner == upload.owner
+        claimed = DocumentUpload.query.filter(
+            DocumentUpload.id == upload.id,
+            DocumentUpload.status == upload.status,
+            previous_owner
+        ).update({
+            'status': 'queued',
+            'chunks_inserted': 0,
+            'owner': owner
+        }, synchronize_session=False)
+        db.session.commit()
+        return claimed == 1
+    
+    def to_dict(self):
+        """Convert to dictionary for JSON responses"""
+        if self.status == 'completed':
+            percent = 100
+        elif self.chunks_total:
+            # Extraction is the first half of the work, inserting the second
+            percent = 50 + int(50 * self.chunks_inserted / self.chunks_total)
+        else:
+            percent = 0
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'size_bytes': self.size_bytes,
+            'category': self.category,
+            'status': self.status,
+            'chunks_total': self.chunks_total,
+            'chunks_inserted': self.chunks_inserted,
+            'percent_complete': percent,
+            'error': self.error_message,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'completed_at': self.completed_at.strftime('%Y-%m-%d %H:%M:%S') if self.completed_at else None
+        }
+
+
 # ============================================================
 # RESPONSE FORMATTING UTILITIES
 # ============================================================
@@ -262,6 +776,7 @@ def format_response_with_table(query_text, ai_response):
         Formatted response with embedded HTML table if applicable
     """
     
+    from table_generator import TableDetector
     detector = TableDetector(confidence_threshold=0.6)
     is_comparison, confidence = detector.detect_comparison_question(query_text)
     
@@ -307,6 +822,7 @@ def extract_and_generate_table(query_text, ai_response, table_type='comparison')
     # This is a simplified example
     # In production, you'd parse the AI response more intelligently
     
+    from table_generator import HTMLTableGenerator
     generator = HTMLTableGenerator()
     
     if table_type == 'comparison':
@@ -344,6 +860,86 @@ def extract_and_generate_table(query_text, ai_response, table_type='comparison')
     return ai_response, None
 
 
+# ============================================================
+# CONDITIONAL GET
+# ============================================================
+
+# Bump when export_to_txt/pdf/doc change their output, so cached exports revalidate
+EXPORT_VERSION = 2
+
+_template_version = {'digest': None}
+
+
+def template_version():
+    """Digest of the template files; a deploy that changes markup changes every page ETag"""
+    if _template_version['digest'] is None or app.debug:
+        digest = hashlib.sha256()
+        folder = os.path.join(app.root_path, app.template_folder)
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                with open(os.path.join(root, name), 'rb') as f:
+                    digest.update(name.encode('utf-8'))
+                    digest.update(f.read())
+        _template_version['digest'] = digest.hexdigest()[:16]
+    return _template_version['digest']
+
+
+def content_etag(*parts):
+    """Strong ETag value from the parts a response is built from"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()[:32]
+
+
+def row_version(row):
+    """Every column value of a model instance, for hashing into an ETag"""
+    return tuple(getattr(row, column.key) for column in row.__table__.columns)
+
+
+def page_etag(*parts):
+    """ETag of a rendered page: its content plus the templates and the navbar's user state
+    
+    Returns None while flash messages are pending; the page shows them once, so
+    that render must not be reused.
+    """
+    if session.get('_flashes'):
+        return None
+    return content_etag(template_version(), session.get('user_id'), session.get('is_admin'), *parts)
+
+
+def conditional(etag, build, weak=False):
+    """
+    Answer 304 Not Modified if the client already has `etag`
+    
+    Args:
+        etag: ETag value of the current representation, or None to always build
+        build: Callable returning the full response; only called on a miss
+        weak: Send a weak validator, for representations whose bytes differ
+            between builds of the same content (e.g. embedded timestamps)
+    
+    Returns:
+        The 304 or full response, marked for revalidation on every use
+    """
+    if etag is None:
+        return build()
+    # The client may hold the gzip/br variant (see compression.encoded_etag)
+    held = compression.matching_etag(request.if_none_match, etag)
+    if held:
+        response = Response(status=304)
+        etag = held
+    else:
+        response = make_response(build())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag, weak=weak)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 # ============================================================
 # AUTH MIDDLEWARE & DECORATORS
 # ============================================================
@@ -355,6 +951,65 @@ def make_session_permanent():
     app.permanent_session_lifetime = timedelta(days=7)
 
 
+@app.after_request
+def compress_response(response):
+    """gzip/brotli-encode text responses for clients that accept it"""
+    if app.config['COMPRESSION_ENABLED']:
+        compression.compress_response(
+            response,
+            request.headers.get('Accept-Encoding'),
+            min_size=app.config['COMPRESS_MIN_SIZE'],
+            level=app.config['COMPRESS_LEVEL'],
+            quality=app.config['BROTLI_QUALITY']
+        )
+    return response
+
+
+class CurrentUser:
+    """Detached snapshot of the logged-in user's row, safe to share across requests"""
+    __slots__ = ('id', 'username', 'is_admin', 'created_at')
+    
+    def __init__(self, id, username, is_admin, created_at):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+        self.created_at = created_at
+    
+    def __repr__(self):
+        return f'<CurrentUser {self.username}>'
+
+
+# Snapshots by user id; changes made in this process invalidate them
+# immediately, other processes see them within USER_CACHE_TTL seconds
+user_cache = TTLCache(ttl=app.config['USER_CACHE_TTL'])
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+
+
+def get_current_user():
+    """Return the logged-in user (loaded at most once per request), or None"""
+    if 'current_user' in g:
+        return g.current_user
+    
+    user_id = session.get('user_id')
+    user = None
+    if user_id is not None:
+        user = user_cache.get(user_id)
+        if user is None:
+            row = db.session.query(User.id, User.username, User.is_admin, User.created_at)\
+                .filter(User.id == user_id).first()
+            if row:
+                user = CurrentUser(*row)
+                user_cache.set(user_id, user)
+    
+    g.current_user = user
+    return user
+
+
 def login_required(f):
     """Decorator to require login"""
     @wraps(f)
@@ -362,6 +1017,11 @@ def login_required(f):
         if 'user_id' not in session:
             flash('Please log in first', 'error')
             return redirect(url_for('login'))
+        if get_current_user() is None:
+            # The account was deleted since this session logged in
+            session.clear()
+            flash('Please log in first', 'error')
+            return redirect(url_for('login'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -374,7 +1034,7 @@ def admin_required(f):
             flash('Please log in first', 'error')
             return redirect(url_for('login'))
         
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         if not user or not user.is_admin:
             flash('Admin access required', 'error')
             return redirect(url_for('index'))
@@ -411,7 +1071,11 @@ def register():
             return render_template('register.html')
         
         user = User(username=username)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except HashingBusyError:
+            flash('The server is busy. Please try again in a moment.', 'error')
+            return render_template('register.html'), 503, {'Retry-After': '5'}
         db.session.add(user)
         db.session.commit()
         
@@ -421,16 +1085,46 @@ def register():
     return render_template('register.html')
 
 
+# Checked when the username does not exist, so both cases cost the same
+DUMMY_PASSWORD_HASH = None
+
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """User login"""
+    global DUMMY_PASSWORD_HASH
+    
     if request.method == 'POST':
         username = request.form.get('username', '').strip()
         password = request.form.get('password', '')
+        ip = request.remote_addr or 'unknown'
+        
+        retry_after = login_throttle.retry_after(ip, username)
+        if retry_after:
+            flash(f'Too many failed login attempts. Try again in {retry_after // 60 + 1} minutes.', 'error')
+            return render_template('login.html'), 429, {'Retry-After': str(retry_after)}
         
         user = User.query.filter_by(username=username).first()
         
-        if user and user.check_password(password):
+        try:
+            if user:
+                valid = user.check_password(password)
+            else:
+                if DUMMY_PASSWORD_HASH is None:
+                    DUMMY_PASSWORD_HASH = password_hasher.hash_password(os.urandom(16).hex())
+                password_hasher.check_password(DUMMY_PASSWORD_HASH, password)
+                valid = False
+            
+            if valid and user.password_needs_rehash():
+                # Transparently move the stored hash to the current policy
+                user.set_password(password)
+                db.session.commit()
+        except HashingBusyError:
+            flash('The server is busy. Please try again in a moment.', 'error')
+            return render_template('login.html'), 503, {'Retry-After': '5'}
+        
+        if valid:
+            login_throttle.record_success(ip, username)
             session['user_id'] = user.id
             session['username'] = user.username
             session['is_admin'] = user.is_admin
@@ -440,6 +1134,7 @@ def login():
                 return redirect(url_for('admin_dashboard'))
             return redirect(url_for('index'))
         else:
+            login_throttle.record_failure(ip, username)
             flash('Invalid username or password', 'error')
     
     return render_template('login.html')
@@ -462,7 +1157,7 @@ def logout():
 @login_required
 def index():
     """Home page"""
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     queries = Query.query.filter_by(user_id=user.id).order_by(Query.created_at.desc()).limit(5).all()
     return render_template('index.html', queries=queries, user=user)
 
@@ -471,7 +1166,7 @@ def index():
 @login_required
 def history():
     """Query history page"""
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     page = request.args.get('page', 1, type=int)
     
     queries = Query.query.filter_by(user_id=user.id)\
@@ -481,18 +1176,182 @@ def history():
     return render_template('history.html', queries=queries, user=user)
 
 
+# Fields selectable with /api/queries?fields=...; "title" is the first
+# QUERY_TITLE_CHARS characters of the question, cut in SQL
+QUERY_TITLE_CHARS = 120
+QUERY_LIST_FIELDS = {
+    'id': Query.id,
+    'title': db.func.substr(Query.query_text, 1, QUERY_TITLE_CHARS),
+    'query_text': Query.query_text,
+    'status': Query.status,
+    'task_type': Query.task_type,
+    'created_at': Query.created_at,
+    'execution_time': Query.execution_time,
+    'is_comparison_query': Query.is_comparison_query,
+    'comparison_confidence': Query.comparison_confidence,
+    'priority': Query.priority,
+    'batch_id': Query.batch_id,
+    'model_route': Query.model_route,
+    'model_name': Query.model_name,
+    'prompt_tokens': Query.prompt_tokens,
+    'cached_from_id': Query.cached_from_id,
+    'tools_used': Query.tools_used,
+    'error_message': Query.error_message,
+    'response': Query.response,
+    'reasoning': Query.reasoning,
+}
+QUERY_LIST_DEFAULT_FIELDS = ['id', 'title', 'status', 'task_type', 'created_at']
+QUERY_LIST_MAX_LIMIT = 200
+
+
+def encode_query_cursor(created_at, query_id):
+    """Opaque keyset cursor for the row a page ended on"""
+    raw = json.dumps([created_at.isoformat() if created_at else None, query_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_query_cursor(cursor):
+    """Inverse of encode_query_cursor; raises ValueError if it was tampered with"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, query_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(query_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def parse_datetime_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 date or datetime')
+
+
+@app.route('/api/queries')
+@login_required
+def list_queries_api():
+    """
+    The current user's queries, newest first, with keyset pagination
+    
+    Query args:
+        fields: Comma-separated subset of QUERY_LIST_FIELDS (default id,title,status,task_type,created_at)
+        status, task_type: Exact match; comma-separated for several values
+        created_after, created_before: ISO 8601 bounds on created_at
+        is_comparison_query: true/false
+        limit: Page size (default 50, max QUERY_LIST_MAX_LIMIT)
+        cursor: next_cursor from the previous page
+    """
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] \
+        or QUERY_LIST_DEFAULT_FIELDS
+    unknown = [f for f in fields if f not in QUERY_LIST_FIELDS]
+    if unknown:
+        return jsonify({
+            'error': f"Unknown fields: {', '.join(unknown)}",
+            'allowed_fields': sorted(QUERY_LIST_FIELDS)
+        }), 400
+    limit = max(1, min(request.args.get('limit', 50, type=int), QUERY_LIST_MAX_LIMIT))
+    
+    columns = [QUERY_LIST_FIELDS[f].label(f) for f in fields]
+    # The cursor needs the sort key of the last row even if it was not requested
+    rows = db.session.query(*columns, Query.created_at.label('_created_at'), Query.id.label('_id'))\
+        .filter(Query.user_id == get_current_user().id)
+    
+    try:
+        for name, column in (('status', Query.status), ('task_type', Query.task_type)):
+            values = [v.strip() for v in request.args.get(name, '').split(',') if v.strip()]
+            if values:
+                rows = rows.filter(column.in_(values))
+        created_after = parse_datetime_arg('created_after')
+        if created_after:
+            rows = rows.filter(Query.created_at >= created_after)
+        created_before = parse_datetime_arg('created_before')
+        if created_before:
+            rows = rows.filter(Query.created_at < created_before)
+        comparison = request.args.get('is_comparison_query')
+        if comparison:
+            rows = rows.filter(Query.is_comparison_query == (comparison.lower() in ('true', '1', 'yes')))
+        cursor = request.args.get('cursor')
+        if cursor:
+            rows = rows.filter(db.tuple_(Query.created_at, Query.id) < decode_query_cursor(cursor))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows = rows.order_by(Query.created_at.desc(), Query.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    queries = []
+    for row in rows:
+        item = {f: getattr(row, f) for f in fields}
+        if isinstance(item.get('created_at'), datetime):
+            item['created_at'] = item['created_at'].isoformat()
+        queries.append(item)
+    
+    return jsonify({
+        'queries': queries,
+        'count': len(queries),
+        'next_cursor': encode_query_cursor(rows[-1]._created_at, rows[-1]._id) if has_more else None
+    })
+
+
+@app.route('/api/queries/search')
+@login_required
+def search_queries_api():
+    """
+    Full-text search over completed queries, best match first
+    
+    Users search their own history; admins search everyone's.
+    
+    Query args:
+        q: Search words (all must match; the last one also matches as a prefix)
+        limit: Results per page (default 20, max 100)
+        offset: Results to skip
+    """
+    text = request.args.get('q', '', type=str)
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    user = get_current_user()
+    
+    result = query_search.search(
+        db.session.connection(), text,
+        user_id=None if user.is_admin else user.id,
+        limit=limit, offset=offset
+    )
+    for item in result['results']:
+        item['url'] = url_for('view_query', query_id=item['id'])
+    result['count'] = len(result['results'])
+    return jsonify(result)
+
+
+@app.cli.command('rebuild-query-search')
+def rebuild_query_search_command():
+    """Re-index all completed queries for full-text search"""
+    with db.engine.begin() as conn:
+        if not query_search.supports_fts(conn):
+            click.echo("SQLite FTS5 is not available; search uses LIKE and needs no index")
+            return
+        count = query_search.rebuild(conn)
+    click.echo(f"✅ Query search index rebuilt ({count} queries)")
+
+
 @app.route('/query/<int:query_id>')
 @login_required
 def view_query(query_id):
     """View query details"""
     query = Query.query.get_or_404(query_id)
     
-    # Check ownership
-    if query.user_id != session['user_id']:
+    # Check ownership: admins can open any query (their search covers all users)
+    if query.user_id != session['user_id'] and not get_current_user().is_admin:
         flash('You do not have access to this query', 'error')
         return redirect(url_for('history'))
     
-    return render_template('query_detail.html', query=query)
+    return conditional(
+        page_etag('query', row_version(query)),
+        lambda: render_template('query_detail.html', query=query)
+    )
 
 
 @app.route('/query/<int:query_id>/delete', methods=['POST'])
@@ -500,7 +1359,7 @@ def view_query(query_id):
 def delete_query(query_id):
     """Delete a query"""
     query = Query.query.get_or_404(query_id)
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     
     # Check permissions: user can delete their own queries, admin can delete any query
     if query.user_id != session['user_id'] and not user.is_admin:
@@ -510,6 +1369,13 @@ def delete_query(query_id):
     query_text = query.query_text[:50]
     redirect_url = request.referrer or url_for('history')
     
+    # Stop in-flight work first so the worker does not write to a deleted row
+    if query.status == 'processing':
+        query_scheduler.cancel(query.id)
+        QueryJob.finish(query.id, 'cancelled')
+    
+    semantic_cache.remove(query.id)
+    
     try:
         db.session.delete(query)
         db.session.commit()
@@ -525,7 +1391,7 @@ def delete_query(query_id):
 @login_required
 def settings():
     """User settings page"""
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     return render_template('settings.html', user=user)
 
 
@@ -533,48 +1399,122 @@ def settings():
 # ADMIN ROUTES
 # ============================================================
 
+# Dashboard sections a client can hold a version of; counters are patched as
+# text, the others are swapped in as fragments from admin/_dashboard.html
+DASHBOARD_COUNTERS = ('total_users', 'total_queries', 'completed_queries', 'failed_queries')
+DASHBOARD_FRAGMENTS = ('llm_breaker', 'task_breakdown', 'recent_users', 'recent_queries')
+DASHBOARD_SECTIONS = DASHBOARD_COUNTERS + DASHBOARD_FRAGMENTS
+
+# Breaker fields the dashboard shows (the success/failure totals change on every call)
+DASHBOARD_BREAKER_FIELDS = ('state', 'consecutive_failures', 'failure_threshold', 'retry_in',
+                            'times_opened', 'rejected_calls', 'last_error')
+
+
+def dashboard_snapshot():
+    """Everything the admin dashboard shows, from a few small indexed reads
+    
+    Query counts come from the materialized user_stats counters; the recent
+    lists are the newest rows by primary key.
+    """
+    breaker = llm_caller.breaker.snapshot()
+    
+    by_status = {}
+    task_breakdown = {}
+    for status, task_type, count in db.session.query(
+        UserStats.status, UserStats.task_type, db.func.sum(UserStats.query_count)
+    ).group_by(UserStats.status, UserStats.task_type):
+        by_status[status] = by_status.get(status, 0) + count
+        task = task_type or None
+        task_breakdown[task] = task_breakdown.get(task, 0) + count
+    
+    recent_queries = [dict(row._mapping) for row in db.session.query(
+        Query.id, Query.user_id, User.username,
+        db.func.substr(Query.query_text, 1, 51).label('query_text'),
+        Query.task_type, Query.status, Query.created_at
+    ).join(User, User.id == Query.user_id).order_by(Query.id.desc()).limit(5)]
+    
+    recent_users = [dict(row._mapping) for row in db.session.query(
+        User.id, User.username, User.is_admin, User.created_at
+    ).order_by(User.id.desc()).limit(5)]
+    query_counts = dict(db.session.query(UserStats.user_id, db.func.sum(UserStats.query_count))
+                        .filter(UserStats.user_id.in_([user['id'] for user in recent_users]))
+                        .group_by(UserStats.user_id)) if recent_users else {}
+    for user in recent_users:
+        user['query_count'] = query_counts.get(user['id'], 0)
+    
+    return {
+        'total_users': db.session.query(db.func.count(User.id)).scalar(),
+        'total_queries': sum(by_status.values()),
+        'completed_queries': by_status.get('completed', 0),
+        'failed_queries': by_status.get('failed', 0),
+        'llm_breaker': {field: breaker[field] for field in DASHBOARD_BREAKER_FIELDS},
+        'task_breakdown': {task: count for task, count in task_breakdown.items() if count},
+        'recent_users': recent_users,
+        'recent_queries': recent_queries,
+    }
+
+
+def dashboard_versions(snapshot):
+    """Short content hash per section"""
+    return {section: content_etag(snapshot[section])[:8] for section in DASHBOARD_SECTIONS}
+
+
+def encode_dashboard_version(versions):
+    return '.'.join(versions[section] for section in DASHBOARD_SECTIONS)
+
+
 @app.route('/admin')
 @admin_required
 def admin_dashboard():
     """Admin dashboard"""
-    total_users = User.query.count()
-    total_queries = Query.query.count()
-    completed_queries = Query.query.filter_by(status='completed').count()
-    failed_queries = Query.query.filter_by(status='failed').count()
-    
-    # Task type breakdown
-    task_breakdown = {}
-    for query in Query.query.all():
-        task = query.task_type
-        task_breakdown[task] = task_breakdown.get(task, 0) + 1
-    
-    # Recent queries
-    recent_queries = Query.query.order_by(Query.created_at.desc()).limit(5).all()
+    snapshot = dashboard_snapshot()
+    return render_template('admin/dashboard.html',
+        dashboard_version=encode_dashboard_version(dashboard_versions(snapshot)),
+        **snapshot)
+
+
+@app.route('/admin/api/dashboard')
+@admin_required
+def admin_dashboard_delta():
+    """Sections of the admin dashboard that changed since ?since=<version>
     
-    # Recent users
-    recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
+    The version is the one from the page (data-version) or from the previous
+    call. Counters come back as numbers, other sections as rendered HTML.
+    """
+    snapshot = dashboard_snapshot()
+    versions = dashboard_versions(snapshot)
+    known = dict(zip(DASHBOARD_SECTIONS, request.args.get('since', '').split('.')))
+    changed = [section for section in DASHBOARD_SECTIONS if known.get(section) != versions[section]]
     
-    # Knowledge statistics
-    knowledge_total = Knowledge.query.count()
-    knowledge_active = Knowledge.query.filter_by(is_active=True).count()
+    fragments = {}
+    if any(section in DASHBOARD_FRAGMENTS for section in changed):
+        macros = app.jinja_env.get_template('admin/_dashboard.html').make_module({'session': session})
+        fragments = {section: str(getattr(macros, section)(snapshot[section]))
+                     for section in changed if section in DASHBOARD_FRAGMENTS}
     
-    # Company knowledge status
-    company_info = CompanyInfo.query.first()
-    company_knowledge_status = 'Configured' if company_info and company_info.company_name else 'Not Configured'
-    company_name = company_info.company_name if company_info else 'Not Set'
-    
-    return render_template('admin/dashboard.html', 
-        total_users=total_users,
-        total_queries=total_queries,
-        completed_queries=completed_queries,
-        failed_queries=failed_queries,
-        task_breakdown=task_breakdown,
-        recent_queries=recent_queries,
-        recent_users=recent_users,
-        knowledge_total=knowledge_total,
-        knowledge_active=knowledge_active,
-        company_knowledge_status=company_knowledge_status,
-        company_name=company_name)
+    return jsonify({
+        'version': encode_dashboard_version(versions),
+        'counters': {section: snapshot[section] for section in changed if section in DASHBOARD_COUNTERS},
+        'fragments': fragments
+    })
+
+
+@app.route('/admin/api/llm-health')
+@admin_required
+def admin_llm_health():
+    """Circuit breaker state and scheduler occupancy for the LLM provider"""
+    return jsonify({
+        'breaker': llm_caller.breaker.snapshot(),
+        'scheduler': query_scheduler.stats(),
+        'semantic_cache': semantic_cache.stats()
+    })
+
+
+@app.route('/admin/api/model-routes')
+@admin_required
+def admin_model_routes():
+    """Current model routing table, in evaluation order"""
+    return jsonify(model_router.routes())
 
 
 @app.route('/admin/users')
@@ -623,14 +1563,26 @@ def delete_user(user_id):
     
     username = user.username
     
+    # Stop in-flight work first so workers do not write to deleted rows
+    # (other processes notice the deleted rows on their next heartbeat)
+    processing = db.session.query(Query.id).filter_by(user_id=user_id, status='processing')
+    for row in processing.all():
+        query_scheduler.cancel(row.id)
+    
     try:
-        # Delete all queries associated with the user
+        # Delete all queries (and their queue entries and batches) in one transaction
+        QueryJob.query.filter_by(user_id=user_id).delete()
         Query.query.filter_by(user_id=user_id).delete()
+        QueryBatch.query.filter_by(user_id=user_id).delete()
+        UserStats.query.filter_by(user_id=user_id).delete()
         
         # Delete the user
         db.session.delete(user)
         db.session.commit()
         
+        # Their query ids can be reused, so their cached vectors must never match again
+        semantic_cache.remove_user(user_id)
+        
         flash(f'User "{username}" and all their queries have been deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -669,6 +1621,7 @@ def manage_company_info():
         
         db.session.add(company_info)
         db.session.commit()
+        company_search_index.rebuild(company_info)
         
         flash('Company information updated successfully!', 'success')
         return redirect(url_for('manage_company_info'))
@@ -679,18 +1632,23 @@ def manage_company_info():
 @app.route('/api/get-company-knowledge')
 def get_company_knowledge():
     """Get company knowledge for use in queries"""
-    company_info = CompanyInfo.query.first()
+    version = db.session.query(CompanyInfo.id, CompanyInfo.updated_at).first()
     
-    if company_info:
-        return jsonify({
-            'knowledge': company_info.get_full_knowledge(),
-            'company_name': company_info.company_name
-        })
-    else:
-        return jsonify({
-            'knowledge': '',
-            'company_name': ''
-        })
+    def build():
+        company_info = CompanyInfo.query.first()
+        
+        if company_info:
+            return jsonify({
+                'knowledge': company_info.get_full_knowledge(),
+                'company_name': company_info.company_name
+            })
+        else:
+            return jsonify({
+                'knowledge': '',
+                'company_name': ''
+            })
+    
+    return conditional(content_etag('company-knowledge', tuple(version or ())), build)
 
 
 @app.route('/api/company-knowledge/export')
@@ -763,52 +1721,50 @@ def company_knowledge_status():
     })
 
 
+# Rebuilt on manage_company_info saves; other processes notice the newer
+# updated_at and rebuild on their next search
+company_search_index = CompanySearchIndex()
+
+
+def get_company_search_index():
+    """Return the company search index, rebuilding it if the profile changed"""
+    latest = db.session.query(CompanyInfo.id, CompanyInfo.updated_at).first()
+    latest_version = latest.updated_at if latest else None
+    if company_search_index.version != latest_version:
+        company_search_index.rebuild(db.session.get(CompanyInfo, latest.id) if latest else None)
+    return company_search_index
+
+
 @app.route('/api/company-knowledge/search', methods=['POST'])
 @login_required
 def search_company_knowledge():
-    """Search within company knowledge"""
-    data = request.get_json()
-    search_term = data.get('search', '').lower().strip()
+    """Ranked multi-term search within company knowledge
+    
+    JSON body: search (terms, optionally joined by OR), mode ('and' | 'or'),
+    limit (max fields returned). Returns snippets, not whole fields.
+    """
+    data = request.get_json() or {}
+    search_term = data.get('search', '').strip()
     
     if not search_term or len(search_term) < 2:
         return jsonify({'error': 'Search term must be at least 2 characters'}), 400
     
-    company_info = CompanyInfo.query.first()
-    
-    if not company_info:
-        return jsonify({'results': []})
-    
-    results = {}
-    
-    # Search in each field
-    if company_info.company_name and search_term in company_info.company_name.lower():
-        results['company_name'] = company_info.company_name
-    
-    if company_info.company_description and search_term in company_info.company_description.lower():
-        results['company_description'] = company_info.company_description
-    
-    if company_info.about_company and search_term in company_info.about_company.lower():
-        results['about_company'] = company_info.about_company
-    
-    if company_info.products_services and search_term in company_info.products_services.lower():
-        results['products_services'] = company_info.products_services
-    
-    if company_info.company_culture and search_term in company_info.company_culture.lower():
-        results['company_culture'] = company_info.company_culture
-    
-    if company_info.team_info and search_term in company_info.team_info.lower():
-        results['team_info'] = company_info.team_info
-    
-    if company_info.contact_info and search_term in company_info.contact_info.lower():
-        results['contact_info'] = company_info.contact_info
+    mode = data.get('mode', 'and')
+    if mode not in ('and', 'or'):
+        return jsonify({'error': 'Mode must be and or or'}), 400
+    try:
+        limit = max(1, min(int(data.get('limit', 10)), 20))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Limit must be a number'}), 400
     
-    if company_info.custom_knowledge and search_term in company_info.custom_knowledge.lower():
-        results['custom_knowledge'] = company_info.custom_knowledge
+    found = get_company_search_index().search(search_term, mode=mode, limit=limit)
     
     return jsonify({
         'search_term': search_term,
-        'results': results,
-        'found_in_fields': len(results)
+        'terms': found['terms'],
+        'mode': found['mode'],
+        'results': found['results'],
+        'found_in_fields': len(found['results'])
     })
 
 
@@ -834,19 +1790,17 @@ def detect_task_type(query_text):
         return 'general'
 
 
-def get_knowledge_context():
-    """Get all active knowledge as context for AI queries"""
-    # Get company knowledge
+def get_knowledge_sections():
+    """Get company and custom knowledge as prompt sections for AI queries"""
+    # Company knowledge, one section per field
     company = CompanyInfo.get_or_create()
-    company_knowledge = company.get_full_knowledge()
-    
-    # Get custom knowledge
-    custom_knowledge = Knowledge.get_all_active_knowledge()
+    sections = [PromptSection(order, text) for order, text in enumerate(company.get_knowledge_sections())]
     
-    # Combine both
-    full_context = company_knowledge + "\n\n" + custom_knowledge
+    # Custom knowledge, one section per entry under its category heading
+    for category, text in Knowledge.get_active_sections():
+        sections.append(PromptSection(len(sections), text, group=f"## {category}\n\n"))
     
-    return full_context.strip() if full_context.strip() else ""
+    return sections
 
 
 @app.route('/api/detect-table-type', methods=['POST'])
@@ -859,6 +1813,7 @@ def detect_table_type():
     data = request.get_json()
     query_text = data.get('query', '')
     
+    from table_generator import TableDetector
     detector = TableDetector()
     is_comparison, confidence = detector.detect_comparison_question(query_text)
     keywords = detector.get_detected_keywords(query_text)
@@ -882,7 +1837,15 @@ def execute_query():
     if not query_text:
         return jsonify({'error': 'Query cannot be empty'}), 400
     
+    priority = data.get('priority', DEFAULT_PRIORITY)
+    if priority not in PRIORITIES:
+        return jsonify({'error': f'Priority must be one of: {", ".join(PRIORITIES)}'}), 400
+    
+    # Look for an earlier answer to a near-duplicate question
+    cached = None if data.get('bypass_cache') else find_cached_answer(query_text, session['user_id'])
+    
     # Detect if this is a comparison question
+    from table_generator import TableDetector
     detector = TableDetector()
     is_comparison, confidence = detector.detect_comparison_question(query_text)
     
@@ -893,35 +1856,78 @@ def execute_query():
         task_type=detect_task_type(query_text),
         status='processing',
         is_comparison_query=is_comparison,
-        comparison_confidence=confidence
+        comparison_confidence=confidence,
+        priority=priority
     )
     
+    if cached and semantic_cache.mode == 'return':
+        source, similarity = cached
+        query.copy_answer_from(source)
+        db.session.add(query)
+        db.session.commit()
+        
+        return jsonify({
+            'query_id': query.id,
+            'detected_as_comparison': is_comparison,
+            'confidence': confidence,
+            'cached': True,
+            'cached_from': source.id,
+            'similarity': round(similarity, 3)
+        })
+    
     db.session.add(query)
+    QueryJob.enqueue(query, role=current_role())
     db.session.commit()
     
-    # Execute in background (your existing code)
-    from threading import Thread
-    thread = Thread(
-        target=execute_query_background,
-        args=(query.id, query_text, session['user_id'])
-    )
-    thread.daemon = True
-    thread.start()
+    # Execute in background through the shared worker pool
+    schedule_query(query.id, query_text, session['user_id'],
+                   role=current_role(), priority=priority)
     
-    return jsonify({
+    result = {
         'query_id': query.id,
         'detected_as_comparison': is_comparison,
         'confidence': confidence
-    })
+    }
+    if cached:
+        # 'offer' mode: let the client show the earlier answer while this one runs
+        source, similarity = cached
+        result['similar_query'] = {'query_id': source.id, 'similarity': round(similarity, 3)}
+    
+    return jsonify(result)
+
+
+def find_cached_answer(query_text, user_id):
+    """
+    Find a completed near-duplicate of query_text in the semantic cache
+    
+    Returns:
+        Tuple of (source Query, similarity), or None
+    """
+    if not semantic_cache.enabled:
+        return None
+    
+    for source_id, similarity in semantic_cache.lookup(query_text, user_id):
+        source = Query.query.get(source_id)
+        if semantic_cache.scope == 'user' and source and source.user_id != user_id:
+            # A reused id of a query deleted before its vector was removed
+            continue
+        if source and source.status == 'completed' and source.response \
+                and numbers_match(query_text, source.query_text):
+            return source, similarity
+    return None
 
 
-def execute_query_background(query_id, query_text=None, user_id=None):
+def execute_query_background(query_id, query_text=None, user_id=None, cancel_token=None):
     """Execute query in background using LLM"""
     from openai import OpenAI
+    from table_generator import TableDetector
     
     try:
         with app.app_context():
             query = Query.query.get(query_id)
+            if query is None or query.status != 'processing':
+                # Deleted or cancelled before a worker picked it up
+                return
             start_time = time.time()
             
             # ============================================================
@@ -951,47 +1957,49 @@ def execute_query_background(query_id, query_text=None, user_id=None):
             
             # Initialize LLM
             openrouter_client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
+                base_url=os.getenv('OPENROUTER_BASE_URL', "https://openrouter.ai/api/v1"),
                 api_key=os.getenv('OPENROUTER_API_KEY', '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'),
+                max_retries=0,  # retries are handled by llm_caller
             )
             
-            # Get knowledge context
-            knowledge_context = get_knowledge_context()
+            # Cancelling the query closes the client, aborting the in-flight request
+            if cancel_token is not None:
+                cancel_token.on_cancel(openrouter_client.close)
             
-            # System prompt with knowledge integration
-            system_instruction = """You are an expert research assistant with advanced reasoning capabilities.
-
-Your task is to:
-1. Thoroughly analyze the question
-2. Identify key aspects and subtopics
-3. Provide comprehensive, well-reasoned responses
-4. Consider multiple perspectives and evidence
-5. Support claims with specific examples
-
-Format your response clearly with sections and examples."""
+            # Build messages: system prompt plus the most relevant knowledge
+            # that fits the token budget left after reserving the answer
+            knowledge_sections = get_knowledge_sections()
+            prompt = build_prompt(query.query_text, knowledge_sections, answer_tokens=8000)
+            
+            # Route by task type, comparison flag and prompt size; rebuild the
+            # prompt if the route's answer budget differs from the default
+            route = model_router.route(query.task_type, query.is_comparison_query, prompt['prompt_tokens'])
+            if route['max_tokens'] != 8000:
+                prompt = build_prompt(query.query_text, knowledge_sections, answer_tokens=route['max_tokens'])
             
-            # Add knowledge to system prompt if available
-            if knowledge_context:
-                system_instruction += f"\n\n--- KNOWLEDGE BASE ---\n{knowledge_context}\n--- END KNOWLEDGE BASE ---\n\nUse this knowledge base to answer questions accurately when relevant."
+            messages = prompt['messages']
+            query.prompt_tokens = prompt['prompt_tokens']
+            query.model_route = route['name']
+            query.model_name = route['model']
             
-            # Build messages
-            messages = [
-                {
-                    "role": "system",
-                    "content": system_instruction
-                },
-                {
-                    "role": "user",
-                    "content": query.query_text
-                }
-            ]
+            print(f"[PROMPT] {prompt['prompt_tokens']} prompt tokens, "
+                  f"{prompt['knowledge_tokens']} knowledge tokens, "
+                  f"{prompt['sections_dropped']} sections dropped, "
+                  f"max_tokens={prompt['max_tokens']}")
+            print(f"[ROUTE] {route['name']}: model={route['model']}, reasoning={route['reasoning']}")
             
-            # Execute query with reasoning
-            response = openrouter_client.chat.completions.create(
-                model="openai/gpt-oss-20b:free",
-                messages=messages,
-                max_tokens=8000,
-                extra_body={"reasoning": {"enabled": True}}
+            # Execute query with reasoning under deadlines, retries and the
+            # circuit breaker (cancellation frees this worker immediately)
+            response = run_cancellable(
+                cancel_token,
+                lambda: llm_caller.call(
+                    openrouter_client.chat.completions.create,
+                    cancel_token=cancel_token,
+                    model=route['model'],
+                    messages=messages,
+                    max_tokens=prompt['max_tokens'],
+                    extra_body={"reasoning": {"enabled": route['reasoning']}}
+                )
             )
             
             assistant_message = response.choices[0].message
@@ -1011,6 +2019,10 @@ Format your response clearly with sections and examples."""
             
             execution_time = time.time() - start_time
             
+            if cancel_token is not None and cancel_token.cancelled:
+                print(f"[QUERY CANCELLED] Query {query_id} cancelled, discarding response")
+                return
+            
             # ============================================================
             # TABLE GENERATION PHASE
             # ============================================================
@@ -1040,47 +2052,194 @@ Format your response clearly with sections and examples."""
             # ============================================================
             # UPDATE QUERY IN DATABASE
             # ============================================================
-            # Update query
-            query.status = 'completed'
-            query.response = response_content
-            query.reasoning = reasoning_text
-            query.execution_time = execution_time
-            query.tools_used = 'search, research'
+            values = {
+                'status': 'completed',
+                'response': response_content,
+                'reasoning': reasoning_text,
+                'execution_time': execution_time,
+                'tools_used': 'search, research'
+            }
             
             # Store table HTML if generated
             if table_html:
-                query.table_html = table_html
+                values['table_html'] = table_html
                 print(f"[TABLE STORAGE] Table HTML stored in database")
             
+            # Conditional update: another process may have cancelled or
+            # deleted the query since this worker last checked its token
+            if not update_query_status(query_id, 'processing', values):
+                db.session.rollback()
+                print(f"[QUERY CANCELLED] Query {query_id} cancelled elsewhere, discarding response")
+                return
             db.session.commit()
             
+            # Make the answer reusable for near-duplicate questions
+            try:
+                semantic_cache.add(query.id, query.user_id, query.query_text)
+            except Exception as e:
+                print(f"[SEMANTIC CACHE ERROR] {str(e)}")
+            
             print(f"[QUERY COMPLETE] Query {query_id} completed in {execution_time:.2f}s")
             print(f"[COMPARISON DETECTION] Stored: is_comparison={query.is_comparison_query}, confidence={query.comparison_confidence:.2f}")
     
     except Exception as e:
         with app.app_context():
+            if cancel_token is not None and cancel_token.cancelled:
+                # Conditional update: the row may already be cancelled or deleted
+                update_query_status(query_id, 'processing', {
+                    'status': 'cancelled',
+                    'error_message': 'Cancelled by user'
+                })
+                db.session.commit()
+                print(f"[QUERY CANCELLED] Query {query_id} aborted")
+                return
+            
             query = Query.query.get(query_id)
-            query.status = 'failed'
-            query.error_message = str(e)
+            if query is None:
+                print(f"[QUERY CANCELLED] Query {query_id} was deleted while running")
+                return
+            
+            values = {'status': 'failed', 'error_message': str(e)}
             
             # Ensure comparison fields are set even on error
             if not query.is_comparison_query:
                 detector = TableDetector()
                 is_comparison, confidence = detector.detect_comparison_question(query.query_text)
-                query.is_comparison_query = is_comparison
-                query.comparison_confidence = confidence
+                values['is_comparison_query'] = is_comparison
+                values['comparison_confidence'] = confidence
             
+            # Conditional update, as above: a cancel from another process wins
+            if not update_query_status(query_id, 'processing', values):
+                print(f"[QUERY CANCELLED] Query {query_id} was cancelled while running")
+                return
             print(f"[QUERY ERROR] Query {query_id} failed: {str(e)}")
             db.session.commit()
 
 
+def run_query_job(query_id, query_text=None, user_id=None, cancel_token=None):
+    """Claim the durable job for a query, execute it and record the outcome"""
+    with app.app_context():
+        if not QueryJob.claim(query_id):
+            # Already finished, cancelled, or leased by another worker
+            return
+    job_lease_keeper.start()
+    
+    try:
+        execute_query_background(query_id, query_text, user_id, cancel_token)
+    finally:
+        with app.app_context():
+            query = Query.query.get(query_id)
+            status = query.status if query else 'cancelled'
+            job_status = {'completed': 'done', 'cancelled': 'cancelled'}.get(status, 'failed')
+            QueryJob.finish(query_id, job_status, query.error_message if query else None)
+
+
+def executes_locally():
+    """Whether this process runs queries (False for web processes in worker mode)"""
+    return app.config['QUERY_EXECUTION'] != 'worker'
+
+
+def schedule_query(query_id, query_text, user_id, role='user', priority=DEFAULT_PRIORITY):
+    """Start a committed, queued query
+    
+    In worker mode the QueryJob row is the hand-off and worker.py picks it up.
+    """
+    if executes_locally():
+        query_scheduler.submit(query_id, query_text, user_id, role=role, priority=priority)
+
+
+def dispatch_job(job):
+    """Hand a queued job to this process's scheduler"""
+    schedule_query(job.query_id, None, job.user_id,
+                   role=job.role or 'user', priority=job.priority or DEFAULT_PRIORITY)
+
+
+def cancel_abandoned_jobs():
+    """Stop local work whose query was cancelled or deleted by another process"""
+    active_ids = query_scheduler.active_ids()
+    if not active_ids:
+        return 0
+    with app.app_context():
+        still_processing = {row.id for row in db.session.query(Query.id).filter(
+            Query.id.in_(active_ids), Query.status == 'processing')}
+    stale = [query_id for query_id in active_ids if query_id not in still_processing]
+    for query_id in stale:
+        query_scheduler.cancel(query_id)
+    return len(stale)
+
+
+def _heartbeat_jobs():
+    with app.app_context():
+        QueryJob.heartbeat()
+    cancel_abandoned_jobs()
+
+
+def _reclaim_jobs():
+    with app.app_context():
+        for job in QueryJob.reclaim_expired():
+            dispatch_job(job)
+
+
+def recover_jobs():
+    """
+    Resume work interrupted by a restart or crash
+    
+    Queries left 'processing' without a job (created before the durable
+    queue existed) get one, expired leases are reclaimed, and every queued
+    job is handed to the scheduler.
+    """
+    if not executes_locally():
+        # Worker processes own recovery; they run this on startup
+        return
+    
+    with app.app_context():
+        orphaned = Query.query.outerjoin(QueryJob, QueryJob.query_id == Query.id)\
+            .filter(Query.status == 'processing', QueryJob.id.is_(None)).all()
+        for query in orphaned:
+            QueryJob.enqueue(query, role='admin' if query.user.is_admin else 'user')
+        db.session.commit()
+        
+        QueryJob.reclaim_expired()
+        
+        queued = QueryJob.query.filter_by(status='queued').order_by(QueryJob.id).all()
+        for job in queued:
+            dispatch_job(job)
+    
+    if orphaned or queued:
+        print(f"✅ Resumed {len(queued)} queued queries ({len(orphaned)} recovered from before the job queue)")
+    
+    job_lease_keeper.start()
+
+
+# Shared resilience layer (timeouts, retries, circuit breaker) for LLM calls
+llm_caller = ResilientCaller()
+
+# Model / reasoning / answer-budget routing table (MODEL_ROUTES)
+model_router = ModelRouter()
+
+# Near-duplicate answer reuse (SEMANTIC_CACHE_MODE / _THRESHOLD / _SCOPE)
+semantic_cache = SemanticCache(os.path.join(app.instance_path, 'semantic_cache'))
+
+# Shared, concurrency-limited pool for all background query execution.
+# Dispatch is fair across users (see SCHEDULER_POLICY in scheduler.py).
+query_scheduler = QueryScheduler(run_query_job)
+
+# Renews leases held by this process and reclaims those of dead processes
+job_lease_keeper = LeaseKeeper(_heartbeat_jobs, _reclaim_jobs)
+
+
+def current_role():
+    """Scheduler role for the logged-in user"""
+    return 'admin' if get_current_user().is_admin else 'user'
+
+
 @app.route('/api/query-status/<int:query_id>')
 @login_required
 def query_status(query_id):
     """Get query status"""
     query = Query.query.get_or_404(query_id)
     
-    if query.user_id != session['user_id']:
+    if query.user_id != session['user_id'] and not get_current_user().is_admin:
         return jsonify({'error': 'Unauthorized'}), 403
     
     return jsonify({
@@ -1089,46 +2248,239 @@ def query_status(query_id):
     })
 
 
-@app.route('/api/statistics')
+@app.route('/api/query/<int:query_id>/cancel', methods=['POST'])
 @login_required
-def get_statistics():
-    """Get user statistics"""
-    user = User.query.get(session['user_id'])
+def cancel_query(query_id):
+    """Cancel a queued or running query and free its worker slot"""
+    query = Query.query.get_or_404(query_id)
+    
+    if query.user_id != session['user_id'] and not get_current_user().is_admin:
+        return jsonify({'error': 'Unauthorized'}), 403
     
-    total_queries = Query.query.filter_by(user_id=user.id).count()
-    completed_queries = Query.query.filter_by(user_id=user.id, status='completed').count()
-    failed_queries = Query.query.filter_by(user_id=user.id, status='failed').count()
+    if query.status != 'processing':
+        return jsonify({'error': f'Query is already {query.status}'}), 400
     
-    task_breakdown = {}
-    for query in Query.query.filter_by(user_id=user.id).all():
-        task = query.task_type
-        task_breakdown[task] = task_breakdown.get(task, 0) + 1
+    # Conditional update: a worker may finish the query between the check
+    # above and this write, and its result must not be overwritten
+    if not update_query_status(query.id, 'processing', {
+        'status': 'cancelled',
+        'error_message': 'Cancelled by user'
+    }):
+        db.session.rollback()
+        db.session.refresh(query)
+        return jsonify({'error': f'Query is already {query.status}'}), 409
+    db.session.commit()
+    
+    result = query_scheduler.cancel(query.id)
+    QueryJob.finish(query.id, 'cancelled')
     
     return jsonify({
-        'total_queries': total_queries,
-        'completed_queries': completed_queries,
-        'failed_queries': failed_queries,
-        'task_breakdown': task_breakdown
+        'status': 'cancelled',
+        'query_id': query.id,
+        'was': result or 'not_scheduled'
     })
 
 
+# ============================================================
+# BATCH ROUTES
+# ============================================================
+
+@app.route('/api/batch', methods=['POST'])
+@login_required
+def create_batch():
+    """Submit a list of queries in one request"""
+    data = request.get_json() or {}
+    raw_queries = data.get('queries')
+    
+    if not isinstance(raw_queries, list):
+        return jsonify({'error': 'queries must be a list of strings'}), 400
+    
+    query_texts = [q.strip() for q in raw_queries if isinstance(q, str) and q.strip()]
+    use_cache = semantic_cache.mode == 'return' and not data.get('bypass_cache')
+    
+    if not query_texts:
+        return jsonify({'error': 'Batch must contain at least one non-empty query'}), 400
+    
+    max_batch_size = app.config['MAX_BATCH_SIZE']
+    if len(query_texts) > max_batch_size:
+        return jsonify({'error': f'Batch cannot contain more than {max_batch_size} queries'}), 400
+    
+    priority = data.get('priority', 'batch')
+    if priority not in ('normal', 'batch'):
+        return jsonify({'error': 'Batch priority must be normal or batch'}), 400
+    
+    user_id = session['user_id']
+    from table_generator import TableDetector
+    detector = TableDetector()
+    
+    try:
+        batch = QueryBatch(
+            user_id=user_id,
+            name=(data.get('name') or '').strip()[:200] or None,
+            total_queries=len(query_texts)
+        )
+        db.session.add(batch)
+        
+        queries = []
+        pending = []
+        for query_text in query_texts:
+            cached = find_cached_answer(query_text, user_id) if use_cache else None
+            is_comparison, confidence = detector.detect_comparison_question(query_text)
+            query = Query(
+                user_id=user_id,
+                query_text=query_text,
+                task_type=detect_task_type(query_text),
+                status='processing',
+                is_comparison_query=is_comparison,
+                comparison_confidence=confidence,
+                priority=priority,
+                batch=batch
+            )
+            
+            if cached:
+                query.copy_answer_from(cached[0])
+            else:
+                pending.append(query)
+            queries.append(query)
+        
+        db.session.add_all(queries)
+        for query in pending:
+            QueryJob.enqueue(query, role=current_role())
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Error creating batch: {str(e)}'}), 500
+    
+    role = current_role()
+    for query in pending:
+        schedule_query(query.id, query.query_text, user_id, role=role, priority=priority)
+    
+    return jsonify({
+        'batch_id': batch.id,
+        'query_ids': [query.id for query in queries],
+        'total': len(queries),
+        'cached': len(queries) - len(pending)
+    }), 201
+
+
+def get_owned_batch(batch_id):
+    """Load a batch, returning None if the current user may not see it"""
+    batch = QueryBatch.query.get_or_404(batch_id)
+    if batch.user_id != session['user_id'] and not get_current_user().is_admin:
+        return None
+    return batch
+
+
+@app.route('/api/batch/<int:batch_id>')
+@login_required
+def batch_status(batch_id):
+    """Get aggregate progress for a batch"""
+    batch = get_owned_batch(batch_id)
+    if batch is None:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    progress = batch.get_progress()
+    progress['name'] = batch.name
+    progress['created_at'] = batch.created_at.isoformat()
+    return jsonify(progress)
+
+
+@app.route('/api/batch/<int:batch_id>/download')
+@login_required
+def download_batch(batch_id):
+    """Download the combined results of a batch as JSON or TXT"""
+    batch = get_owned_batch(batch_id)
+    if batch is None:
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    export_format = request.args.get('format', 'json')
+    queries = batch.queries.order_by(Query.id).all()
+    
+    if export_format == 'json':
+        export_data = {
+            'batch_id': batch.id,
+            'name': batch.name,
+            'created_at': batch.created_at.isoformat(),
+            'progress': batch.get_progress(),
+            'results': [{
+                'query_id': query.id,
+                'query': query.query_text,
+                'task_type': query.task_type,
+                'status': query.status,
+                'response': query.response,
+                'error_message': query.error_message,
+                'execution_time': query.execution_time
+            } for query in queries]
+        }
+        return send_file(
+            io.BytesIO(json.dumps(export_data, indent=2).encode('utf-8')),
+            mimetype='application/json',
+            as_attachment=True,
+            download_name=f'batch_{batch.id}.json'
+        )
+    
+    if export_format == 'txt':
+        sections = [f"AI RESEARCH AGENT - BATCH {batch.id} EXPORT\n====================================="]
+        for index, query in enumerate(queries, start=1):
+            sections.append(f"""[{index}/{len(queries)}] Query: {query.query_text}
+Task Type: {query.task_type}
+Status: {query.status}
+
+{query.response or query.error_message or 'No response available'}
+=====================================""")
+        return send_file(
+            io.BytesIO('\n\n'.join(sections).encode('utf-8')),
+            mimetype='text/plain',
+            as_attachment=True,
+            download_name=f'batch_{batch.id}.txt'
+        )
+    
+    return jsonify({'error': 'Invalid export format'}), 400
+
+
+@app.route('/api/scheduler/stats')
+@login_required
+def scheduler_stats():
+    """Queue depth and wait-time percentiles (all users for admins, own otherwise)"""
+    if get_current_user().is_admin:
+        return jsonify(query_scheduler.stats())
+    return jsonify(query_scheduler.user_stats(session['user_id']))
+
+
+@app.route('/api/statistics')
+@login_required
+def get_statistics():
+    """Get user statistics (from the materialized user_stats counters)"""
+    return jsonify(UserStats.for_user(get_current_user().id))
+
+
+@app.cli.command('rebuild-user-stats')
+def rebuild_user_stats_command():
+    """Recompute the materialized per-user statistics from the query table"""
+    rows = UserStats.rebuild()
+    click.echo(f"✅ Rebuilt user statistics ({rows} counter rows)")
+
+
 @app.route('/api/change-password', methods=['POST'])
 @login_required
 def change_password():
     """Change user password"""
-    user = User.query.get(session['user_id'])
+    user = db.session.get(User, get_current_user().id)
     data = request.get_json()
     
     current_password = data.get('currentPassword', '')
     new_password = data.get('newPassword', '')
     
-    if not user.check_password(current_password):
-        return jsonify({'error': 'Current password is incorrect'}), 400
-    
-    if len(new_password) < 6:
-        return jsonify({'error': 'New password must be at least 6 characters'}), 400
-    
-    user.set_password(new_password)
+    try:
+        if not user.check_password(current_password):
+            return jsonify({'error': 'Current password is incorrect'}), 400
+        
+        if len(new_password) < 6:
+            return jsonify({'error': 'New password must be at least 6 characters'}), 400
+        
+        user.set_password(new_password)
+    except HashingBusyError:
+        return jsonify({'error': 'The server is busy. Please try again in a moment.'}), 503
     db.session.commit()
     
     return jsonify({'success': True})
@@ -1322,11 +2674,18 @@ def search_knowledge_api():
 @admin_required
 def get_knowledge_categories():
     """Get all knowledge categories"""
-    categories = db.session.query(Knowledge.category).distinct().filter(
-        Knowledge.category.isnot(None)
-    ).all()
-    categories = [cat[0] for cat in categories]
-    return jsonify(categories)
+    # Edits bump updated_at, inserts bump max(id), deletes change the count
+    version = db.session.query(
+        db.func.count(Knowledge.id), db.func.max(Knowledge.id), db.func.max(Knowledge.updated_at)
+    ).one()
+    
+    def build():
+        categories = db.session.query(Knowledge.category).distinct().filter(
+            Knowledge.category.isnot(None)
+        ).all()
+        return jsonify([cat[0] for cat in categories])
+    
+    return conditional(content_etag('knowledge-categories', tuple(version)), build)
 
 
 @app.route('/api/knowledge/stats', methods=['GET'])
@@ -1354,6 +2713,282 @@ def get_knowledge_stats():
     })
 
 
+@app.route('/api/knowledge/import', methods=['POST'])
+@login_required
+@admin_required
+def import_knowledge_api():
+    """Bulk import knowledge from JSONL or CSV, upserting by title
+    
+    Accepts a multipart upload ("file") or a raw request body. The format
+    comes from ?format=jsonl|csv, else the file extension / content type.
+    The body is parsed as it streams in and written in batches.
+    """
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+        filename = (upload.filename or '').lower()
+        content_type = upload.mimetype or ''
+    else:
+        stream = request.stream
+        filename = ''
+        content_type = request.mimetype or ''
+    
+    import_format = request.args.get('format', '').lower()
+    if not import_format:
+        is_csv = filename.endswith('.csv') or content_type == 'text/csv'
+        import_format = 'csv' if is_csv else 'jsonl'
+    if import_format not in ('jsonl', 'csv'):
+        return jsonify({'error': 'Format must be jsonl or csv'}), 400
+    
+    text = knowledge_io.open_text(stream)
+    rows = knowledge_io.parse_csv(text) if import_format == 'csv' else knowledge_io.parse_jsonl(text)
+    
+    report = knowledge_io.import_knowledge(
+        db, Knowledge, rows,
+        created_by=session['user_id'],
+        batch_size=app.config['KNOWLEDGE_IMPORT_BATCH_SIZE']
+    )
+    
+    result = report.to_dict()
+    print(f"[KNOWLEDGE IMPORT] {result['inserted']} inserted, {result['updated']} updated, "
+          f"{result['error_count']} errors ({result['rows_per_second']} rows/s)")
+    return jsonify(result)
+
+
+@app.route('/api/knowledge/export', methods=['GET'])
+@login_required
+@admin_required
+def export_knowledge_api():
+    """Stream every knowledge entry as JSONL or CSV"""
+    export_format = request.args.get('format', 'jsonl').lower()
+    if export_format == 'csv':
+        body, mimetype = knowledge_io.export_csv(Knowledge), 'text/csv'
+    elif export_format == 'jsonl':
+        body, mimetype = knowledge_io.export_jsonl(Knowledge), 'application/x-ndjson'
+    else:
+        return jsonify({'error': 'Format must be jsonl or csv'}), 400
+    
+    filename = f"knowledge_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+# Documents are extracted in worker processes; results are written on one thread
+document_pool = ExtractionPool()
+
+
+def upload_directory():
+    path = os.path.join(app.instance_path, 'uploads')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def submit_document(upload):
+    """Queue a saved upload for extraction"""
+    upload_id = upload.id
+    document_pool.submit(
+        upload.stored_path,
+        upload.filename,
+        lambda result, error: finish_document_upload(upload_id, result, error)
+    )
+
+
+def finish_document_upload(upload_id, result, error):
+    """Insert the extracted chunks as Knowledge rows (runs on the writer thread)"""
+    with app.app_context():
+        upload = db.session.get(DocumentUpload, upload_id)
+        if not upload:
+            return
+        
+        try:
+            if error is not None:
+                raise error
+            
+            upload.status = 'inserting'
+            upload.chunks_total = len(result['chunks'])
+            db.session.commit()
+            
+            def chunk_records():
+                for index, chunk in enumerate(result['chunks'], start=1):
+                    record = {
+                        'title': chunk['title'],
+                        'content': chunk['content'],
+                        'description': f"From {upload.filename}"
+                    }
+                    if upload.category:
+                        record['category'] = upload.category
+                    yield index, record, None
+            
+            def record_progress(report):
+                DocumentUpload.query.filter_by(id=upload_id).update(
+                    {'chunks_inserted': report.inserted + report.updated})
+                db.session.commit()
+            
+            report = knowledge_io.import_knowledge(
+                db, Knowledge, chunk_records(),
+                created_by=upload.created_by,
+                batch_size=50,
+                on_batch=record_progress
+            )
+            
+            upload.status = 'completed'
+            upload.chunks_inserted = report.inserted + report.updated
+            print(f"[DOCUMENT UPLOAD] {upload.filename}: {report.inserted} inserted, {report.updated} updated")
+        except Exception as e:
+            db.session.rollback()
+            upload = db.session.get(DocumentUpload, upload_id)
+            upload.status = 'failed'
+            upload.error_message = str(e)
+            print(f"[DOCUMENT UPLOAD ERROR] {upload.filename}: {str(e)}")
+        
+        upload.completed_at = datetime.utcnow()
+        if upload.stored_path and os.path.exists(upload.stored_path):
+            os.remove(upload.stored_path)
+        upload.stored_path = None
+        db.session.commit()
+
+
+def resume_document_uploads():
+    """
+    Requeue uploads interrupted by a restart; fail those whose file is gone
+    
+    Every web process calls this at startup, so each upload is claimed with a
+    conditional update first and only the process that wins resumes it.
+    Uploads owned by a sibling process that is still running are left alone.
+    """
+    with app.app_context():
+        pending = DocumentUpload.query.filter(
+            DocumentUpload.status.in_(['queued', 'inserting'])
+        ).all()
+        resumed = 0
+        for upload in pending:
+            if owner_alive(upload.owner) or not DocumentUpload.claim(upload):
+                continue
+            db.session.refresh(upload)
+            if upload.stored_path and os.path.exists(upload.stored_path):
+                submit_document(upload)
+                resumed += 1
+            else:
+                upload.status = 'failed'
+                upload.error_message = 'Upload was interrupted and the file is no longer available'
+                upload.completed_at = datetime.utcnow()
+                db.session.commit()
+        if resumed:
+            print(f"[DOCUMENT UPLOAD] Resumed {resumed} interrupted uploads")
+
+
+@app.route('/api/knowledge/upload', methods=['POST'])
+@login_required
+@admin_required
+def upload_knowledge_documents():
+    """Queue uploaded DOCX/Markdown/TXT files for extraction into Knowledge entries"""
+    files = [f for f in request.files.getlist('files') if f and f.filename]
+    if not files:
+        return jsonify({'error': 'No files uploaded'}), 400
+    
+    category = request.form.get('category', '').strip() or None
+    max_bytes = app.config['MAX_DOCUMENT_UPLOAD_MB'] * 1024 * 1024
+    directory = upload_directory()
+    
+    uploads = []
+    rejected = []
+    for upload_file in files:
+        filename = os.path.basename(upload_file.filename)
+        if not document_kind(filename):
+            rejected.append({'filename': filename,
+                             'error': f"Supported types: {', '.join(sorted(SUPPORTED_EXTENSIONS))}"})
+            continue
+        
+        # The parser spooled the part to a temporary file; measure it there
+        # so oversized files never reach the upload directory
+        upload_file.stream.seek(0, os.SEEK_END)
+        size_bytes = upload_file.stream.tell()
+        upload_file.stream.seek(0)
+        if size_bytes > max_bytes:
+            rejected.append({'filename': filename,
+                             'error': f"File exceeds {app.config['MAX_DOCUMENT_UPLOAD_MB']} MB"})
+            continue
+        
+        upload = DocumentUpload(filename=filename, category=category, created_by=session['user_id'],
+                                owner=WORKER_ID)
+        db.session.add(upload)
+        db.session.flush()
+        
+        upload.stored_path = os.path.join(directory, f"{upload.id}{os.path.splitext(filename)[1].lower()}")
+        upload_file.save(upload.stored_path)
+        upload.size_bytes = size_bytes
+        uploads.append(upload)
+    
+    db.session.commit()
+    for upload in uploads:
+        submit_document(upload)
+    
+    return jsonify({
+        'uploads': [upload.to_dict() for upload in uploads],
+        'rejected': rejected
+    }), 202 if uploads else 400
+
+
+@app.route('/api/knowledge/uploads', methods=['GET'])
+@login_required
+@admin_required
+def knowledge_upload_status():
+    """Per-file progress for document uploads (?ids=1,2,3, default: latest 20)"""
+    ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip().isdigit()]
+    query = DocumentUpload.query
+    if ids:
+        query = query.filter(DocumentUpload.id.in_(ids))
+    uploads = query.order_by(DocumentUpload.id.desc()).limit(100 if ids else 20).all()
+    
+    return jsonify({
+        'uploads': [upload.to_dict() for upload in uploads],
+        'done': all(upload.status in ('completed', 'failed') for upload in uploads)
+    })
+
+
+@app.cli.command('import-knowledge')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'import_format', type=click.Choice(['jsonl', 'csv']),
+              help='Defaults to the file extension')
+@click.option('--batch-size', default=None, type=int, help='Rows per batch')
+def import_knowledge_command(path, import_format, batch_size):
+    """Bulk import knowledge entries from a JSONL or CSV file"""
+    import_format = import_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    with open(path, 'rb') as f:
+        text = knowledge_io.open_text(f)
+        rows = knowledge_io.parse_csv(text) if import_format == 'csv' else knowledge_io.parse_jsonl(text)
+        report = knowledge_io.import_knowledge(
+            db, Knowledge, rows,
+            batch_size=batch_size or app.config['KNOWLEDGE_IMPORT_BATCH_SIZE']
+        )
+    
+    result = report.to_dict()
+    for error in result['errors']:
+        click.echo(f"  line {error['line']}: {error['error']}", err=True)
+    if result['errors_truncated']:
+        click.echo(f"  ... {result['error_count'] - len(result['errors'])} more errors", err=True)
+    click.echo(f"✅ {result['inserted']} inserted, {result['updated']} updated, "
+               f"{result['error_count']} errors in {result['seconds']}s "
+               f"({result['rows_per_second']} rows/s)")
+
+
+@app.cli.command('export-knowledge')
+@click.argument('path', type=click.Path(dir_okay=False))
+@click.option('--format', 'export_format', type=click.Choice(['jsonl', 'csv']),
+              help='Defaults to the file extension')
+def export_knowledge_command(path, export_format):
+    """Export all knowledge entries to a JSONL or CSV file"""
+    export_format = export_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    body = knowledge_io.export_csv(Knowledge) if export_format == 'csv' else knowledge_io.export_jsonl(Knowledge)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in body:
+            f.write(chunk)
+    click.echo(f"✅ Exported knowledge to {path}")
+
+
 # ============================================================
 # EXPORT ROUTES
 # ============================================================
@@ -1364,19 +2999,22 @@ def export_query(query_id, format):
     """Export query to different formats"""
     query = Query.query.get_or_404(query_id)
     
-    if query.user_id != session['user_id']:
+    if query.user_id != session['user_id'] and not get_current_user().is_admin:
         flash('You do not have access to this query', 'error')
         return redirect(url_for('history'))
     
-    if format == 'txt':
-        return export_to_txt(query)
-    elif format == 'pdf':
-        return export_to_pdf(query)
-    elif format == 'doc':
-        return export_to_doc(query)
-    else:
+    exporters = {'txt': export_to_txt, 'pdf': export_to_pdf, 'doc': export_to_doc}
+    if format not in exporters:
         flash('Invalid export format', 'error')
         return redirect(url_for('view_query', query_id=query_id))
+    
+    # PDF and DOCX embed the time they were built, so rebuilding the same
+    # query gives different bytes: only a weak validator is honest for them
+    return conditional(
+        content_etag('export', EXPORT_VERSION, format, row_version(query)),
+        lambda: exporters[format](query),
+        weak=format in ('pdf', 'doc')
+    )
 
 
 def export_to_txt(query):
@@ -1417,48 +3055,50 @@ TOOLS USED
 
 
 def export_to_pdf(query):
-    """Export query to PDF format"""
+    """Export query to PDF format, rendering the markdown answer block by block"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    from reportlab.lib.units import inch
+    from pdf_export import escape, get_styles, markdown_flowables
+    
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
     story = []
-    styles = getSampleStyleSheet()
+    styles = get_styles()
     
     # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-    )
-    story.append(Paragraph("AI Research Agent - Query Export", title_style))
+    story.append(Paragraph("AI Research Agent - Query Export", styles['title']))
     story.append(Spacer(1, 0.2*inch))
     
     # Query info
-    info_style = styles['Normal']
+    info_style = styles['body']
     execution_str = f"{query.execution_time:.2f} seconds" if query.execution_time else "N/A"
     
-    story.append(Paragraph(f"<b>Query:</b> {query.query_text}", info_style))
-    story.append(Paragraph(f"<b>Task Type:</b> {query.task_type}", info_style))
-    story.append(Paragraph(f"<b>Status:</b> {query.status}", info_style))
+    story.append(Paragraph(f"<b>Query:</b> {escape(query.query_text)}", info_style))
+    story.append(Paragraph(f"<b>Task Type:</b> {escape(query.task_type)}", info_style))
+    story.append(Paragraph(f"<b>Status:</b> {escape(query.status)}", info_style))
     story.append(Paragraph(f"<b>Created:</b> {query.created_at.strftime('%Y-%m-%d %H:%M:%S')}", info_style))
     story.append(Paragraph(f"<b>Execution Time:</b> {execution_str}", info_style))
     story.append(Spacer(1, 0.3*inch))
     
     # Response
-    story.append(Paragraph("<b>Response</b>", styles['Heading2']))
-    story.append(Paragraph(query.response or "No response available", info_style))
+    story.append(Paragraph("<b>Response</b>", styles['section']))
+    if query.response:
+        story.extend(markdown_flowables(query.response, doc.width))
+    else:
+        story.append(Paragraph("No response available", info_style))
     story.append(Spacer(1, 0.2*inch))
     
     # Reasoning
     if query.reasoning:
         story.append(PageBreak())
-        story.append(Paragraph("<b>Reasoning Process</b>", styles['Heading2']))
-        story.append(Paragraph(query.reasoning, info_style))
+        story.append(Paragraph("<b>Reasoning Process</b>", styles['section']))
+        story.extend(markdown_flowables(query.reasoning, doc.width))
     
     # Tools
     if query.tools_used:
         story.append(Spacer(1, 0.2*inch))
-        story.append(Paragraph(f"<b>Tools Used:</b> {query.tools_used}", info_style))
+        story.append(Paragraph(f"<b>Tools Used:</b> {escape(query.tools_used)}", info_style))
     
     doc.build(story)
     buffer.seek(0)
@@ -1531,6 +3171,28 @@ def export_to_doc(query):
         return redirect(url_for('view_query', query_id=query.id))
 
 
+# ============================================================
+# STATIC ASSETS
+# ============================================================
+
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Serve a content-hashed static file with a one-year immutable lifetime"""
+    path, current = assets.resolve(filename)
+    if path is None:
+        return not_found(None)
+    if not current:
+        # A page rendered before a deploy asked for the old version
+        response = redirect(assets.url(path))
+        response.cache_control.no_store = True
+        return response
+    
+    response = send_from_directory(app.static_folder, path, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
 # ============================================================
 # ERROR HANDLERS
 # ============================================================
@@ -1541,6 +3203,15 @@ def not_found(error):
     return render_template('error.html', error='Page not found'), 404
 
 
+@app.errorhandler(413)
+def request_too_large(error):
+    """413 error handler (request body over MAX_CONTENT_LENGTH)"""
+    message = f"Request exceeds {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)} MB"
+    if request.path.startswith('/api/'):
+        return jsonify({'error': message}), 413
+    return render_template('error.html', error=message), 413
+
+
 @app.errorhandler(500)
 def server_error(error):
     """500 error handler"""
@@ -1551,10 +3222,87 @@ def server_error(error):
 # DATABASE INITIALIZATION
 # ============================================================
 
+def upgrade_schema():
+    """Add columns introduced after a table was first created.
+    
+    db.create_all() only creates missing tables, so nullable columns added to
+    existing models are appended here with ALTER TABLE.
+    """
+    inspector = db.inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                conn.execute(db.text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                print(f"✅ Added column {table.name}.{column.name}")
+            
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def rebuild_semantic_cache():
+    """Re-index every completed, non-cached query in the semantic cache"""
+    with app.app_context():
+        rows = db.session.query(Query.id, Query.user_id, Query.query_text)\
+            .filter(Query.status == 'completed', Query.cached_from_id.is_(None))\
+            .order_by(Query.id).all()
+        semantic_cache.rebuild(rows)
+    print(f"✅ Semantic cache indexed {len(rows)} queries")
+
+
+def configure_app(config=None):
+    """Apply config overrides to the module-level app and return it
+    
+    Used by run.py, wsgi.py and worker.py. Routes, models, the scheduler and
+    caches are created when this module is imported (heavy dependencies load
+    on first use); there is one app per process.
+    
+    The database engine is built at import time from DATABASE_URL and cannot
+    be swapped afterwards: SQLALCHEMY_* overrides that differ from the current
+    settings are rejected. Set DATABASE_URL before importing app instead.
+    
+    Args:
+        config: Optional dict of Flask config overrides
+    
+    Returns:
+        The Flask application
+    
+    Raises:
+        ValueError: If config changes a SQLALCHEMY_* engine setting
+    """
+    if config:
+        changed = sorted(key for key, value in config.items()
+                         if key.startswith('SQLALCHEMY_') and app.config.get(key) != value)
+        if changed:
+            raise ValueError(f"Database settings are fixed at import time and cannot be overridden: "
+                             f"{', '.join(changed)} (set DATABASE_URL before importing app)")
+        app.config.update(config)
+    return app
+
+
 def init_db():
     """Initialize database"""
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+        
+        # Full-text index over completed queries (SQLite FTS5; other databases use LIKE)
+        with db.engine.begin() as conn:
+            indexed = query_search.install(conn)
+        if indexed:
+            print(f"✅ Query search index built ({indexed} queries)")
+        
+        # Backfill the statistics table the first time it exists next to old queries
+        if UserStats.query.first() is None and Query.query.first() is not None:
+            rows = UserStats.rebuild()
+            print(f"✅ User statistics built ({rows} counter rows)")
         
         # Create admin user if doesn't exist
         admin = User.query.filter_by(username='admin').first()
@@ -1564,8 +3312,13 @@ def init_db():
             db.session.add(admin)
             db.session.commit()
             print("✅ Admin user created: username=admin, password=admin123")
+    
+    if semantic_cache.enabled and not semantic_cache.exists():
+        rebuild_semantic_cache()
 
 
 if __name__ == '__main__':
     init_db()
+    recover_jobs()
+    resume_document_uploads()
     app.run(debug=True, port=5000)
\ No newline at end of file
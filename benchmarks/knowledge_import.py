@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Knowledge Import Benchmark
+Measures bulk import (insert and upsert passes) and export throughput in
+rows per second against a throwaway SQLite database
+
+Usage:
+    python benchmarks/knowledge_import.py [--rows 20000] [--batch-size 500]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_dataset(rows: int, seed: int = 42) -> str:
+    """Synthetic wiki articles as JSONL (about 2 KB of content each)"""
+    rng = random.Random(seed)
+    words = ['system', 'service', 'deploy', 'policy', 'customer', 'pipeline', 'latency',
+             'review', 'incident', 'roadmap', 'budget', 'release', 'metric', 'onboarding']
+    categories = ['Engineering', 'Product', 'HR', 'Sales', 'Operations', None]
+    lines = []
+    for i in range(rows):
+        content = ' '.join(rng.choice(words) for _ in range(300))
+        lines.append(json.dumps({
+            'title': f'Wiki article {i:06d}',
+            'category': rng.choice(categories),
+            'description': f'Internal article number {i}',
+            'content': content
+        }))
+    return '\n'.join(lines) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='knowledge_bench_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ.setdefault('SEMANTIC_CACHE_MODE', 'off')
+
+    from app import app, db, Knowledge
+    import knowledge_io
+
+    dataset = make_dataset(args.rows)
+    print(f"Dataset: {args.rows} rows, {len(dataset) / 1e6:.1f} MB, batch size {args.batch_size}")
+
+    with app.app_context():
+        db.create_all()
+
+        for label in ('insert', 'upsert'):
+            rows = knowledge_io.parse_jsonl(io.StringIO(dataset))
+            report = knowledge_io.import_knowledge(db, Knowledge, rows, batch_size=args.batch_size).to_dict()
+            print(f"  {label:<7} {report['inserted']:>6} inserted {report['updated']:>6} updated "
+                  f"{report['seconds']:>7.2f}s  {report['rows_per_second']:>10,.0f} rows/s")
+
+        started = time.perf_counter()
+        size = sum(len(chunk) for chunk in knowledge_io.export_jsonl(Knowledge))
+        elapsed = time.perf_counter() - started
+        print(f"  export  {Knowledge.query.count():>6} rows {size / 1e6:>9.1f} MB "
+              f"{elapsed:>7.2f}s  {args.rows / elapsed:>10,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+"""
+Load Test
+Drives N synthetic users through the app end to end: register and log in,
+submit questions through /api/execute-query, poll /api/query-status until
+the answer is ready (as the browser does), then open the query page. The
+LLM is the local mock provider (mock_llm.py) with configurable latency, so
+the numbers measure this deployment rather than OpenRouter.
+
+Reports throughput, failure rate and p50/p95/p99 latency per route, plus the
+end-to-end time from submit to answer, as JSON and HTML.
+
+By default the app runs in this process on a threaded server with a fresh
+SQLite database. --url sends the load to a running deployment instead;
+start that one with OPENROUTER_BASE_URL pointing at a mock provider.
+
+Usage:
+    python benchmarks/load_test.py --users 20 --queries 3 --llm-latency 2
+    python benchmarks/load_test.py --users 50 --ramp-up 10 --report results/50users
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --users 100
+"""
+
+import argparse
+import contextlib
+import html
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUESTIONS = [
+    "Compare Python and JavaScript for backend development",
+    "Summarize the main risks of moving our billing system to the cloud",
+    "What's the difference between iOS and Android in terms of security?",
+    "Draft an onboarding checklist for a new support engineer",
+    "Analyze the pros and cons of a four-day work week for a small startup",
+]
+
+# Route labels: URLs with ids are grouped under one template
+REGISTER = 'POST /register'
+LOGIN = 'POST /login'
+HOME = 'GET /'
+EXECUTE = 'POST /api/execute-query'
+STATUS = 'GET /api/query-status/<id>'
+DETAIL = 'GET /query/<id>'
+END_TO_END = 'query submit -> answer'
+
+# How many times a 503 with Retry-After (password hashing pool busy) is retried
+BUSY_RETRIES = 5
+
+
+class Recorder:
+    """
+    Thread-safe collection of (latency, ok, status) samples per route; status
+    is the HTTP code, or the final query status for END_TO_END
+    """
+
+    def __init__(self):
+        self._samples: Dict[str, List] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, route: str, seconds: float, ok: bool, status: Union[int, str, None]):
+        with self._lock:
+            self._samples[route].append((seconds, ok, status))
+
+    def routes(self) -> Dict[str, List]:
+        with self._lock:
+            return {route: list(samples) for route, samples in self._samples.items()}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List, duration: float) -> Dict:
+    latencies = sorted(seconds for seconds, _, _ in samples)
+    failures = sum(1 for _, ok, _ in samples if not ok)
+    statuses = Counter(str(status) if status is not None else 'error' for _, _, status in samples)
+    return {
+        'count': len(samples),
+        'failures': failures,
+        'failure_rate': round(failures / len(samples), 4) if samples else 0.0,
+        'throughput_rps': round(len(samples) / duration, 2) if duration else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        'statuses': dict(sorted(statuses.items())),
+    }
+
+
+class SyntheticUser:
+    """One browser session: its own cookies, running the scripted journey"""
+
+    def __init__(self, index: int, base_url: str, recorder: Recorder, args, run_id: str):
+        self.index = index
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.args = args
+        self.username = f'load_{run_id}_{index}'
+        self.password = 'load-test-password'
+        self.http = requests.Session()
+
+    def request(self, route: str, method: str, path: str, expect=(200,), **kwargs) -> Optional[requests.Response]:
+        """Send one request, record its latency and outcome; None on connection errors"""
+        kwargs.setdefault('timeout', self.args.request_timeout)
+        kwargs.setdefault('allow_redirects', False)
+        for attempt in range(BUSY_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                response = self.http.request(method, self.base_url + path, **kwargs)
+            except requests.RequestException:
+                self.recorder.add(route, time.perf_counter() - started, False, None)
+                return None
+            elapsed = time.perf_counter() - started
+            busy = response.status_code == 503 and 'Retry-After' in response.headers
+            self.recorder.add(route, elapsed, response.status_code in expect, response.status_code)
+            if not busy or attempt == BUSY_RETRIES:
+                return response
+            time.sleep(min(float(response.headers['Retry-After']), 5.0))
+        return response
+
+    def sign_in(self) -> bool:
+        credentials = {'username': self.username, 'password': self.password}
+        self.request(REGISTER, 'POST', '/register', expect=(302,),
+                     data=dict(credentials, confirm_password=self.password))
+        response = self.request(LOGIN, 'POST', '/login', expect=(302,), data=credentials)
+        if response is None or response.status_code != 302:
+            return False
+        self.request(HOME, 'GET', '/')
+        return True
+
+    def ask(self, number: int):
+        """Submit one question, poll until it finishes, then open its page"""
+        question = f"{QUESTIONS[(self.index + number) % len(QUESTIONS)]} (load test user {self.index}, #{number})"
+        submitted = time.perf_counter()
+        response = self.request(EXECUTE, 'POST', '/api/execute-query',
+                                json={'query': question, 'bypass_cache': True})
+        if response is None or response.status_code != 200:
+            return
+        query_id = response.json()['query_id']
+
+        status = 'processing'
+        deadline = submitted + self.args.query_timeout
+        while status == 'processing' and time.perf_counter() < deadline:
+            time.sleep(self.args.poll_interval)
+            response = self.request(STATUS, 'GET', f'/api/query-status/{query_id}')
+            if response is not None and response.status_code == 200:
+                status = response.json()['status']
+        self.recorder.add(END_TO_END, time.perf_counter() - submitted, status == 'completed', status)
+
+        self.request(DETAIL, 'GET', f'/query/{query_id}')
+
+    def run(self):
+        if not self.sign_in():
+            return
+        for number in range(self.args.queries):
+            self.ask(number)
+            if self.args.think_time:
+                time.sleep(self.args.think_time)
+
+
+def start_local_app(args):
+    """Start the mock LLM and the app on background threads; returns (base URL, mock, server)"""
+    from mock_llm import FaultConfig, MockLLMServer
+
+    workdir = tempfile.mkdtemp(prefix='load_test_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'load.db')
+    os.environ.setdefault('SEMANTIC_CACHE_MODE', 'off')
+
+    mock = MockLLMServer(faults=FaultConfig(
+        latency=args.llm_latency, jitter=args.llm_jitter,
+        error_rate=args.llm_error_rate, response_size=args.response_size
+    )).start()
+    os.environ['OPENROUTER_BASE_URL'] = mock.base_url
+
+    from werkzeug.serving import make_server
+    from app import app, init_db
+
+    init_db()
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='load-test-app', daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', mock, server
+
+
+def run_load(base_url: str, args) -> Dict:
+    """Run every synthetic user to completion and return the report"""
+    recorder = Recorder()
+    run_id = datetime.utcnow().strftime('%H%M%S%f')
+    users = [SyntheticUser(i, base_url, recorder, args, run_id) for i in range(args.users)]
+    threads = []
+
+    started_at = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+    started = time.perf_counter()
+    for i, user in enumerate(users):
+        thread = threading.Thread(target=user.run, name=f'load-user-{i}', daemon=True)
+        thread.start()
+        threads.append(thread)
+        if args.ramp_up and i < len(users) - 1:
+            time.sleep(args.ramp_up / len(users))
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    routes = recorder.routes()
+    http_samples = [sample for route, samples in routes.items() if route != END_TO_END for sample in samples]
+    completed = sum(1 for _, ok, _ in routes.get(END_TO_END, []) if ok)
+    return {
+        'started_at': started_at,
+        'target': base_url,
+        'config': {key: value for key, value in vars(args).items() if key not in ('report', 'quiet')},
+        'duration_seconds': round(duration, 2),
+        'totals': dict(summarize(http_samples, duration),
+                       queries_submitted=args.users * args.queries,
+                       queries_completed=completed,
+                       queries_per_minute=round(completed / duration * 60, 1) if duration else 0.0),
+        'routes': {route: summarize(routes[route], duration)
+                   for route in (REGISTER, LOGIN, HOME, EXECUTE, STATUS, DETAIL, END_TO_END) if route in routes},
+    }
+
+
+def render_html(report: Dict) -> str:
+    columns = ['count', 'failure_rate', 'throughput_rps', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']
+    rows = []
+    for route, stats in report['routes'].items():
+        failing = ' class="failing"' if stats['failures'] else ''
+        cells = ''.join(f'<td>{stats[column]:.1%}</td>' if column == 'failure_rate' else f'<td>{stats[column]}</td>'
+                        for column in columns)
+        statuses = ', '.join(f'{code}: {count}' for code, count in stats['statuses'].items())
+        rows.append(f'<tr{failing}><th>{html.escape(route)}</th>{cells}<td>{html.escape(statuses)}</td></tr>')
+    totals = report['totals']
+    config = ''.join(f'<tr><th>{html.escape(key)}</th><td>{html.escape(str(value))}</td></tr>'
+                     for key, value in report['config'].items())
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Load test {html.escape(report['started_at'])}</title>
+<style>
+    body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif; margin: 2rem; color: #222; }}
+    table {{ border-collapse: collapse; margin-bottom: 2rem; }}
+    th, td {{ border: 1px solid #ddd; padding: 6px 10px; text-align: right; }}
+    th:first-child {{ text-align: left; }}
+    thead th {{ background: #f5f5f5; }}
+    tr.failing {{ background: #fdecea; }}
+    .summary span {{ display: inline-block; margin-right: 2rem; }}
+</style>
+</head>
+<body>
+<h1>Load test</h1>
+<p class="summary">
+    <span><strong>{report['config']['users']}</strong> users</span>
+    <span><strong>{report['duration_seconds']}</strong> s</span>
+    <span><strong>{totals['throughput_rps']}</strong> requests/s</span>
+    <span><strong>{totals['queries_completed']}/{totals['queries_submitted']}</strong> queries answered</span>
+    <span><strong>{totals['failure_rate']:.1%}</strong> failed requests</span>
+</p>
+<h2>Routes</h2>
+<table>
+<thead><tr><th>route</th>{''.join(f'<th>{column}</th>' for column in columns)}<th>statuses</th></tr></thead>
+<tbody>
+{chr(10).join(rows)}
+</tbody>
+</table>
+<h2>Configuration</h2>
+<table>{config}</table>
+<p>Target {html.escape(report['target'])}, started {html.escape(report['started_at'])}</p>
+</body>
+</html>
+"""
+
+
+def print_summary(report: Dict):
+    totals = report['totals']
+    print(f"{report['config']['users']} users x {report['config']['queries']} queries in "
+          f"{report['duration_seconds']} s: {totals['throughput_rps']} requests/s, "
+          f"{totals['queries_completed']}/{totals['queries_submitted']} answered "
+          f"({totals['queries_per_minute']}/min), {totals['failure_rate']:.1%} failed requests")
+    print(f"{'route':<30}{'count':>7}{'fail':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for route, stats in report['routes'].items():
+        print(f"{route:<30}{stats['count']:>7}{stats['failure_rate']:>7.1%}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='Load a running deployment instead of an in-process app')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent synthetic users')
+    parser.add_argument('--queries', type=int, default=2, help='Questions each user asks')
+    parser.add_argument('--ramp-up', type=float, default=0.0, help='Seconds over which users start')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Pause between a user\'s questions (seconds)')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Status polling interval (seconds)')
+    parser.add_argument('--query-timeout', type=float, default=120.0, help='Give up on an answer after this long')
+    parser.add_argument('--request-timeout', type=float, default=30.0, help='Per-request timeout (seconds)')
+    parser.add_argument('--llm-latency', type=float, default=1.0, help='Mock LLM response latency (seconds)')
+    parser.add_argument('--llm-jitter', type=float, default=0.0, help='Extra random mock LLM latency (seconds)')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help='Fraction of mock LLM calls that fail')
+    parser.add_argument('--response-size', type=int, default=2000, help='Mock answer size in characters')
+    parser.add_argument('--report', default='load_test_report', help='Report path without extension')
+    parser.add_argument('--quiet', action='store_true', help='Hide the in-process app\'s log output')
+    args = parser.parse_args()
+
+    mock = server = None
+    app_output = open(os.devnull, 'w') if args.quiet else sys.stdout
+    with contextlib.redirect_stdout(app_output):
+        if args.url:
+            base_url = args.url
+        else:
+            base_url, mock, server = start_local_app(args)
+        report = run_load(base_url, args)
+    if mock:
+        report['llm'] = {key: value for key, value in mock.faults.to_dict().items()
+                         if key in ('latency', 'jitter', 'error_rate', 'requests', 'failures')}
+        server.shutdown()
+        mock.stop()
+
+    directory = os.path.dirname(args.report)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.report + '.json', 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+    with open(args.report + '.html', 'w') as f:
+        f.write(render_html(report))
+
+    print_summary(report)
+    print(f"Report written to {args.report}.json and {args.report}.html")
+    return 1 if report['totals']['queries_completed'] < report['totals']['queries_submitted'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+"""
+Microbenchmark Suite
+Times the pure-Python hot paths (comparison detection, task typing, HTML
+table generation, markdown rendering, knowledge assembly, the exporters)
+and compares them with stored baselines. Exits non-zero if any case is
+slower than its baseline by more than the regression threshold and by more
+than a noise floor.
+
+Each case is sampled many times, and every sample is paired with a sample
+of a fixed reference workload taken just before it. Cases are compared by
+the median of case/reference ratios, so a machine that is busier or slower
+throughout the run (CPU frequency, neighbours on a shared host) does not
+read as a regression. The noise floor grows with the spread of the case's
+own samples, so long, jittery cases get a proportionally wider margin.
+
+Baselines are machine-specific: record them on the machine that runs the
+check (usually CI or the release box) with --save-baseline.
+
+Usage:
+    python benchmarks/microbench.py                   # compare with baselines
+    python benchmarks/microbench.py --save-baseline   # record new baselines
+    python benchmarks/microbench.py --filter markdown --threshold 0.5
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'microbench.json')
+
+# Allowed slowdown over baseline before a case counts as a regression (0.25 = 25%)
+DEFAULT_THRESHOLD = float(os.getenv('MICROBENCH_THRESHOLD', 0.25))
+
+# Slowdowns smaller than this (microseconds) are timer and scheduler noise,
+# whatever their percentage; protects the microsecond-scale cases
+DEFAULT_NOISE_FLOOR_US = float(os.getenv('MICROBENCH_NOISE_FLOOR_US', 5))
+
+# Slowdowns within this many median absolute deviations of the case's own
+# samples are noise too (the floor that scales with case duration)
+NOISE_MADS = 4
+
+# Samples per case, and the target wall time of one sample
+SAMPLES = int(os.getenv('MICROBENCH_SAMPLES', 25))
+SAMPLE_SECONDS = 0.02
+
+QUESTIONS = [
+    "Compare Python and JavaScript for backend development",
+    "What's the difference between iOS and Android in terms of security and app review?",
+    "Tell me about the history of artificial intelligence research in Europe",
+    "Pros and cons of remote work vs office work for a 50 person engineering team, "
+    "and which is better for onboarding junior developers",
+]
+
+TABLE_SIZES = [(2, 4), (3, 10), (5, 25), (10, 100)]
+MARKDOWN_SIZES_KB = [1, 5, 20, 50]
+COMPANY_SIZES_KB = [1, 10, 100]
+KNOWLEDGE_ENTRIES = [10, 100, 1000]
+EXPORT_ANSWER_KB = 10
+
+
+class Timing:
+    """Samples of one case: median seconds per call, and the median and MAD
+    of the per-sample case/reference ratio"""
+
+    def __init__(self, seconds: List[float], ratios: List[float]):
+        self.seconds = statistics.median(seconds)
+        self.relative = statistics.median(ratios)
+        self.relative_mad = statistics.median(abs(ratio - self.relative) for ratio in ratios)
+
+
+def reference_work() -> int:
+    """Fixed pure-Python workload (dicts, strings, ints) that tracks machine speed"""
+    counts = {}
+    total = 0
+    for i in range(2000):
+        key = i % 97
+        counts[key] = counts.get(key, 0) + i
+        total += len(str(i))
+    return total + len(counts)
+
+
+def _calls_per_sample(fn: Callable) -> int:
+    """Calls needed for one sample of about SAMPLE_SECONDS"""
+    # The first call pays for imports and caches; do not size samples from it
+    fn()
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= SAMPLE_SECONDS / 4 or number >= 1_000_000:
+            break
+        number *= 4
+    return max(1, int(number * SAMPLE_SECONDS / max(elapsed, 1e-9)))
+
+
+def _sample(fn: Callable, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return (time.perf_counter() - started) / number
+
+
+def time_call(fn: Callable, samples: int = SAMPLES) -> Timing:
+    """
+    Sample fn `samples` times, each sample paired with one of reference_work
+
+    The garbage collector is paused while timing (as timeit does) so a
+    collection triggered by earlier cases does not land on this one.
+    """
+    gc.collect()
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        number = _calls_per_sample(fn)
+        reference_number = _calls_per_sample(reference_work)
+        seconds, ratios = [], []
+        for _ in range(samples):
+            reference = _sample(reference_work, reference_number)
+            elapsed = _sample(fn, number)
+            seconds.append(elapsed)
+            ratios.append(elapsed / reference)
+        return Timing(seconds, ratios)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def iter_cases() -> Iterator[Tuple[str, Callable]]:
+    """
+    Yield (name, zero-argument callable) for every benchmark
+
+    Cases are timed as they are yielded, so fixtures that grow (the knowledge
+    table) are measured at each size before the next rows are added.
+    """
+    workdir = tempfile.mkdtemp(prefix='microbench_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ.setdefault('SEMANTIC_CACHE_MODE', 'off')
+
+    import app as web
+    from table_generator import TableDetector, HTMLTableGenerator
+    from response_compression import make_answer
+
+    detector = TableDetector()
+
+    def all_questions(fn):
+        return lambda: [fn(question) for question in QUESTIONS]
+
+    yield 'detect_comparison_question x4', all_questions(detector.detect_comparison_question)
+    yield 'get_detected_keywords x4', all_questions(detector.get_detected_keywords)
+    yield 'detect_task_type x4', all_questions(web.detect_task_type)
+
+    for items_count, attribute_count in TABLE_SIZES:
+        items = [f'Option {i}' for i in range(items_count)]
+        attributes = [f'Attribute {a}' for a in range(attribute_count)]
+        data = {item: {attribute: f'{item} / {attribute}' for attribute in attributes} for item in items}
+        yield (f'create_comparison_table {items_count}x{attribute_count}',
+               lambda items=items, attributes=attributes, data=data:
+                   HTMLTableGenerator.create_comparison_table('Benchmark', items, attributes, data))
+
+    for kb in MARKDOWN_SIZES_KB:
+        text = make_answer(kb)[:kb * 1024]
+        yield f'markdown_to_html {kb}KB', lambda text=text: web.markdown_to_html(text)
+
+    fields = ['company_description', 'about_company', 'products_services', 'team_info',
+              'company_culture', 'contact_info', 'custom_knowledge']
+    for kb in COMPANY_SIZES_KB:
+        text = make_answer(kb)
+        per_field = max(1, len(text) // len(fields))
+        company = web.CompanyInfo(company_name='Acme', **{
+            field: text[i * per_field:(i + 1) * per_field] for i, field in enumerate(fields)
+        })
+        yield f'get_full_knowledge {kb}KB', company.get_full_knowledge
+
+    web.init_db()
+    context = web.app.app_context()
+    context.push()
+    categories = ['Engineering', 'Product', 'HR', 'Sales', None]
+    article = make_answer(2)[:1500]
+    created = 0
+    for entries in KNOWLEDGE_ENTRIES:
+        web.db.session.execute(web.db.insert(web.Knowledge), [{
+            'title': f'Article {i}', 'category': categories[i % len(categories)],
+            'description': f'Synthetic entry {i}', 'content': article, 'is_active': True
+        } for i in range(created, entries)])
+        web.db.session.commit()
+        created = entries
+
+        def active_knowledge():
+            web.Knowledge.get_all_active_knowledge()
+            # Load from the database every time, as a request would
+            web.db.session.remove()
+        yield f'get_all_active_knowledge {entries} entries', active_knowledge
+
+    query = web.Query(id=1, user_id=1, query_text=QUESTIONS[3], response=make_answer(EXPORT_ANSWER_KB),
+                      reasoning=make_answer(2), status='completed', task_type='analysis',
+                      execution_time=12.5, created_at=datetime(2024, 1, 1), tools_used='search, research')
+    for name, exporter in (('txt', web.export_to_txt), ('pdf', web.export_to_pdf), ('doc', web.export_to_doc)):
+        def export(exporter=exporter):
+            with web.app.test_request_context():
+                response = exporter(query)
+                # send_file responses stream the buffer; read it like a client would
+                response.direct_passthrough = False
+                return response.get_data()
+        yield f'export_to_{name} {EXPORT_ANSWER_KB}KB', export
+
+    context.pop()
+
+
+def run(name_filter: str = '') -> Dict[str, Timing]:
+    """Timing of every case whose name contains name_filter"""
+    results = {}
+    for name, fn in iter_cases():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = time_call(fn)
+    return results
+
+
+def format_seconds(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f'{seconds * 1e3:9.2f} ms'
+    return f'{seconds * 1e6:9.1f} us'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed slowdown, e.g. 0.25 for 25%% (MICROBENCH_THRESHOLD)')
+    parser.add_argument('--noise-floor', type=float, default=DEFAULT_NOISE_FLOOR_US,
+                        help='Ignore slowdowns under this many microseconds (MICROBENCH_NOISE_FLOOR_US)')
+    parser.add_argument('--filter', default='', help='Only run cases whose name contains this')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline file')
+    args = parser.parse_args()
+
+    results = run(args.filter)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('results', {})
+
+    regressions = []
+    # change compares case/reference ratios, so it is adjusted for machine speed
+    print(f"{'case':<44}{'time':>12}{'baseline':>14}{'change':>9}")
+    for name, timing in results.items():
+        reference = baseline.get(name)
+        if not isinstance(reference, dict):
+            print(f"{name:<44}{format_seconds(timing.seconds):>12}{'-':>14}{'':>9}")
+            continue
+        change = timing.relative / reference['relative'] - 1
+        # Seconds of this run's reference workload, to turn ratios back into time
+        unit = timing.seconds / timing.relative
+        slowdown_us = (timing.relative - reference['relative']) * unit * 1e6
+        floor_us = max(args.noise_floor, NOISE_MADS * timing.relative_mad * unit * 1e6)
+        flag = ''
+        if change > args.threshold and slowdown_us > floor_us:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<44}{format_seconds(timing.seconds):>12}{format_seconds(reference['seconds']):>14}"
+              f"{change:>+8.0%}{flag}")
+
+    if args.save_baseline:
+        merged = dict(baseline, **{name: {'seconds': timing.seconds, 'relative': timing.relative}
+                                   for name, timing in results.items()})
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'processor': platform.processor() or platform.machine()},
+                'recorded_at': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'samples': SAMPLES,
+                'results': dict(sorted(merged.items()))
+            }, f, indent=2)
+            f.write('\n')
+        print(f"Baseline saved to {os.path.relpath(args.baseline)}")
+        return 0
+
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%} "
+              f"and the noise floor (at least {args.noise_floor:g} us)")
+        return 1
+    if baseline:
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Password Hashing Benchmark
+Logins per second per core for several hashing policies, the throughput of
+the bounded hashing executor, and end-to-end POST /login on one core
+
+Usage:
+    python benchmarks/password_hashing.py [--seconds 3] [--methods pbkdf2:sha256:600000,...]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+]
+
+
+def rate(fn, seconds: float) -> float:
+    """Calls of fn per second on the calling thread"""
+    calls = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - started)
+
+
+def executor_rate(executor, password_hash: str, password: str, clients: int, seconds: float) -> float:
+    """Verifications per second through the executor with `clients` concurrent callers"""
+    from password_security import HashingBusyError
+
+    done = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        while time.perf_counter() < deadline:
+            try:
+                executor.check_password(password_hash, password)
+            except HashingBusyError:
+                continue
+            with lock:
+                done[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return done[0] / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--methods', default=','.join(DEFAULT_METHODS))
+    args = parser.parse_args()
+
+    from werkzeug.security import check_password_hash, generate_password_hash
+    from password_security import HashingExecutor
+
+    password = 'correct horse battery staple'
+    print(f"CPU cores: {os.cpu_count()}")
+    print(f"{'method':<24} {'ms/login':>9} {'logins/s/core':>14}")
+    for method in args.methods.split(','):
+        stored = generate_password_hash(password, method=method)
+        per_second = rate(lambda: check_password_hash(stored, password), args.seconds)
+        print(f"{method:<24} {1000 / per_second:>9.1f} {per_second:>14.1f}")
+
+    stored = generate_password_hash(password)
+    executor = HashingExecutor()
+    clients = executor.max_workers * 4
+    per_second = executor_rate(executor, stored, password, clients, args.seconds)
+    print(f"\nExecutor ({executor.max_workers} workers, {clients} concurrent clients): "
+          f"{per_second:.1f} logins/s, {per_second / executor.max_workers:.1f} per worker, "
+          f"{executor.rejected} rejected")
+
+    # End to end through the login view on one thread
+    workdir = tempfile.mkdtemp(prefix='password_bench_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ.setdefault('SEMANTIC_CACHE_MODE', 'off')
+    os.environ.setdefault('LOGIN_MAX_FAILURES_PER_IP', '1000000')
+
+    from app import app, db, User
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench')
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+
+    client = app.test_client()
+
+    def login():
+        response = client.post('/login', data={'username': 'bench', 'password': password})
+        assert response.status_code == 302, response.status_code
+        client.get('/logout')
+
+    per_second = rate(login, args.seconds)
+    print(f"POST /login (single thread, default policy): {1000 / per_second:.1f} ms, "
+          f"{per_second:.1f} logins/s/core")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+PDF Export Benchmark
+Times export_to_pdf on markdown answers from 1 KB to 100 KB and reports the
+time per KB, which should stay roughly flat if the export is linear. Also
+checks that answers full of '<', '&' and broken markup still export.
+
+Usage:
+    python benchmarks/pdf_export_scaling.py [--sizes 1,10,25,50,100] [--repeat 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from response_compression import make_answer  # noqa: E402
+
+# Text that the old single-Paragraph export could not parse
+HOSTILE = """# Results & <caveats>
+Revenue grew when price < $10 && churn > 5% <b>unclosed, see <https://example.com?a=1&b=2>
+- **bold *mixed** italic* item
+- `if a < b: return a & b`
+
+```
+for i in range(10): print("<tag>", i & 1)
+```
+
+| Metric | Value < limit |
+|---|---|
+| a&b | <script>alert(1)</script> |
+"""
+
+
+def export(web, query) -> bytes:
+    with web.app.test_request_context():
+        response = web.export_to_pdf(query)
+        response.direct_passthrough = False
+        return response.get_data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1,10,25,50,100', help='Answer sizes in KB')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='pdf_bench_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ.setdefault('SEMANTIC_CACHE_MODE', 'off')
+    import app as web
+
+    def make_query(response):
+        return web.Query(id=1, user_id=1, query_text='Benchmark <question> & answer', response=response,
+                         reasoning=make_answer(2), status='completed', task_type='analysis',
+                         execution_time=12.5, created_at=datetime(2024, 1, 1), tools_used='search')
+
+    pdf = export(web, make_query(HOSTILE))
+    print(f"Answer with raw <, & and broken markup: exported ({len(pdf):,} bytes)")
+
+    print(f"{'answer':>8}{'time':>12}{'per KB':>12}{'pdf size':>12}")
+    for kb in [int(size) for size in args.sizes.split(',')]:
+        query = make_query(make_answer(kb)[:kb * 1024])
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            pdf = export(web, query)
+            timings.append(time.perf_counter() - started)
+        best = min(timings)
+        print(f"{kb:>6} KB{best * 1000:>9.0f} ms{best * 1000 / kb:>9.1f} ms{len(pdf):>12,}")
+
+
+if __name__ == '__main__':
+    main()
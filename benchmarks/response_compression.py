@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Response Compression Benchmark
+Measures bytes on the wire for the largest pages, APIs and exports with
+identity, gzip and (if installed) brotli encoding, and the time the
+compression adds per response
+
+Usage:
+    python benchmarks/response_compression.py [--answer-kb 40] [--level 6] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_answer(kb: int, seed: int = 7) -> str:
+    """Markdown research answer of about `kb` KB with headings, lists and a table"""
+    rng = random.Random(seed)
+    words = ['market', 'revenue', 'growth', 'customer', 'platform', 'pricing', 'segment',
+             'retention', 'competitor', 'forecast', 'margin', 'adoption', 'regional', 'churn']
+    parts = []
+    section = 0
+    while sum(len(p) for p in parts) < kb * 1024:
+        section += 1
+        parts.append(f"## Section {section}\n")
+        parts.append(' '.join(rng.choice(words) for _ in range(120)) + '\n')
+        parts.append('\n'.join(f"- {rng.choice(words).title()}: {rng.randint(1, 99)}%" for _ in range(6)) + '\n')
+        parts.append('| Company | Revenue | Growth |\n|---|---|---|\n' + '\n'.join(
+            f"| {rng.choice(words).title()} Inc | ${rng.randint(10, 900)}M | {rng.randint(1, 40)}% |"
+            for _ in range(5)) + '\n')
+    return '\n'.join(parts)
+
+
+def fetch(client, url: str, encoding: str):
+    response = client.get(url, headers={'Accept-Encoding': encoding} if encoding else {})
+    body = response.get_data()
+    return response, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--answer-kb', type=int, default=40)
+    parser.add_argument('--level', type=int, default=6, help='gzip level')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='compression_bench_')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ.setdefault('SEMANTIC_CACHE_MODE', 'off')
+
+    from app import app, db, init_db, User, Query, CompanyInfo, Knowledge
+    import compression
+
+    app.config['COMPRESS_LEVEL'] = args.level
+    init_db()
+    answer = make_answer(args.answer_kb)
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        for i in range(40):
+            db.session.add(Query(user_id=admin.id, query_text=f'Research question {i} about market sizing',
+                                 response=answer, reasoning=answer[:4000], status='completed',
+                                 task_type='research'))
+        db.session.add(CompanyInfo(company_name='Acme', company_description=answer[:8000],
+                                   products_services=answer[8000:16000], custom_knowledge=answer[:12000]))
+        for i in range(200):
+            db.session.add(Knowledge(title=f'Article {i}', category='Engineering',
+                                     content=answer[:2000], created_by=admin.id))
+        db.session.commit()
+        query_id = Query.query.first().id
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+
+    urls = [
+        f'/query/{query_id}',
+        '/history',
+        '/admin/knowledge',
+        '/api/get-company-knowledge',
+        f'/export/query/{query_id}/txt',
+        '/api/knowledge/export?format=jsonl',
+        f'/export/query/{query_id}/pdf',
+    ]
+    encodings = [('identity', None), ('gzip', 'gzip')]
+    if compression.HAS_BROTLI:
+        encodings.append(('br', 'br'))
+    else:
+        print("brotli is not installed; measuring gzip only")
+
+    print(f"Answer {len(answer) / 1024:.0f} KB, gzip level {args.level}, "
+          f"min size {app.config['COMPRESS_MIN_SIZE']} B")
+    print(f"{'route':<40}" + ''.join(f"{label:>12}" for label, _ in encodings) + f"{'saved':>8}")
+    totals = {label: 0 for label, _ in encodings}
+    for url in urls:
+        sizes = {}
+        for label, header in encodings:
+            response, size = fetch(client, url, header)
+            sizes[label] = size
+            totals[label] += size
+        best = min(sizes.values())
+        saved = 1 - best / sizes['identity'] if sizes['identity'] else 0
+        print(f"{url:<40}" + ''.join(f"{sizes[label]:>12,}" for label, _ in encodings) + f"{saved:>8.0%}")
+    best = min(totals.values())
+    print(f"{'total':<40}" + ''.join(f"{totals[label]:>12,}" for label, _ in encodings)
+          + f"{1 - best / totals['identity']:>8.0%}")
+
+    # Added server time: the same page with and without compression
+    page = f'/query/{query_id}'
+    for label, header in encodings:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            fetch(client, page, header)
+        elapsed = (time.perf_counter() - started) / args.repeat
+        print(f"  {page} {label:<8} {elapsed * 1000:6.1f} ms per request")
+
+
+if __name__ == '__main__':
+    main()
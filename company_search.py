@@ -0,0 +1,194 @@
+"""
+Company Knowledge Search
+Precomputed lowercase inverted index over the CompanyInfo fields with
+multi-term AND/OR queries, match positions and highlighted snippets
+"""
+
+import html
+import math
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+
+# Searchable fields, their display labels and ranking weights
+FIELDS = [
+    ('company_name', 'Company Name', 3.0),
+    ('industry', 'Industry', 2.0),
+    ('company_description', 'Description', 2.0),
+    ('products_services', 'Products & Services', 1.5),
+    ('about_company', 'About Us', 1.0),
+    ('team_info', 'Team', 1.0),
+    ('company_culture', 'Culture', 1.0),
+    ('contact_info', 'Contact', 1.0),
+    ('website', 'Website', 1.0),
+    ('custom_knowledge', 'Additional Knowledge', 1.0),
+]
+
+SNIPPET_CHARS = 160
+MAX_POSITIONS = 20
+
+_WORD_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """Split text into (lowercase term, start, end) with offsets into the original"""
+    return [(match.group(0).lower(), match.start(), match.end()) for match in _WORD_PATTERN.finditer(text)]
+
+
+def parse_query(query: str, mode: str = 'and') -> Tuple[List[str], str]:
+    """
+    Parse a search string into terms and a combination mode
+
+    Terms are combined with AND unless mode is 'or' or the query contains
+    the keyword OR ("pricing OR discount"). An explicit AND keyword is ignored.
+
+    Returns:
+        (terms, mode)
+    """
+    terms = []
+    for word in query.split():
+        if word == 'OR':
+            mode = 'or'
+        elif word != 'AND':
+            terms.extend(term for term, _, _ in tokenize(word))
+    # Keep order, drop duplicates
+    return list(dict.fromkeys(terms)), ('or' if mode == 'or' else 'and')
+
+
+class CompanySearchIndex:
+    """
+    In-memory inverted index of one CompanyInfo row
+
+    Tagged with the row's updated_at, so callers can rebuild it cheaply when
+    another process saved a newer profile.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._texts: Dict[str, str] = {}
+        self._postings: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+        self._terms: List[str] = []
+        self._lock = threading.Lock()
+
+    def rebuild(self, company_info) -> None:
+        """Re-index all fields of a CompanyInfo row (None clears the index)"""
+        texts = {}
+        postings: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+        if company_info is not None:
+            for field, _, _ in FIELDS:
+                text = getattr(company_info, field) or ''
+                if not text.strip():
+                    continue
+                texts[field] = text
+                for term, start, end in tokenize(text):
+                    postings.setdefault(term, {}).setdefault(field, []).append((start, end))
+
+        with self._lock:
+            self._texts = texts
+            self._postings = postings
+            self._terms = sorted(postings)
+            self.version = company_info.updated_at if company_info is not None else None
+
+    def _lookup(self, term: str) -> Dict[str, List[Tuple[int, int]]]:
+        """Positions per field of every indexed word starting with term"""
+        matches: Dict[str, List[Tuple[int, int]]] = {}
+        index = bisect_left(self._terms, term)
+        while index < len(self._terms) and self._terms[index].startswith(term):
+            for field, positions in self._postings[self._terms[index]].items():
+                matches.setdefault(field, []).extend(positions)
+            index += 1
+        return matches
+
+    def search(self, query: str, mode: str = 'and', limit: int = 10) -> Dict:
+        """
+        Search the indexed fields
+
+        Each query term matches words that start with it ("engineer" finds
+        "engineering"). With AND a field must contain every term; with OR any.
+
+        Returns:
+            Dict with terms, mode and results (best first), each holding field,
+            label, score, match_count, positions [[start, end], ...] and an
+            HTML snippet with <mark> highlights
+        """
+        terms, mode = parse_query(query, mode)
+        if not terms:
+            return {'terms': [], 'mode': mode, 'results': []}
+
+        with self._lock:
+            texts = self._texts
+            per_term = [self._lookup(term) for term in terms]
+
+        results = []
+        for field, label, weight in FIELDS:
+            if field not in texts:
+                continue
+            hits = [matches.get(field, []) for matches in per_term]
+            matched_terms = sum(1 for positions in hits if positions)
+            if matched_terms == 0 or (mode == 'and' and matched_terms < len(terms)):
+                continue
+
+            positions = sorted(position for term_hits in hits for position in term_hits)
+            score = weight * sum(1 + math.log(len(term_hits)) for term_hits in hits if term_hits)
+            results.append({
+                'field': field,
+                'label': label,
+                'score': round(score, 3),
+                'match_count': len(positions),
+                'matched_terms': matched_terms,
+                'positions': [list(position) for position in positions[:MAX_POSITIONS]],
+                'snippet': make_snippet(texts[field], positions)
+            })
+
+        results.sort(key=lambda result: (-result['matched_terms'], -result['score']))
+        return {'terms': terms, 'mode': mode, 'results': results[:limit]}
+
+
+def make_snippet(text: str, positions: List[Tuple[int, int]], width: int = SNIPPET_CHARS) -> str:
+    """
+    Cut a window of about `width` characters around the densest run of
+    matches and wrap the matches in <mark> (text is HTML-escaped)
+    """
+    if not positions:
+        return html.escape(text[:width])
+
+    # Window start that covers the most matches
+    best_start, best_count = positions[0][0], 0
+    right = 0
+    for left in range(len(positions)):
+        while right < len(positions) and positions[right][1] - positions[left][0] <= width:
+            right += 1
+        if right - left > best_count:
+            best_start, best_count = positions[left][0], right - left
+
+    covered = [p for p in positions if p[0] >= best_start and p[1] <= best_start + width]
+    if not covered:
+        # Every match is longer than the window: show the start of the first one
+        first_start, first_end = positions[0]
+        covered = [(first_start, min(first_end, first_start + width))]
+    span = covered[-1][1] - best_start
+    start = max(0, best_start - (width - span) // 2)
+    end = min(len(text), start + width)
+    start = max(0, min(start, end - width))
+
+    # Snap to word boundaries
+    if start > 0:
+        space = text.find(' ', start, best_start)
+        start = space + 1 if space != -1 else start
+    if end < len(text):
+        space = text.rfind(' ', covered[-1][1], end)
+        end = space if space != -1 else end
+
+    parts = ['…' if start > 0 else '']
+    cursor = start
+    for match_start, match_end in covered:
+        if match_start < cursor or match_end > end:
+            continue
+        parts.append(html.escape(text[cursor:match_start]))
+        parts.append(f'<mark>{html.escape(text[match_start:match_end])}</mark>')
+        cursor = match_end
+    parts.append(html.escape(text[cursor:end]))
+    parts.append('…' if end < len(text) else '')
+    return ''.join(parts)
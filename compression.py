@@ -0,0 +1,187 @@
+"""
+Response Compression
+Accept-Encoding negotiation and gzip/brotli compression of text responses
+(HTML, JSON, CSS/JS, CSV/Markdown exports). Binary downloads such as
+PDF and DOCX are already compressed and are passed through unchanged.
+Brotli is used only when the `brotli` package is installed.
+"""
+
+import gzip
+import importlib.util
+import os
+import zlib
+from typing import Iterable, Iterator, Optional
+
+# Bodies smaller than this are sent as-is; headers would eat the savings
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+
+# gzip level 1-9 and brotli quality 0-11; the defaults favour speed
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/markdown',
+    'text/javascript', 'application/javascript', 'application/json',
+    'application/x-ndjson', 'application/xml', 'image/svg+xml',
+}
+
+HAS_BROTLI = importlib.util.find_spec('brotli') is not None
+
+_brotli_module = None
+
+
+def _brotli():
+    global _brotli_module
+    if _brotli_module is None:
+        import brotli
+        _brotli_module = brotli
+    return _brotli_module
+
+
+def supported_encodings():
+    """Encodings this process can produce, most preferred first"""
+    return ['br', 'gzip'] if HAS_BROTLI else ['gzip']
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the response encoding from an Accept-Encoding header
+
+    Args:
+        accept_encoding: Raw header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        'br', 'gzip' or None for identity
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported_encodings():
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str, level: int = COMPRESS_LEVEL,
+             quality: int = BROTLI_QUALITY) -> bytes:
+    """Compress a whole body"""
+    if encoding == 'br':
+        return _brotli().compress(data, quality=quality)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, level: int = COMPRESS_LEVEL,
+                    quality: int = BROTLI_QUALITY) -> Iterator[bytes]:
+    """
+    Compress a streamed body; output is emitted whenever the compressor's
+    window fills, so small chunks (one export row each) still compress well
+    """
+    try:
+        if encoding == 'br':
+            compressor = _brotli().Compressor(quality=quality)
+            feed, finish = compressor.process, compressor.finish
+        else:
+            compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            feed, finish = compressor.compress, compressor.flush
+        for chunk in chunks:
+            data = feed(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        # Release the file or generator the original response held
+        close = getattr(chunks, 'close', None)
+        if close:
+            close()
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of the encoded variant; each encoding is a different byte sequence"""
+    return f"{etag}-{encoding}"
+
+
+def matching_etag(if_none_match, etag: str) -> Optional[str]:
+    """
+    The variant of `etag` (identity or any encoding) the client already holds
+
+    Args:
+        if_none_match: The request's parsed If-None-Match header
+        etag: ETag of the identity representation
+
+    Returns:
+        The matching ETag to send back with a 304, or None
+    """
+    for candidate in [etag] + [encoded_etag(etag, encoding) for encoding in supported_encodings()]:
+        if if_none_match.contains_weak(candidate):
+            return candidate
+    return None
+
+
+def is_compressible(response) -> bool:
+    """True for text responses that have not been encoded already"""
+    return (response.mimetype in COMPRESSIBLE_TYPES
+            and 200 <= response.status_code < 300
+            and response.status_code not in (204, 206)
+            and 'Content-Encoding' not in response.headers)
+
+
+def compress_response(response, accept_encoding: Optional[str], min_size: int = COMPRESS_MIN_SIZE,
+                      level: int = COMPRESS_LEVEL, quality: int = BROTLI_QUALITY):
+    """
+    Compress a Flask/Werkzeug response in place if the client accepts it
+
+    Args:
+        response: Response about to be sent
+        accept_encoding: The request's Accept-Encoding header
+        min_size: Smallest body (bytes) worth compressing
+        level: gzip compression level
+        quality: brotli quality
+
+    Returns:
+        The same response
+    """
+    if not is_compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    if response.is_streamed or response.direct_passthrough:
+        # Exports and static files: compress as it streams, unless the
+        # length is known and too small to be worth it
+        if response.content_length is not None and response.content_length < min_size:
+            return response
+        source = response.response
+        response.direct_passthrough = False
+        response.response = compress_stream(source, encoding, level, quality)
+        response.headers.pop('Content-Length', None)
+        response.headers.pop('Accept-Ranges', None)
+    else:
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        response.set_data(compress(body, encoding, level, quality))
+
+    response.headers['Content-Encoding'] = encoding
+    # The encoded body differs byte for byte, so it gets its own validator
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak=weak)
+    return response
@@ -0,0 +1,264 @@
+"""
+Document Ingestion
+Extracts text from uploaded DOCX, Markdown and plain-text files and splits
+it into knowledge-sized chunks. Extraction runs in a process pool so large
+documents never occupy a request thread.
+"""
+
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+SUPPORTED_EXTENSIONS = {'.docx': 'docx', '.md': 'markdown', '.markdown': 'markdown', '.txt': 'text'}
+
+# Target size of one Knowledge row
+CHUNK_CHARS = int(os.getenv('DOC_CHUNK_CHARS', 4000))
+
+# Extraction processes
+INGEST_WORKERS = int(os.getenv('DOC_INGEST_WORKERS', min(4, os.cpu_count() or 1)))
+
+TITLE_MAX_LENGTH = 200
+
+_HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+
+
+def document_kind(filename: str) -> Optional[str]:
+    """Return 'docx', 'markdown' or 'text' for a supported filename, else None"""
+    return SUPPORTED_EXTENSIONS.get(os.path.splitext(filename.lower())[1])
+
+
+# ============================================================
+# EXTRACTION (runs in worker processes)
+# ============================================================
+
+def _docx_table_to_markdown(table) -> str:
+    rows = [[cell.text.strip().replace('\n', ' ').replace('|', '\\|') for cell in row.cells]
+            for row in table.rows]
+    if not rows:
+        return ''
+    width = max(len(row) for row in rows)
+    rows = [row + [''] * (width - len(row)) for row in rows]
+    lines = ['| ' + ' | '.join(rows[0]) + ' |', '|' + ' --- |' * width]
+    lines.extend('| ' + ' | '.join(row) + ' |' for row in rows[1:])
+    return '\n'.join(lines)
+
+
+def extract_docx(path: str) -> str:
+    """Convert a DOCX body to Markdown, keeping headings, lists and tables in order"""
+    from docx import Document
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = Document(path)
+    blocks = []
+    for element in document.element.body.iterchildren():
+        tag = element.tag.rsplit('}', 1)[-1]
+        if tag == 'tbl':
+            markdown_table = _docx_table_to_markdown(Table(element, document))
+            if markdown_table:
+                blocks.append(markdown_table)
+            continue
+        if tag != 'p':
+            continue
+
+        paragraph = Paragraph(element, document)
+        text = paragraph.text.strip()
+        if not text:
+            continue
+        style = (paragraph.style.name if paragraph.style is not None else '') or ''
+        if style == 'Title':
+            blocks.append(f'# {text}')
+        elif style.startswith('Heading'):
+            level = style.rsplit(' ', 1)[-1]
+            level = int(level) if level.isdigit() else 1
+            blocks.append(f"{'#' * min(level + 1, 6)} {text}")
+        elif style.startswith('List Number'):
+            blocks.append(f'1. {text}')
+        elif style.startswith('List'):
+            blocks.append(f'- {text}')
+        else:
+            blocks.append(text)
+    return '\n\n'.join(blocks)
+
+
+def extract_text(path: str, kind: str) -> str:
+    """Read a supported document as Markdown-ish text"""
+    if kind == 'docx':
+        return extract_docx(path)
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read().replace('\r\n', '\n')
+
+
+def _split_long(paragraph: str, limit: int) -> List[str]:
+    """Split an oversized paragraph at sentence, then word, boundaries"""
+    pieces = []
+    while len(paragraph) > limit:
+        cut = paragraph.rfind('. ', 0, limit)
+        if cut < limit // 2:
+            cut = paragraph.rfind(' ', 0, limit)
+        if cut < limit // 2:
+            cut = limit - 1
+        pieces.append(paragraph[:cut + 1].strip())
+        paragraph = paragraph[cut + 1:].strip()
+    if paragraph:
+        pieces.append(paragraph)
+    return pieces
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS) -> List[Tuple[Optional[str], str]]:
+    """
+    Split text into chunks of at most chunk_chars, preferring heading and
+    paragraph boundaries
+
+    Returns:
+        List of (section heading or None, chunk text)
+    """
+    sections = []
+    heading = None
+    paragraphs = []
+    for block in re.split(r'\n\s*\n', text):
+        block = block.strip()
+        if not block:
+            continue
+        match = _HEADING_PATTERN.match(block.split('\n', 1)[0])
+        if match and len(match.group(1)) <= 3:
+            if any(not _HEADING_PATTERN.match(p.split('\n', 1)[0]) for p in paragraphs):
+                sections.append((heading, paragraphs))
+                paragraphs = []
+            # A heading with no body of its own (e.g. the document title)
+            # stays attached to the next section
+            heading = match.group(2).strip()
+            paragraphs.append(block)
+        else:
+            paragraphs.append(block)
+    if paragraphs:
+        sections.append((heading, paragraphs))
+
+    chunks = []
+    for heading, paragraphs in sections:
+        current = ''
+        for paragraph in paragraphs:
+            for piece in _split_long(paragraph, chunk_chars):
+                if current and len(current) + len(piece) + 2 > chunk_chars:
+                    chunks.append((heading, current))
+                    current = piece
+                else:
+                    current = f'{current}\n\n{piece}' if current else piece
+        if current:
+            chunks.append((heading, current))
+    return chunks
+
+
+def _chunk_titles(document_title: str, chunks: List[Tuple[Optional[str], str]]) -> List[str]:
+    """Build unique Knowledge titles: 'Doc — Section', numbered when repeated"""
+    bases = []
+    for heading, _ in chunks:
+        base = document_title
+        if heading and heading.lower() != document_title.lower():
+            base = f'{document_title} — {heading}'
+        bases.append(base[:TITLE_MAX_LENGTH - 8])
+
+    totals = {}
+    for base in bases:
+        totals[base] = totals.get(base, 0) + 1
+
+    seen = {}
+    titles = []
+    for base in bases:
+        if totals[base] == 1:
+            titles.append(base)
+            continue
+        seen[base] = seen.get(base, 0) + 1
+        titles.append(f'{base} ({seen[base]}/{totals[base]})')
+    return titles
+
+
+def process_document(path: str, filename: str, chunk_chars: int = CHUNK_CHARS) -> Dict:
+    """
+    Extract and chunk one document (the process pool entry point)
+
+    Returns:
+        Dict with title, characters and chunks (list of {title, content})
+    """
+    kind = document_kind(filename)
+    if kind is None:
+        raise ValueError(f'Unsupported file type: {filename}')
+
+    text = extract_text(path, kind).strip()
+    if not text:
+        raise ValueError('No text found in document')
+
+    document_title = os.path.splitext(os.path.basename(filename))[0].replace('_', ' ').strip()
+    first_line = _HEADING_PATTERN.match(text.split('\n', 1)[0])
+    if first_line and len(first_line.group(1)) == 1:
+        document_title = first_line.group(2).strip()
+    document_title = document_title[:TITLE_MAX_LENGTH] or 'Untitled document'
+
+    chunks = chunk_text(text, chunk_chars)
+    titles = _chunk_titles(document_title, chunks)
+    return {
+        'title': document_title,
+        'characters': len(text),
+        'chunks': [{'title': title, 'content': content}
+                   for title, (_, content) in zip(titles, chunks)]
+    }
+
+
+# ============================================================
+# POOL
+# ============================================================
+
+class ExtractionPool:
+    """
+    Runs process_document in worker processes and hands each result to a
+    single writer thread, so database inserts are serialised and never run
+    on a request thread or the pool's result-handling thread
+    """
+
+    def __init__(self, max_workers: int = INGEST_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a threaded web server process is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='doc-ingest-writer')
+
+    def submit(self, path: str, filename: str, on_done: Callable, chunk_chars: int = CHUNK_CHARS):
+        """
+        Queue a document for extraction
+
+        Args:
+            path: Saved upload on local disk
+            filename: Original filename (determines the format)
+            on_done: Called on the writer thread as on_done(result, error)
+            chunk_chars: Target chunk size
+        """
+        self._ensure_started()
+        future = self._executor.submit(process_document, path, filename, chunk_chars)
+
+        def handle(done_future):
+            error = done_future.exception()
+            result = None if error else done_future.result()
+            self._writer.submit(on_done, result, error)
+
+        future.add_done_callback(handle)
+        return future
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._writer.shutdown(wait=wait)
+                self._executor = self._writer = None
@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration for the web tier
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Settings come from the environment: WEB_CONCURRENCY (processes),
+WEB_THREADS (threads per process), FLASK_HOST / FLASK_PORT and
+WEB_TIMEOUT.
+"""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+
+bind = f"{os.getenv('FLASK_HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', 5000)}"
+workers = int(os.getenv('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count() * 2)))
+threads = int(os.getenv('WEB_THREADS', 8))
+worker_class = 'gthread'
+timeout = int(os.getenv('WEB_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    """Create or upgrade the schema once, before any web worker starts
+    
+    Runs in a child interpreter so the master never imports the app (its
+    thread pools and DB connections must not be inherited across fork).
+    """
+    subprocess.run([sys.executable, '-c', 'from app import init_db; init_db()'],
+                   cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
@@ -0,0 +1,80 @@
+"""
+Durable Job Queue Support
+Lease settings and the background lease keeper used by the DB-backed
+QueryJob queue (see QueryJob in app.py)
+"""
+
+import os
+import socket
+import threading
+from typing import Callable
+
+
+# How long a claimed job stays owned without a heartbeat
+LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 60))
+
+# How often running jobs are heartbeated and expired leases swept
+HEARTBEAT_INTERVAL = int(os.getenv('JOB_HEARTBEAT_INTERVAL', 15))
+
+# A job whose lease expired this many times is failed instead of resumed
+MAX_JOB_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+
+# Identifies this process as a lease owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def owner_alive(owner: str) -> bool:
+    """
+    True if `owner` (a WORKER_ID) is another process still running on this
+    host. Owners on other hosts cannot be checked and count as gone.
+    """
+    host, _, pid = (owner or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit() or owner == WORKER_ID:
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LeaseKeeper:
+    """Daemon thread that periodically renews this process's leases and
+    reclaims leases abandoned by crashed processes"""
+
+    def __init__(self, heartbeat_fn: Callable, reclaim_fn: Callable,
+                 interval: float = HEARTBEAT_INTERVAL):
+        """
+        Args:
+            heartbeat_fn: Extends the leases held by this worker
+            reclaim_fn: Requeues or fails jobs whose lease expired
+            interval: Seconds between rounds
+        """
+        self.heartbeat_fn = heartbeat_fn
+        self.reclaim_fn = reclaim_fn
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the keeper thread once per process"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='job-lease-keeper', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.heartbeat_fn()
+                self.reclaim_fn()
+            except Exception as e:
+                print(f"[JOB QUEUE ERROR] Lease maintenance failed: {str(e)}")
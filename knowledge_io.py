@@ -0,0 +1,287 @@
+"""
+Knowledge Import / Export
+Streaming JSONL and CSV ingestion with batched upserts (keyed by title),
+per-line validation errors, and streaming export
+"""
+
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+FIELDS = ['title', 'category', 'content', 'description', 'is_active']
+
+MAX_LENGTHS = {
+    'title': 200,
+    'category': 100,
+    'description': 500,
+}
+
+# Validation errors kept in the import report (the count is always exact)
+MAX_REPORTED_ERRORS = 1000
+
+# Values for optional fields on newly inserted rows
+INSERT_DEFAULTS = {'category': None, 'description': None, 'is_active': True}
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off'}
+
+
+# ============================================================
+# PARSING & VALIDATION
+# ============================================================
+
+class DecodeError(ValueError):
+    """A line of an import file is not valid text in the expected encoding"""
+
+    def __init__(self, line_number: int, message: str):
+        super().__init__(message)
+        self.line_number = line_number
+
+
+def open_text(binary_stream, encoding: str = 'utf-8') -> Iterator[str]:
+    """
+    Decode an uploaded binary stream line by line for text parsing
+
+    Lines are decoded one at a time, so an invalid byte is reported with the
+    line it is on (as DecodeError) instead of somewhere in a read-ahead block.
+    """
+    for line_number, line in enumerate(binary_stream, start=1):
+        try:
+            yield line.decode(encoding)
+        except UnicodeDecodeError as e:
+            raise DecodeError(line_number, f'Not valid {encoding.upper()} (byte {e.start + 1} of the line); '
+                                           f'import stopped here') from e
+
+
+def parse_jsonl(stream: Iterable[str]) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    Parse JSON Lines
+
+    Yields:
+        (line_number, record, error) -- record is None when error is set
+    """
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f'Invalid JSON: {e.msg}'
+            continue
+        if not isinstance(record, dict):
+            yield line_number, None, 'Each line must be a JSON object'
+            continue
+        yield line_number, record, None
+
+
+def parse_csv(stream: Iterable[str]) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    Parse CSV with a header row (title, content, and optionally category,
+    description, is_active)
+
+    Yields:
+        (line_number, record, error) -- line numbers count the header as line 1
+    """
+    reader = csv.DictReader(stream)
+    for record in reader:
+        if None in record:
+            yield reader.line_num, None, 'Row has more columns than the header'
+            continue
+        yield reader.line_num, record, None
+
+
+def validate_record(record: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Normalise one knowledge record
+
+    Returns:
+        (clean_record, error) -- exactly one of them is None
+    """
+    # JSON values can be numbers, lists or objects; only strings (or null) are text
+    for field in ('title', 'content', 'category', 'description'):
+        if record.get(field) is not None and not isinstance(record[field], str):
+            return None, f'{field} must be a string'
+
+    title = (record.get('title') or '').strip()
+    content = (record.get('content') or '').strip()
+
+    if not title:
+        return None, 'title is required'
+    if not content:
+        return None, 'content is required'
+
+    # Optional fields are only set when present, so an upsert leaves
+    # columns the file does not mention untouched
+    clean = {'title': title, 'content': content}
+    for field in ('category', 'description'):
+        if field in record:
+            clean[field] = (record.get(field) or '').strip() or None
+
+    for field, max_length in MAX_LENGTHS.items():
+        if clean.get(field) and len(clean[field]) > max_length:
+            return None, f'{field} must be at most {max_length} characters'
+
+    if 'is_active' in record:
+        is_active = record['is_active']
+        if is_active is None:
+            is_active = True
+        elif isinstance(is_active, str):
+            value = is_active.strip().lower()
+            if value == '' or value in TRUE_VALUES:
+                is_active = True
+            elif value in FALSE_VALUES:
+                is_active = False
+            else:
+                return None, 'is_active must be true or false'
+        elif not isinstance(is_active, bool) and is_active not in (0, 1):
+            return None, 'is_active must be true or false'
+        clean['is_active'] = bool(is_active)
+
+    return clean, None
+
+
+# ============================================================
+# IMPORT
+# ============================================================
+
+class ImportReport:
+    """Counters and per-line errors for one import run"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors: List[Dict] = []
+        # False when the input could not be read to the end
+        self.complete = True
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, line_number: int, error: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': error})
+
+    def to_dict(self) -> Dict:
+        processed = self.inserted + self.updated
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'errors': self.errors,
+            'error_count': self.error_count,
+            'errors_truncated': self.error_count > len(self.errors),
+            'complete': self.complete,
+            'seconds': round(self.elapsed, 3),
+            'rows_per_second': round(processed / self.elapsed, 1) if self.elapsed else 0.0
+        }
+
+
+def _flush_batch(db, model, batch: Dict[str, Dict], created_by: Optional[int], report: ImportReport):
+    """Upsert one batch of records keyed by title, then commit"""
+    now = datetime.utcnow()
+
+    existing = {}
+    for row in db.session.query(model.id, model.title)\
+            .filter(model.title.in_(list(batch)))\
+            .order_by(model.id.desc()):
+        existing[row.title] = row.id  # lowest id wins for duplicate titles
+
+    updates = []
+    inserts = []
+    for title, record in batch.items():
+        if title in existing:
+            updates.append(dict(record, id=existing[title], updated_at=now))
+        else:
+            inserts.append(dict(INSERT_DEFAULTS, **record, created_by=created_by, created_at=now, updated_at=now))
+
+    if updates:
+        db.session.execute(db.update(model), updates)
+    if inserts:
+        db.session.execute(db.insert(model), inserts)
+    db.session.commit()
+
+    report.updated += len(updates)
+    report.inserted += len(inserts)
+
+
+def import_knowledge(db, model, rows: Iterable[Tuple[int, Optional[Dict], Optional[str]]],
+                     created_by: Optional[int] = None, batch_size: int = 500,
+                     on_batch: Optional[Callable[[ImportReport], None]] = None) -> ImportReport:
+    """
+    Validate and upsert parsed rows into the Knowledge table in batches
+
+    Args:
+        db: Flask-SQLAlchemy instance
+        model: The Knowledge model
+        rows: Output of parse_jsonl / parse_csv
+        created_by: User id recorded on inserted rows
+        batch_size: Rows per INSERT/UPDATE round trip and commit
+        on_batch: Called with the report after each committed batch
+
+    Returns:
+        ImportReport -- if a line cannot be decoded, the rows before it are
+        kept and the report is marked incomplete with an error for that line
+    """
+    report = ImportReport()
+    batch: Dict[str, Dict] = {}
+
+    try:
+        for line_number, record, error in rows:
+            if error is None:
+                record, error = validate_record(record)
+            if error:
+                report.add_error(line_number, error)
+                continue
+
+            # A later line with the same title replaces an earlier one
+            batch[record['title']] = record
+            if len(batch) >= batch_size:
+                _flush_batch(db, model, batch, created_by, report)
+                batch = {}
+                if on_batch:
+                    on_batch(report)
+    except DecodeError as e:
+        report.add_error(e.line_number, str(e))
+        report.complete = False
+
+    if batch:
+        _flush_batch(db, model, batch, created_by, report)
+        if on_batch:
+            on_batch(report)
+
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+# ============================================================
+# EXPORT
+# ============================================================
+
+def _export_rows(model, batch_size: int):
+    return model.query.order_by(model.id).yield_per(batch_size)
+
+
+def export_jsonl(model, batch_size: int = 1000) -> Iterator[str]:
+    """Yield every knowledge entry as a JSON line"""
+    for entry in _export_rows(model, batch_size):
+        yield json.dumps({field: getattr(entry, field) for field in FIELDS}, ensure_ascii=False) + '\n'
+
+
+def export_csv(model, batch_size: int = 1000) -> Iterator[str]:
+    """Yield every knowledge entry as CSV, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(FIELDS)
+    for index, entry in enumerate(_export_rows(model, batch_size), start=1):
+        writer.writerow([getattr(entry, field) for field in FIELDS])
+        if index % 100 == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,208 @@
+"""
+LLM Resilience Layer
+Deadlines, jittered exponential retries and a circuit breaker around the
+chat completion call
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while the breaker is open"""
+
+    def __init__(self, retry_in: float):
+        self.retry_in = retry_in
+        super().__init__(f"LLM provider circuit is open; retry in {retry_in:.0f}s")
+
+
+class DeadlineExceededError(Exception):
+    """Raised when the overall deadline for a call runs out"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    Three-state circuit breaker
+
+    closed    -> calls pass through; consecutive failures are counted
+    open      -> calls fail fast with CircuitOpenError until recovery_timeout elapses
+    half_open -> a single trial call is let through; success closes the
+                 circuit, failure re-opens it
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._total_failures = 0
+        self._total_successes = 0
+        self._times_opened = 0
+        self._rejected = 0
+        self._last_error = None
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not reach the provider"""
+        with self._lock:
+            if self._state == self.OPEN:
+                elapsed = time.monotonic() - self._opened_at
+                if elapsed < self.recovery_timeout:
+                    self._rejected += 1
+                    raise CircuitOpenError(self.recovery_timeout - elapsed)
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self._rejected += 1
+                    raise CircuitOpenError(0)
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+            self._total_successes += 1
+
+    def release(self):
+        """End a call that says nothing about provider health (client error, cancel)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self._failures += 1
+            self._total_failures += 1
+            self._trial_in_flight = False
+            self._last_error = str(error)[:200]
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        """Current state for the admin dashboard"""
+        with self._lock:
+            retry_in = 0.0
+            if self._state == self.OPEN:
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'retry_in': round(retry_in, 1),
+                'times_opened': self._times_opened,
+                'rejected_calls': self._rejected,
+                'total_failures': self._total_failures,
+                'total_successes': self._total_successes,
+                'last_error': self._last_error
+            }
+
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, 408/409/429 and 5xx are worth retrying"""
+    try:
+        import openai
+    except ImportError:
+        openai = None
+
+    if openai is not None:
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code in (408, 409, 429) or error.status_code >= 500
+
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+class ResilientCaller:
+    """Runs a provider call under deadlines, retries and a circuit breaker"""
+
+    def __init__(self, attempt_timeout: float = None, overall_deadline: float = None,
+                 max_attempts: int = None, base_delay: float = None, max_delay: float = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Args:
+            attempt_timeout: Seconds allowed per attempt (LLM_ATTEMPT_TIMEOUT, default 120)
+            overall_deadline: Seconds allowed across all attempts (LLM_OVERALL_DEADLINE, default 300)
+            max_attempts: Attempts including the first one (LLM_MAX_ATTEMPTS, default 4)
+            base_delay: First backoff delay in seconds (LLM_RETRY_BASE_DELAY, default 1)
+            max_delay: Cap on a single backoff delay (LLM_RETRY_MAX_DELAY, default 20)
+            breaker: Shared circuit breaker (LLM_BREAKER_THRESHOLD / LLM_BREAKER_RECOVERY)
+        """
+        self.attempt_timeout = attempt_timeout or float(os.getenv('LLM_ATTEMPT_TIMEOUT', 120))
+        self.overall_deadline = overall_deadline or float(os.getenv('LLM_OVERALL_DEADLINE', 300))
+        self.max_attempts = max_attempts or int(os.getenv('LLM_MAX_ATTEMPTS', 4))
+        self.base_delay = base_delay if base_delay is not None else float(os.getenv('LLM_RETRY_BASE_DELAY', 1))
+        self.max_delay = max_delay or float(os.getenv('LLM_RETRY_MAX_DELAY', 20))
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=int(os.getenv('LLM_BREAKER_THRESHOLD', 5)),
+            recovery_timeout=float(os.getenv('LLM_BREAKER_RECOVERY', 30))
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (1-based) attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def call(self, fn: Callable, cancel_token=None, **kwargs):
+        """
+        Call fn(timeout=..., **kwargs) with retries
+
+        The per-attempt timeout is passed to fn as `timeout` and is never
+        longer than what remains of the overall deadline.
+
+        Args:
+            fn: Provider call, e.g. client.chat.completions.create
+            cancel_token: Optional scheduler CancelToken; stops retrying once set
+        """
+        deadline = time.monotonic() + self.overall_deadline
+        attempt = 0
+
+        while True:
+            attempt += 1
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(f"LLM call exceeded {self.overall_deadline:.0f}s deadline")
+
+            self.breaker.before_call()
+            try:
+                result = fn(timeout=min(self.attempt_timeout, remaining), **kwargs)
+            except Exception as e:
+                if cancel_token is not None and cancel_token.cancelled:
+                    # Cancelling closes the client mid-request; that is not a provider fault
+                    self.breaker.release()
+                    raise
+                if not is_retryable(e):
+                    # The provider answered (e.g. 400/401): neither healthy nor unhealthy,
+                    # so a half-open breaker waits for a conclusive trial
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure(e)
+                if attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                print(f"[LLM RETRY] Attempt {attempt} failed ({type(e).__name__}); retrying in {delay:.2f}s")
+                if cancel_token is not None:
+                    if cancel_token.wait(delay):
+                        raise
+                else:
+                    time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return result
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+Mock LLM Provider
+A local, OpenAI-compatible stand-in for the chat completion endpoint with
+configurable latency and fault injection. Used for resilience tests,
+benchmarks and load tests without calling OpenRouter.
+
+Point the app at it with:
+    OPENROUTER_BASE_URL=http://127.0.0.1:8001/v1 python run.py
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+class FaultConfig:
+    """Mutable latency / fault settings shared by all request handlers"""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, hang_rate: float = 0.0, hang_seconds: float = 30.0,
+                 response_size: int = 800):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.response_size = response_size
+        self.fail_next = 0  # force the next N requests to fail
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def update(self, **settings):
+        with self._lock:
+            for key, value in settings.items():
+                if hasattr(self, key) and not key.startswith('_'):
+                    setattr(self, key, value)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {key: value for key, value in vars(self).items() if not key.startswith('_')}
+
+    def next_outcome(self) -> str:
+        """Decide the fate of one request: 'ok', 'error' or 'hang'"""
+        with self._lock:
+            self.requests += 1
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                self.failures += 1
+                return 'error'
+            roll = random.random()
+            if roll < self.error_rate:
+                self.failures += 1
+                return 'error'
+            if roll < self.error_rate + self.hang_rate:
+                return 'hang'
+            return 'ok'
+
+
+def build_completion(request_body: Dict, size: int) -> Dict:
+    """Build a chat.completion payload echoing the user's question"""
+    messages = request_body.get('messages') or []
+    question = messages[-1].get('content', '') if messages else ''
+    filler = "This is a mock research answer with **markdown** formatting. "
+    body = f"## Answer\n\nYou asked: {question[:200]}\n\n"
+    body += (filler * (size // len(filler) + 1))[:size]
+
+    return {
+        'id': f'mock-{int(time.time() * 1000)}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request_body.get('model', 'mock'),
+        'choices': [{
+            'index': 0,
+            'finish_reason': 'stop',
+            'message': {
+                'role': 'assistant',
+                'content': body,
+                'reasoning_details': [{'type': 'reasoning.text', 'text': 'Mock reasoning.'}]
+            }
+        }],
+        'usage': {'prompt_tokens': 10, 'completion_tokens': size // 4, 'total_tokens': 10 + size // 4}
+    }
+
+
+def make_handler(faults: FaultConfig):
+    class MockLLMHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: Dict):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_json(self) -> Dict:
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b'{}'
+            return json.loads(raw or b'{}')
+
+        def do_GET(self):
+            if self.path == '/_faults':
+                return self._send_json(200, faults.to_dict())
+            self._send_json(404, {'error': {'message': 'Not found'}})
+
+        def do_POST(self):
+            body = self._read_json()
+
+            if self.path == '/_faults':
+                faults.update(**body)
+                return self._send_json(200, faults.to_dict())
+
+            if not self.path.endswith('/chat/completions'):
+                return self._send_json(404, {'error': {'message': 'Not found'}})
+
+            outcome = faults.next_outcome()
+            delay = faults.latency + random.uniform(0, faults.jitter)
+
+            if outcome == 'hang':
+                time.sleep(faults.hang_seconds)
+            else:
+                time.sleep(delay)
+
+            if outcome == 'error':
+                return self._send_json(faults.error_status, {
+                    'error': {'message': 'Injected provider fault', 'code': faults.error_status}
+                })
+
+            self._send_json(200, build_completion(body, faults.response_size))
+
+    return MockLLMHandler
+
+
+class MockLLMServer:
+    """In-process mock provider running on a background thread"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, faults: Optional[FaultConfig] = None):
+        self.faults = faults or FaultConfig()
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.faults))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self) -> 'MockLLMServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='mock-llm', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a mock OpenAI-compatible LLM provider')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.5, help='Base response latency (seconds)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random latency (seconds)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--hang-rate', type=float, default=0.0, help='Fraction of requests that hang')
+    parser.add_argument('--response-size', type=int, default=800, help='Answer size in characters')
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, FaultConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        hang_rate=args.hang_rate,
+        response_size=args.response_size
+    ))
+    print(f"🧪 Mock LLM provider listening on {server.base_url}")
+    print("   POST /_faults with JSON to change latency/fault settings at runtime")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
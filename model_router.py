@@ -0,0 +1,145 @@
+"""
+Model Router
+Maps task type, comparison flag and prompt size to a model, reasoning
+setting and answer budget
+
+The routing table can be overridden without code changes through the
+MODEL_ROUTES env var: either inline JSON or a path to a JSON file (file
+edits are picked up on the next query). Shape:
+
+    {"routes": [
+        {"name": "quick", "task_types": ["general"], "is_comparison": false,
+         "max_prompt_tokens": 2000,
+         "model": "openai/gpt-oss-20b:free", "reasoning": false, "max_tokens": 1500},
+        ...
+     ],
+     "default": {"name": "default", "model": "...", "reasoning": true, "max_tokens": 8000}}
+
+Routes are tried in order and the first whose conditions all hold wins.
+Omitted conditions match anything.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+
+DEFAULT_MODEL = os.getenv('LLM_MODEL', 'openai/gpt-oss-20b:free')
+
+DEFAULT_ROUTES = {
+    'routes': [
+        {
+            'name': 'quick-general',
+            'task_types': ['general'],
+            'is_comparison': False,
+            'max_prompt_tokens': 2000,
+            'model': DEFAULT_MODEL,
+            'reasoning': False,
+            'max_tokens': 1500
+        },
+        {
+            'name': 'comparison',
+            'is_comparison': True,
+            'model': DEFAULT_MODEL,
+            'reasoning': True,
+            'max_tokens': 4000
+        },
+        {
+            'name': 'creative',
+            'task_types': ['creative'],
+            'model': DEFAULT_MODEL,
+            'reasoning': False,
+            'max_tokens': 4000
+        },
+        {
+            'name': 'deep',
+            'task_types': ['analysis', 'research', 'code', 'problem_solving'],
+            'model': DEFAULT_MODEL,
+            'reasoning': True,
+            'max_tokens': 8000
+        }
+    ],
+    'default': {
+        'name': 'default',
+        'model': DEFAULT_MODEL,
+        'reasoning': True,
+        'max_tokens': 8000
+    }
+}
+
+
+class ModelRouter:
+    """Chooses the route for a query from the routing table"""
+
+    def __init__(self, source: Optional[str] = None):
+        """
+        Args:
+            source: Inline JSON or a path to a JSON routing table
+                    (defaults to the MODEL_ROUTES env var, then DEFAULT_ROUTES)
+        """
+        self.source = (source if source is not None else os.getenv('MODEL_ROUTES', '')).strip()
+        self._lock = threading.Lock()
+        self._table = None
+        self._mtime = None
+
+    def _is_file(self) -> bool:
+        return bool(self.source) and not self.source.startswith('{')
+
+    def table(self) -> Dict:
+        """Return the routing table, reloading the config file if it changed"""
+        with self._lock:
+            if self._is_file():
+                mtime = os.path.getmtime(self.source)
+                if self._table is None or mtime != self._mtime:
+                    with open(self.source, 'r', encoding='utf-8') as f:
+                        self._table = self._normalise(json.load(f))
+                    self._mtime = mtime
+            elif self._table is None:
+                self._table = self._normalise(json.loads(self.source) if self.source else DEFAULT_ROUTES)
+            return self._table
+
+    @staticmethod
+    def _normalise(table: Dict) -> Dict:
+        default = dict(DEFAULT_ROUTES['default'])
+        default.update(table.get('default', {}))
+        return {'routes': list(table.get('routes', [])), 'default': default}
+
+    @staticmethod
+    def _matches(route: Dict, task_type: str, is_comparison: bool, prompt_tokens: int) -> bool:
+        if 'task_types' in route and task_type not in route['task_types']:
+            return False
+        if 'is_comparison' in route and bool(is_comparison) != route['is_comparison']:
+            return False
+        if 'max_prompt_tokens' in route and prompt_tokens > route['max_prompt_tokens']:
+            return False
+        if 'min_prompt_tokens' in route and prompt_tokens < route['min_prompt_tokens']:
+            return False
+        return True
+
+    def route(self, task_type: str, is_comparison: bool = False, prompt_tokens: int = 0) -> Dict:
+        """
+        Pick the route for a query
+
+        Returns:
+            Dict with name, model, reasoning and max_tokens
+        """
+        table = self.table()
+        chosen = table['default']
+        for route in table['routes']:
+            if self._matches(route, task_type, is_comparison, prompt_tokens):
+                chosen = route
+                break
+
+        default = table['default']
+        return {
+            'name': chosen.get('name', 'unnamed'),
+            'model': chosen.get('model', default['model']),
+            'reasoning': bool(chosen.get('reasoning', default['reasoning'])),
+            'max_tokens': int(chosen.get('max_tokens', default['max_tokens']))
+        }
+
+    def routes(self) -> List[Dict]:
+        """All routes in evaluation order, default last"""
+        table = self.table()
+        return table['routes'] + [table['default']]
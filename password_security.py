@@ -0,0 +1,171 @@
+"""
+Password Security
+Configurable password hashing policy, a bounded hashing executor so
+authentication cannot take every CPU from query handling, and login
+attempt throttling per IP address and per username
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Optional, Tuple
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+# Werkzeug method string, e.g. "pbkdf2:sha256:600000" or "scrypt:32768:8:1".
+# Stored hashes made with a different method are upgraded on the next login.
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+
+# Threads that may hash at once (hashlib releases the GIL, so each uses a core)
+HASH_WORKERS = int(os.getenv('AUTH_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+
+# Hash requests allowed to wait for a worker before new ones are refused
+HASH_QUEUE_LIMIT = int(os.getenv('AUTH_HASH_QUEUE', 32))
+
+# Seconds a request waits for its hash before giving up
+HASH_TIMEOUT = float(os.getenv('AUTH_HASH_TIMEOUT', 10))
+
+# Failed logins allowed within the window
+LOGIN_THROTTLE_WINDOW = int(os.getenv('LOGIN_THROTTLE_WINDOW', 900))
+MAX_FAILURES_PER_USERNAME = int(os.getenv('LOGIN_MAX_FAILURES_PER_USERNAME', 5))
+MAX_FAILURES_PER_IP = int(os.getenv('LOGIN_MAX_FAILURES_PER_IP', 20))
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing executor is saturated"""
+    pass
+
+
+# ============================================================
+# HASHING POLICY
+# ============================================================
+
+def hash_method(password_hash: str) -> str:
+    """The method part of a Werkzeug hash ("method$salt$hash")"""
+    return password_hash.split('$', 1)[0] if password_hash else ''
+
+
+def _normalise_method(method: str) -> str:
+    # Werkzeug fills in defaults: "pbkdf2" -> "pbkdf2:sha256:600000"
+    return hash_method(generate_password_hash('', method=method, salt_length=1))
+
+
+def needs_rehash(password_hash: str, method: Optional[str] = None) -> bool:
+    """True if the hash was made with a different method or cost than the policy"""
+    return hash_method(password_hash) != _policy_method(method)
+
+
+_normalised_policy: Dict[str, str] = {}
+
+
+def _policy_method(method: Optional[str] = None) -> str:
+    method = method or PASSWORD_HASH_METHOD
+    if method not in _normalised_policy:
+        _normalised_policy[method] = _normalise_method(method)
+    return _normalised_policy[method]
+
+
+# ============================================================
+# BOUNDED EXECUTOR
+# ============================================================
+
+class HashingExecutor:
+    """
+    Runs password hashing on a fixed number of threads
+
+    Callers block until their hash is done; once HASH_QUEUE_LIMIT calls are
+    queued or running, further calls fail fast with HashingBusyError instead
+    of piling up behind a login storm.
+    """
+
+    def __init__(self, max_workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT,
+                 timeout: float = HASH_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_workers + queue_limit)
+        self.rejected = 0
+
+    def run(self, fn: Callable, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusyError('Too many authentication requests in progress')
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise HashingBusyError('Timed out waiting for password hashing')
+
+    def hash_password(self, password: str, method: Optional[str] = None) -> str:
+        return self.run(generate_password_hash, password, method=method or PASSWORD_HASH_METHOD)
+
+    def check_password(self, password_hash: str, password: str) -> bool:
+        return self.run(check_password_hash, password_hash, password)
+
+
+# ============================================================
+# LOGIN THROTTLING
+# ============================================================
+
+class LoginThrottle:
+    """Sliding-window failed-login counters per IP address and per username"""
+
+    def __init__(self, window: int = LOGIN_THROTTLE_WINDOW,
+                 max_per_username: int = MAX_FAILURES_PER_USERNAME,
+                 max_per_ip: int = MAX_FAILURES_PER_IP):
+        self.window = window
+        self.limits = {'user': max_per_username, 'ip': max_per_ip}
+        self._failures: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def _prune(self, key, now: float) -> deque:
+        failures = self._failures.get(key)
+        if failures is None:
+            return deque()
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+        return failures
+
+    def _sweep(self, now: float):
+        # Drop idle keys so scanning many usernames/IPs cannot grow memory forever
+        if now - self._last_sweep < self.window:
+            return
+        self._last_sweep = now
+        for key in list(self._failures):
+            self._prune(key, now)
+
+    def retry_after(self, ip: str, username: str) -> int:
+        """Seconds until another attempt is allowed (0 = allowed now)"""
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            self._sweep(now)
+            for kind, value in (('ip', ip), ('user', username.lower())):
+                failures = self._prune((kind, value), now)
+                if len(failures) >= self.limits[kind]:
+                    oldest_counted = failures[len(failures) - self.limits[kind]]
+                    wait = max(wait, oldest_counted + self.window - now)
+        return int(wait) + 1 if wait > 0 else 0
+
+    def record_failure(self, ip: str, username: str):
+        now = time.monotonic()
+        with self._lock:
+            for key in (('ip', ip), ('user', username.lower())):
+                self._failures.setdefault(key, deque()).append(now)
+
+    def record_success(self, ip: str, username: str):
+        """A correct password clears the username's failures (not the IP's)"""
+        with self._lock:
+            self._failures.pop(('user', username.lower()), None)
@@ -0,0 +1,296 @@
+"""
+PDF Export
+Converts a markdown answer into reportlab flowables, one per block:
+headings, paragraphs, bullet and numbered lists, block quotes, code blocks
+and real tables. Text is escaped before inline markup (bold, italic, code,
+links) is added, so '<' and '&' in answers are printed as-is.
+
+Long blocks are cut into bounded pieces. Splitting a flowable across a page
+re-lays out the rest of it, so one huge paragraph, table or code block costs
+time quadratic in its length; bounded pieces keep the build linear.
+"""
+
+import html
+import re
+from typing import Dict, List
+
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable, Paragraph, Preformatted, Spacer, Table, TableStyle
+from reportlab.platypus.flowables import HRFlowable
+
+# Paragraph text per flowable; longer paragraphs are cut at sentence ends
+MAX_PARAGRAPH_CHARS = 2000
+
+# Table rows per flowable (the header row is repeated on every piece)
+MAX_TABLE_ROWS = 40
+
+# Nesting levels of list indentation
+MAX_LIST_DEPTH = 4
+
+# Code lines per flowable, and the column at which long code lines wrap
+MAX_CODE_LINES = 60
+CODE_LINE_LENGTH = 90
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_BULLET = re.compile(r'^(\s*)[-*+]\s+(.*)$')
+_NUMBERED = re.compile(r'^(\s*)(\d+)[.)]\s+(.*)$')
+_FENCE = re.compile(r'^\s*(```|~~~)')
+_RULE = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+_QUOTE = re.compile(r'^\s*>\s?(.*)$')
+_TABLE_SEPARATOR = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+
+_CODE_SPAN = re.compile(r'`([^`]+)`')
+_BOLD = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*|__(?=\S)(.+?)(?<=\S)__')
+_ITALIC = re.compile(r'(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)')
+_LINK = re.compile(r'\[([^\]]+)\]\((https?://[^)\s]+)\)')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+# Characters that may start inline markup; cells without them can skip Paragraph
+_MARKUP_CHARS = re.compile(r'[*_`\[]')
+
+# Horizontal padding of a table cell (reportlab's default on each side)
+CELL_PADDING = 6
+
+_styles = None
+
+
+def get_styles() -> Dict[str, ParagraphStyle]:
+    """Paragraph styles used by the export (built once)"""
+    global _styles
+    if _styles is None:
+        sample = getSampleStyleSheet()
+        body = sample['Normal']
+        _styles = {
+            'title': ParagraphStyle('ExportTitle', parent=sample['Heading1'], fontSize=24, spaceAfter=30),
+            'section': sample['Heading2'],
+            'body': ParagraphStyle('ExportBody', parent=body, spaceAfter=6),
+            'quote': ParagraphStyle('ExportQuote', parent=body, leftIndent=18, textColor=colors.HexColor('#555555'),
+                                    fontName='Helvetica-Oblique', spaceAfter=6),
+            'code': ParagraphStyle('ExportCode', parent=sample['Code'], fontSize=8, leading=10,
+                                   backColor=colors.HexColor('#f4f4f4'), spaceBefore=0, spaceAfter=0),
+            'cell': ParagraphStyle('ExportCell', parent=body, fontSize=8, leading=10),
+            'header_cell': ParagraphStyle('ExportHeaderCell', parent=body, fontSize=8, leading=10,
+                                          fontName='Helvetica-Bold'),
+        }
+        for depth in range(MAX_LIST_DEPTH + 1):
+            _styles[f'list{depth}'] = ParagraphStyle(f'ExportList{depth}', parent=body, spaceAfter=2,
+                                                     leftIndent=18 + 14 * depth, bulletIndent=6 + 14 * depth)
+        for level in range(1, 7):
+            # '#' sits below the export's own title and section headings
+            _styles[f'h{level}'] = sample[f'Heading{min(level + 2, 6)}']
+    return _styles
+
+
+def escape(text) -> str:
+    """Escape plain text for a reportlab Paragraph"""
+    return html.escape(str(text), quote=True)
+
+
+def inline_markup(text: str) -> str:
+    """
+    Escape a line of markdown and convert its inline markup
+
+    Args:
+        text: Markdown source of one block
+
+    Returns:
+        reportlab Paragraph markup (<b>, <i>, <font>, <link>)
+    """
+    parts = _CODE_SPAN.split(text)
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            out.append(f'<font face="Courier">{escape(part)}</font>')
+            continue
+        part = escape(part)
+        part = _LINK.sub(r'<link href="\2" color="blue">\1</link>', part)
+        part = _BOLD.sub(lambda m: f'<b>{m.group(1) or m.group(2)}</b>', part)
+        part = _ITALIC.sub(lambda m: f'<i>{m.group(1) or m.group(2)}</i>', part)
+        out.append(part)
+    return ''.join(out)
+
+
+def paragraph(text: str, style: ParagraphStyle, **kwargs) -> Paragraph:
+    """
+    Paragraph from markdown text with its line breaks kept (as nl2br does);
+    unbalanced markup falls back to plain text
+    """
+    try:
+        return Paragraph(inline_markup(text).replace('\n', '<br/>'), style, **kwargs)
+    except ValueError:
+        return Paragraph(escape(text).replace('\n', '<br/>'), style, **kwargs)
+
+
+def _pieces(text: str, limit: int) -> List[str]:
+    """Cut text at sentence ends (or spaces) into pieces of about `limit` characters"""
+    if len(text) <= limit:
+        return [text]
+    pieces, current = [], ''
+    for sentence in _SENTENCE_END.split(text):
+        while len(sentence) > limit:
+            cut = sentence.rfind(' ', 0, limit)
+            cut = cut if cut > 0 else limit
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + len(sentence) + 1 > limit:
+            pieces.append(current)
+            current = ''
+        current = f'{current} {sentence}' if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_row(line: str) -> List[str]:
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|') and not line.endswith('\\|'):
+        line = line[:-1]
+    return [cell.strip().replace('\\|', '|') for cell in re.split(r'(?<!\\)\|', line)]
+
+
+def _cell(text: str, style: ParagraphStyle, width: float):
+    """
+    Table cell content: a plain string when the text has no markup and fits
+    on one line (drawn directly, several times cheaper to lay out than a
+    Paragraph), otherwise a wrapping Paragraph
+    """
+    if not _MARKUP_CHARS.search(text) and \
+            stringWidth(text, style.fontName, style.fontSize) <= width - 2 * CELL_PADDING:
+        return text
+    return paragraph(text, style)
+
+
+def _table(rows: List[List[str]], width: float, styles) -> List[Flowable]:
+    columns = max(len(row) for row in rows)
+    column_width = width / columns
+    header = [_cell(cell, styles['header_cell'], column_width) for cell in rows[0]]
+    header += [''] * (columns - len(header))
+    body = []
+    for row in rows[1:]:
+        cells = [_cell(cell, styles['cell'], column_width) for cell in row[:columns]]
+        body.append(cells + [''] * (columns - len(cells)))
+
+    cell, header_cell = styles['cell'], styles['header_cell']
+    table_style = TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#bbbbbb')),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#eeeeee')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+        # Plain-string cells use the same fonts as the Paragraph cells
+        ('FONT', (0, 0), (-1, -1), cell.fontName, cell.fontSize, cell.leading),
+        ('FONT', (0, 0), (-1, 0), header_cell.fontName, header_cell.fontSize, header_cell.leading),
+    ])
+    flowables = []
+    for start in range(0, max(len(body), 1), MAX_TABLE_ROWS):
+        table = Table([header] + body[start:start + MAX_TABLE_ROWS], colWidths=[column_width] * columns,
+                      repeatRows=1, hAlign='LEFT')
+        table.setStyle(table_style)
+        flowables.append(table)
+    flowables.append(Spacer(1, 6))
+    return flowables
+
+
+def _code(lines: List[str], styles) -> List[Flowable]:
+    flowables = []
+    for start in range(0, max(len(lines), 1), MAX_CODE_LINES):
+        # Preformatted draws its text verbatim; no escaping needed
+        flowables.append(Preformatted('\n'.join(lines[start:start + MAX_CODE_LINES]), styles['code'],
+                                      maxLineLength=CODE_LINE_LENGTH, newLineChars=''))
+    flowables.append(Spacer(1, 6))
+    return flowables
+
+
+def markdown_flowables(text: str, width: float) -> List[Flowable]:
+    """
+    Convert a markdown answer into flowables, in one pass over its lines
+
+    Args:
+        text: Markdown source (the tables/fenced_code/nl2br dialect of the web view)
+        width: Frame width available to tables, in points
+
+    Returns:
+        List of reportlab flowables
+    """
+    styles = get_styles()
+    lines = (text or '').replace('\r\n', '\n').split('\n')
+    flowables: List[Flowable] = []
+    buffer: List[str] = []
+    buffer_style = 'body'
+
+    def flush():
+        # Consecutive lines form one paragraph
+        if buffer:
+            for piece in _pieces('\n'.join(buffer), MAX_PARAGRAPH_CHARS):
+                flowables.append(paragraph(piece, styles[buffer_style]))
+            buffer.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+
+        fence = _FENCE.match(line)
+        if fence:
+            flush()
+            marker = fence.group(1)
+            code = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(marker):
+                code.append(lines[i])
+                i += 1
+            flowables.extend(_code(code, styles))
+            i += 1
+            continue
+
+        if '|' in line and i + 1 < len(lines) and '|' in lines[i + 1] \
+                and _TABLE_SEPARATOR.match(lines[i + 1]):
+            flush()
+            rows = [_split_row(line)]
+            i += 2
+            while i < len(lines) and '|' in lines[i] and lines[i].strip():
+                rows.append(_split_row(lines[i]))
+                i += 1
+            flowables.extend(_table(rows, width, styles))
+            continue
+
+        if not stripped:
+            flush()
+        elif _HEADING.match(line):
+            flush()
+            level, title = _HEADING.match(line).groups()
+            flowables.append(paragraph(title, styles[f'h{len(level)}']))
+        elif _RULE.match(line):
+            flush()
+            flowables.append(HRFlowable(width='100%', thickness=0.5, color=colors.HexColor('#bbbbbb'),
+                                        spaceBefore=4, spaceAfter=8))
+        elif _BULLET.match(line) or _NUMBERED.match(line):
+            flush()
+            bullet = _BULLET.match(line)
+            if bullet:
+                indent, item, marker = bullet.group(1), bullet.group(2), '•'
+            else:
+                indent, number, item = _NUMBERED.match(line).groups()
+                marker = f'{number}.'
+            depth = min(len(indent.expandtabs(4)) // 2, MAX_LIST_DEPTH)
+            flowables.append(paragraph(item, styles[f'list{depth}'], bulletText=marker))
+        elif _QUOTE.match(line):
+            if buffer_style != 'quote':
+                flush()
+                buffer_style = 'quote'
+            buffer.append(_QUOTE.match(line).group(1))
+        else:
+            if buffer_style != 'body':
+                flush()
+                buffer_style = 'body'
+            buffer.append(stripped)
+        i += 1
+    flush()
+    return flowables
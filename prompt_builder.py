@@ -0,0 +1,233 @@
+"""
+Prompt Builder
+Assembles the system instruction within a token budget, splitting the
+context window between system prompt, knowledge base and answer
+"""
+
+import os
+import re
+from typing import Dict, List, Optional
+
+
+SYSTEM_PROMPT = """You are an expert research assistant with advanced reasoning capabilities.
+
+Your task is to:
+1. Thoroughly analyze the question
+2. Identify key aspects and subtopics
+3. Provide comprehensive, well-reasoned responses
+4. Consider multiple perspectives and evidence
+5. Support claims with specific examples
+
+Format your response clearly with sections and examples."""
+
+KNOWLEDGE_PREFIX = "\n\n--- KNOWLEDGE BASE ---\n"
+KNOWLEDGE_SUFFIX = "\n--- END KNOWLEDGE BASE ---\n\nUse this knowledge base to answer questions accurately when relevant."
+
+# Total tokens the model may see (prompt + answer)
+CONTEXT_WINDOW = int(os.getenv('LLM_CONTEXT_WINDOW', 32768))
+
+# Upper bound on knowledge tokens even when the window has more room,
+# since every prompt token adds latency
+KNOWLEDGE_MAX_TOKENS = int(os.getenv('KNOWLEDGE_MAX_TOKENS', 12000))
+
+# A large prompt never squeezes the answer below this
+MIN_ANSWER_TOKENS = 1024
+
+# Headroom for chat-format overhead and tokenizer disagreement
+SAFETY_MARGIN = 256
+
+# A section is cut to fit only if at least this many tokens of it remain
+MIN_TRUNCATED_SECTION = 64
+
+
+# ============================================================
+# TOKEN COUNTING
+# ============================================================
+
+# 'heuristic' (default): local approximation, no extra dependency.
+# 'tiktoken': exact o200k_base counts. tiktoken is optional (not in
+# requirements.txt) and downloads the encoding on first use unless
+# TIKTOKEN_CACHE_DIR points at a pre-populated cache; if it is missing or
+# the encoding cannot be loaded, the heuristic is used.
+PROMPT_TOKENIZER = os.getenv('PROMPT_TOKENIZER', 'heuristic')
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """Return the tiktoken encoding if PROMPT_TOKENIZER selects it and it loads"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if PROMPT_TOKENIZER == 'tiktoken':
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding('o200k_base')
+            except Exception as e:
+                print(f"[PROMPT] tiktoken unavailable, using the heuristic token count: {str(e)}")
+                _encoding = None
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in text
+
+    By default a local approximation of BPE: each punctuation mark is one
+    token and each word costs one token per four characters. With
+    PROMPT_TOKENIZER=tiktoken, tiktoken's o200k_base encoding is used instead.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(
+        (len(piece) + 3) // 4 if piece[0].isalnum() or piece[0] == '_' else 1
+        for piece in _TOKEN_PATTERN.findall(text)
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, preferring a line boundary"""
+    if max_tokens <= 0:
+        return ''
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        used = 0
+        end = 0
+        for match in _TOKEN_PATTERN.finditer(text):
+            piece = match.group(0)
+            cost = (len(piece) + 3) // 4 if piece[0].isalnum() or piece[0] == '_' else 1
+            if used + cost > max_tokens:
+                break
+            used += cost
+            end = match.end()
+        cut = text[:end]
+
+    newline = cut.rfind('\n')
+    if newline > len(cut) // 2:
+        cut = cut[:newline]
+    return cut.rstrip() + "\n[...truncated]"
+
+
+# ============================================================
+# PROMPT ASSEMBLY
+# ============================================================
+
+class PromptSection:
+    """One unit of knowledge that is kept, cut or dropped as a whole"""
+
+    def __init__(self, order: int, text: str, group: Optional[str] = None):
+        """
+        Args:
+            order: Position in the assembled knowledge (stable output order)
+            text: Markdown for the section
+            group: Heading shared with neighbouring sections (e.g. a knowledge
+                   category); emitted once before the first included member
+        """
+        self.order = order
+        self.text = text
+        self.group = group
+        self.tokens = count_tokens(text)
+
+
+def _query_terms(query_text: str) -> set:
+    return {term for term in re.findall(r"\w+", query_text.lower()) if len(term) > 2}
+
+
+def rank_sections(query_text: str, sections: List[PromptSection]) -> List[PromptSection]:
+    """
+    Order sections by relevance to the query
+
+    Relevance is the number of distinct query terms the section contains;
+    ties keep the original order, so the ranking is deterministic.
+    """
+    terms = _query_terms(query_text)
+
+    def score(section):
+        text = section.text.lower()
+        return sum(1 for term in terms if term in text)
+
+    return sorted(sections, key=lambda section: (-score(section), section.order))
+
+
+def render_sections(sections: List[PromptSection]) -> str:
+    """Join sections in their original order, emitting group headings once"""
+    parts = []
+    current_group = None
+    for section in sorted(sections, key=lambda s: s.order):
+        if section.group and section.group != current_group:
+            parts.append(section.group)
+        current_group = section.group
+        parts.append(section.text)
+    return ''.join(parts).strip()
+
+
+def build_prompt(query_text: str, sections: List[PromptSection],
+                 answer_tokens: int = 8000, context_window: int = None,
+                 knowledge_max_tokens: int = None,
+                 system_prompt: str = SYSTEM_PROMPT) -> Dict:
+    """
+    Build chat messages that fit the context window
+
+    The answer budget is reserved first, then the system prompt and question;
+    what remains (capped by knowledge_max_tokens) goes to knowledge. Sections
+    are admitted in relevance order; the first one that does not fit is cut
+    if enough room is left, and everything after it is dropped.
+
+    Returns:
+        Dict with messages, prompt_tokens, max_tokens (answer budget),
+        knowledge_tokens, sections_included and sections_dropped
+    """
+    context_window = context_window or CONTEXT_WINDOW
+    knowledge_max_tokens = knowledge_max_tokens if knowledge_max_tokens is not None else KNOWLEDGE_MAX_TOKENS
+
+    base_tokens = count_tokens(system_prompt) + count_tokens(query_text) + SAFETY_MARGIN
+    answer_tokens = min(answer_tokens, max(MIN_ANSWER_TOKENS, context_window - base_tokens))
+    wrapper_tokens = count_tokens(KNOWLEDGE_PREFIX) + count_tokens(KNOWLEDGE_SUFFIX)
+    knowledge_budget = min(knowledge_max_tokens,
+                           context_window - answer_tokens - base_tokens - wrapper_tokens)
+
+    included = []
+    used = 0
+    for section in rank_sections(query_text, sections):
+        heading_cost = count_tokens(section.group) if section.group else 0
+        cost = section.tokens + heading_cost
+        if used + cost <= knowledge_budget:
+            included.append(section)
+            used += cost
+            continue
+
+        room = knowledge_budget - used - heading_cost
+        if room >= MIN_TRUNCATED_SECTION:
+            cut = PromptSection(section.order, truncate_to_tokens(section.text, room), section.group)
+            included.append(cut)
+            used += cut.tokens + heading_cost
+        break
+
+    knowledge = render_sections(included)
+    system_instruction = system_prompt
+    if knowledge:
+        system_instruction += f"{KNOWLEDGE_PREFIX}{knowledge}{KNOWLEDGE_SUFFIX}"
+
+    prompt_tokens = count_tokens(system_instruction) + count_tokens(query_text)
+
+    return {
+        'messages': [
+            {"role": "system", "content": system_instruction},
+            {"role": "user", "content": query_text}
+        ],
+        'prompt_tokens': prompt_tokens,
+        'max_tokens': answer_tokens,
+        'knowledge_tokens': count_tokens(knowledge),
+        'sections_included': len(included),
+        'sections_dropped': len(sections) - len(included)
+    }
@@ -0,0 +1,233 @@
+"""
+Query History Search
+SQLite FTS5 index over completed queries' question and answer text, kept in
+sync by triggers on the query table (completion, edits, deletion, including
+bulk SQL updates), with bm25-ranked, highlighted results. Databases without
+FTS5 (e.g. PostgreSQL) fall back to a LIKE scan with the same result shape.
+"""
+
+import html
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import text as sql_text
+
+from company_search import make_snippet, tokenize
+
+FTS_TABLE = 'query_fts'
+
+# bm25 weights: a hit in the question counts double a hit in the answer
+QUESTION_WEIGHT = 2.0
+ANSWER_WEIGHT = 1.0
+
+# Tokens per snippet (FTS5 caps this at 64)
+QUESTION_SNIPPET_TOKENS = 16
+ANSWER_SNIPPET_TOKENS = 32
+
+MAX_TERMS = 10
+
+# Placeholder highlight markers, replaced after HTML-escaping the snippet
+_OPEN, _CLOSE = '\x02', '\x03'
+
+_TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        query_text, response, user_id UNINDEXED,
+        content='query', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    # Index a query once it is completed (cache hits are inserted completed)
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON query
+        WHEN new.status = 'completed' BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, query_text, response, user_id)
+        VALUES (new.id, new.query_text, new.response, new.user_id);
+    END""",
+    # Remove the old entry of a completed query before any indexed column changes...
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_unindex BEFORE UPDATE OF status, query_text, response, user_id ON query
+        WHEN old.status = 'completed' BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, query_text, response, user_id)
+        VALUES ('delete', old.id, old.query_text, old.response, old.user_id);
+    END""",
+    # ...and add the new one if it is (still) completed
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_index AFTER UPDATE OF status, query_text, response, user_id ON query
+        WHEN new.status = 'completed' BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, query_text, response, user_id)
+        VALUES (new.id, new.query_text, new.response, new.user_id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON query
+        WHEN old.status = 'completed' BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, query_text, response, user_id)
+        VALUES ('delete', old.id, old.query_text, old.response, old.user_id);
+    END""",
+]
+
+
+_fts_support: Dict[str, bool] = {}
+
+
+def supports_fts(connection) -> bool:
+    """True on SQLite builds with the FTS5 extension (checked once per database URL)"""
+    if connection.dialect.name != 'sqlite':
+        return False
+    key = str(connection.engine.url)
+    if key not in _fts_support:
+        try:
+            rows = connection.exec_driver_sql('PRAGMA compile_options').fetchall()
+            _fts_support[key] = any(row[0] == 'ENABLE_FTS5' for row in rows)
+        except Exception:
+            _fts_support[key] = False
+    return _fts_support[key]
+
+
+def install(connection) -> Optional[int]:
+    """
+    Create the FTS table and triggers if missing, indexing existing queries
+
+    Args:
+        connection: SQLAlchemy connection inside a transaction
+
+    Returns:
+        Number of queries indexed if the table was created now, else None
+    """
+    if not supports_fts(connection):
+        return None
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).first()
+    for statement in _SCHEMA:
+        connection.exec_driver_sql(statement)
+    if exists:
+        return None
+    return rebuild(connection)
+
+
+def rebuild(connection) -> int:
+    """Re-index every completed query from scratch"""
+    connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+    connection.exec_driver_sql(
+        f"""INSERT INTO {FTS_TABLE}(rowid, query_text, response, user_id)
+            SELECT id, query_text, response, user_id FROM query WHERE status = 'completed'"""
+    )
+    return connection.exec_driver_sql(f"SELECT count(*) FROM {FTS_TABLE}").scalar()
+
+
+def parse_terms(text: str) -> List[str]:
+    """Words of the search box, lowercased and de-duplicated (at most MAX_TERMS)"""
+    terms = []
+    for term in _TERM_PATTERN.findall(text.lower()):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def match_expression(terms: List[str]) -> str:
+    """FTS5 MATCH string: every term required, the last one as a prefix (search-as-you-type)"""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' AND '.join(quoted)
+
+
+def _highlight(snippet: Optional[str]) -> str:
+    return html.escape(snippet or '').replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+
+
+def search(connection, text: str, user_id: Optional[int] = None, limit: int = 20,
+           offset: int = 0) -> Dict:
+    """
+    Ranked search over completed queries
+
+    Args:
+        connection: SQLAlchemy connection
+        text: Search box contents
+        user_id: Restrict to this user's queries (None = all users, for admins)
+        limit: Results per page
+        offset: Results to skip
+
+    Returns:
+        Dict with terms, engine ('fts5' or 'like') and results; snippets are
+        HTML-escaped with matches wrapped in <mark>
+    """
+    terms = parse_terms(text)
+    if not terms:
+        return {'terms': [], 'engine': None, 'results': []}
+    if supports_fts(connection):
+        return {'terms': terms, 'engine': 'fts5',
+                'results': _search_fts(connection, terms, user_id, limit, offset)}
+    return {'terms': terms, 'engine': 'like',
+            'results': _search_like(connection, terms, user_id, limit, offset)}
+
+
+def _search_fts(connection, terms, user_id, limit, offset) -> List[Dict]:
+    sql = f"""
+        SELECT q.id, q.user_id, u.username, q.task_type, q.created_at,
+               snippet({FTS_TABLE}, 0, ?, ?, '…', {QUESTION_SNIPPET_TOKENS}) AS question_snippet,
+               snippet({FTS_TABLE}, 1, ?, ?, '…', {ANSWER_SNIPPET_TOKENS}) AS answer_snippet,
+               bm25({FTS_TABLE}, {QUESTION_WEIGHT}, {ANSWER_WEIGHT}) AS rank
+        FROM {FTS_TABLE}
+        JOIN query q ON q.id = {FTS_TABLE}.rowid
+        JOIN "user" u ON u.id = q.user_id
+        WHERE {FTS_TABLE} MATCH ?
+    """
+    params = [_OPEN, _CLOSE, _OPEN, _CLOSE, match_expression(terms)]
+    if user_id is not None:
+        sql += " AND q.user_id = ?"
+        params.append(user_id)
+    sql += " ORDER BY rank LIMIT ? OFFSET ?"
+    params += [limit, offset]
+
+    results = []
+    for row in connection.exec_driver_sql(sql, tuple(params)).mappings():
+        results.append({
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'username': row['username'],
+            'task_type': row['task_type'],
+            'created_at': str(row['created_at']) if row['created_at'] else None,
+            'question_snippet': _highlight(row['question_snippet']),
+            'answer_snippet': _highlight(row['answer_snippet']),
+            # bm25 is lower-is-better; flip it so higher means more relevant
+            'score': round(-row['rank'], 4)
+        })
+    return results
+
+
+def _term_positions(text: str, terms: List[str]):
+    return [(start, end) for token, start, end in tokenize(text)
+            if any(token.startswith(term) for term in terms)]
+
+
+def _search_like(connection, terms, user_id, limit, offset) -> List[Dict]:
+    # Portable fallback: every term must appear in the question or the answer
+    conditions = []
+    params = {}
+    for i, term in enumerate(terms):
+        params[f'term{i}'] = f'%{term}%'
+        conditions.append(f"(lower(q.query_text) LIKE :term{i} OR lower(q.response) LIKE :term{i})")
+    where = " AND ".join(conditions)
+    if user_id is not None:
+        where += " AND q.user_id = :user_id"
+        params['user_id'] = user_id
+    params.update(limit=limit, offset=offset)
+
+    rows = connection.execute(sql_text(f"""
+        SELECT q.id, q.user_id, u.username, q.task_type, q.created_at, q.query_text, q.response
+        FROM query q JOIN "user" u ON u.id = q.user_id
+        WHERE q.status = 'completed' AND {where}
+        ORDER BY q.id DESC LIMIT :limit OFFSET :offset
+    """), params).mappings()
+
+    results = []
+    for row in rows:
+        question, answer = row['query_text'] or '', row['response'] or ''
+        question_hits, answer_hits = _term_positions(question, terms), _term_positions(answer, terms)
+        results.append({
+            'id': row['id'],
+            'user_id': row['user_id'],
+            'username': row['username'],
+            'task_type': row['task_type'],
+            'created_at': str(row['created_at']) if row['created_at'] else None,
+            'question_snippet': make_snippet(question, question_hits),
+            'answer_snippet': make_snippet(answer, answer_hits) if answer_hits else '',
+            'score': QUESTION_WEIGHT * len(question_hits) + ANSWER_WEIGHT * len(answer_hits)
+        })
+    return results
@@ -3,12 +3,10 @@
 Simple script to run the Flask application
 """
 import os
-from dotenv import load_dotenv
-from app import app, init_db
+from app import configure_app, init_db, recover_jobs, resume_document_uploads
 
 if __name__ == '__main__':
-    # Load environment variables
-    load_dotenv()
+    app = configure_app()
     
     # Initialize database
     print("✅ Initializing database...")
@@ -19,6 +17,12 @@ if __name__ == '__main__':
     port = int(os.getenv('FLASK_PORT', 5000))
     debug = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
     
+    # Resume queries interrupted by the previous shutdown or crash
+    # (in debug mode only inside the reloader's serving child process)
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        recover_jobs()
+        resume_document_uploads()
+    
     print(f"""
     ╔═══════════════════════════════════════════════════════╗
     ║   🤖 AI Research Agent Flask Application              ║
@@ -0,0 +1,439 @@
+"""
+Query Scheduler
+Runs background LLM queries through a concurrency-limited worker pool with
+priority levels, per-user fair queuing (weighted round-robin + token buckets)
+and cancellation
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+# Lower value = dispatched first. Interactive queries jump ahead of batches.
+PRIORITIES = {
+    'interactive': 0,
+    'normal': 1,
+    'batch': 2,
+}
+
+# Priority of queries and jobs that do not name one
+DEFAULT_PRIORITY = 'interactive'
+
+DEFAULT_POLICY = {
+    'roles': {
+        'admin': {'weight': 4, 'rate': None, 'burst': None},
+        'user': {'weight': 1, 'rate': None, 'burst': None},
+    },
+    'users': {}
+}
+
+
+def load_policy() -> Dict:
+    """
+    Load the fairness policy from the SCHEDULER_POLICY env var
+
+    The value is either inline JSON or a path to a JSON file, shaped like:
+        {"roles": {"admin": {"weight": 4, "rate": 2.0, "burst": 20}, ...},
+         "users": {"42": {"weight": 2}}}
+
+    rate is tokens (queries) per second and burst the bucket capacity;
+    a null rate disables rate limiting for that role or user.
+    """
+    raw = os.getenv('SCHEDULER_POLICY', '').strip()
+    policy = {
+        'roles': {role: dict(cfg) for role, cfg in DEFAULT_POLICY['roles'].items()},
+        'users': {}
+    }
+    if not raw:
+        return policy
+
+    if not raw.startswith('{'):
+        with open(raw, 'r', encoding='utf-8') as f:
+            raw = f.read()
+
+    loaded = json.loads(raw)
+    for role, cfg in loaded.get('roles', {}).items():
+        policy['roles'].setdefault(role, {}).update(cfg)
+    policy['users'] = {str(uid): cfg for uid, cfg in loaded.get('users', {}).items()}
+    return policy
+
+
+class TokenBucket:
+    """Classic token bucket; rate=None means unlimited"""
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float]):
+        self.rate = rate
+        self.capacity = capacity if capacity else max(rate or 1.0, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self, now: float) -> bool:
+        """Take one token if available"""
+        if not self.rate:
+            return True
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def seconds_until_available(self, now: float) -> float:
+        """Time until one token will be available"""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class CancelToken:
+    """Cancellation flag shared between the scheduler and a running query"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to timeout seconds; returns True early if cancelled"""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback: Callable):
+        """Register a callback that aborts in-flight work (e.g. closing an HTTP client)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[SCHEDULER] Abort callback failed: {str(e)}")
+
+
+class QueryCancelled(Exception):
+    """Raised in the worker when its query was cancelled mid-flight"""
+    pass
+
+
+def run_cancellable(cancel_token: Optional[CancelToken], fn: Callable, *args, **kwargs):
+    """
+    Run a blocking call so that cancellation frees the calling worker at once
+
+    The call runs on a helper thread while the worker waits for either the
+    result or the cancel signal. On cancel the helper is abandoned (its abort
+    callbacks should make it finish quickly) and QueryCancelled is raised.
+    """
+    if cancel_token is None:
+        return fn(*args, **kwargs)
+
+    wake = threading.Event()
+    outcome = {}
+
+    def target():
+        try:
+            outcome['value'] = fn(*args, **kwargs)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            wake.set()
+
+    cancel_token.on_cancel(wake.set)
+    threading.Thread(target=target, name='query-call', daemon=True).start()
+    wake.wait()
+
+    if cancel_token.cancelled:
+        raise QueryCancelled()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['value']
+
+
+class _Job:
+    __slots__ = ('query_id', 'query_text', 'user_id', 'priority', 'enqueued_at', 'token')
+
+    def __init__(self, query_id, query_text, user_id, priority):
+        self.query_id = query_id
+        self.query_text = query_text
+        self.user_id = user_id
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+        self.token = CancelToken()
+
+
+class _UserState:
+    """Per-user queues (one per priority), fairness parameters and wait-time samples"""
+
+    def __init__(self, weight: int, bucket: TokenBucket):
+        self.queues = {level: deque() for level in PRIORITIES.values()}
+        self.weight = max(1, int(weight))
+        self.credit = self.weight
+        self.bucket = bucket
+        self.running = 0
+        self.dispatched = 0
+        self.waits = deque(maxlen=500)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class QueryScheduler:
+    """Bounded executor with priority levels and per-user weighted round-robin dispatch"""
+
+    def __init__(self, worker_fn: Callable, max_workers: Optional[int] = None,
+                 policy: Optional[Dict] = None):
+        """
+        Initialize the scheduler
+
+        Args:
+            worker_fn: Callable invoked as worker_fn(query_id, query_text, user_id, cancel_token)
+            max_workers: Maximum number of queries executing at once
+                         (defaults to MAX_CONCURRENT_QUERIES env var, then 4)
+            policy: Fairness policy (defaults to load_policy())
+        """
+        self.worker_fn = worker_fn
+        self.max_workers = max_workers or int(os.getenv('MAX_CONCURRENT_QUERIES', 4))
+        self.policy = policy or load_policy()
+        self._cond = threading.Condition()
+        self._users: Dict[int, _UserState] = {}
+        # Per priority level: user ids with queued work, in round-robin order
+        self._rings = {level: deque() for level in PRIORITIES.values()}
+        self._jobs: Dict[int, _Job] = {}  # queued or running, by query id
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    # ------------------------------------------------------------
+    # Policy
+    # ------------------------------------------------------------
+
+    def _user_config(self, user_id, role: str) -> Dict:
+        config = dict(self.policy['roles'].get(role) or self.policy['roles'].get('user', {}))
+        config.update(self.policy['users'].get(str(user_id), {}))
+        return config
+
+    def _get_user_state(self, user_id, role: str) -> _UserState:
+        state = self._users.get(user_id)
+        if state is None:
+            config = self._user_config(user_id, role)
+            state = _UserState(
+                weight=config.get('weight', 1),
+                bucket=TokenBucket(config.get('rate'), config.get('burst'))
+            )
+            self._users[user_id] = state
+        return state
+
+    # ------------------------------------------------------------
+    # Submission & dispatch
+    # ------------------------------------------------------------
+
+    def _start_workers(self):
+        """Start worker threads on first use"""
+        if self._threads:
+            return
+        self._stopping = False
+        for index in range(self.max_workers):
+            thread = threading.Thread(
+                target=self._worker_loop,
+                name=f'query-worker-{index}',
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, query_id: int, query_text: str = None, user_id: int = None,
+               role: str = 'user', priority: str = DEFAULT_PRIORITY):
+        """
+        Queue a query for background execution
+
+        Args:
+            query_id: ID of the Query row to execute
+            query_text: Original query text
+            user_id: Owner of the query (the fairness key)
+            role: 'admin' or 'user', used to pick weight and rate limits
+            priority: One of PRIORITIES; higher levels are always dispatched first
+        """
+        level = PRIORITIES.get(priority, PRIORITIES['normal'])
+        with self._cond:
+            self._start_workers()
+            state = self._get_user_state(user_id, role)
+            job = _Job(query_id, query_text, user_id, level)
+            state.queues[level].append(job)
+            self._jobs[query_id] = job
+            ring = self._rings[level]
+            if user_id not in ring:
+                ring.append(user_id)
+            self._cond.notify()
+
+    def cancel(self, query_id: int) -> Optional[str]:
+        """
+        Cancel a queued or running query
+
+        Queued jobs are removed before they reach a worker. Running jobs have
+        their CancelToken set, which fires any abort callbacks the worker
+        registered so the in-flight LLM request is torn down.
+
+        Returns:
+            'dequeued', 'signalled', or None if the scheduler does not know the query
+        """
+        with self._cond:
+            job = self._jobs.get(query_id)
+            if job is None:
+                return None
+
+            queue = self._users[job.user_id].queues[job.priority]
+            if job in queue:
+                queue.remove(job)
+                del self._jobs[query_id]
+                ring = self._rings[job.priority]
+                if not queue and job.user_id in ring:
+                    ring.remove(job.user_id)
+                return 'dequeued'
+
+        job.token.cancel()
+        return 'signalled'
+
+    def is_active(self, query_id: int) -> bool:
+        """Whether the query is queued or running in this scheduler"""
+        with self._cond:
+            return query_id in self._jobs
+
+    def active_ids(self) -> List[int]:
+        """Query ids queued or running in this scheduler"""
+        with self._cond:
+            return list(self._jobs)
+
+    def _next_job(self):
+        """
+        Pick the next job: highest priority level first, then weighted
+        round-robin over the users with queued work at that level.
+
+        Each user at the head of a ring may take up to `weight` jobs before
+        the ring rotates. Users whose token bucket is empty are skipped.
+
+        Returns:
+            Tuple of (job, seconds_to_wait); job is None if nothing is eligible
+        """
+        now = time.monotonic()
+        soonest = None
+
+        for level in sorted(self._rings):
+            ring = self._rings[level]
+            for _ in range(len(ring)):
+                user_id = ring[0]
+                state = self._users[user_id]
+
+                if not state.bucket.try_consume(now):
+                    wait = state.bucket.seconds_until_available(now)
+                    soonest = wait if soonest is None else min(soonest, wait)
+                    state.credit = state.weight
+                    ring.rotate(-1)
+                    continue
+
+                queue = state.queues[level]
+                job = queue.popleft()
+                state.credit -= 1
+                if not queue:
+                    ring.popleft()
+                    state.credit = state.weight
+                elif state.credit <= 0:
+                    state.credit = state.weight
+                    ring.rotate(-1)
+
+                state.waits.append(now - job.enqueued_at)
+                state.running += 1
+                state.dispatched += 1
+                return job, 0.0
+
+        return None, soonest
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = None
+                while job is None:
+                    if self._stopping:
+                        return
+                    job, wait = self._next_job()
+                    if job is None:
+                        self._cond.wait(timeout=wait)
+
+            try:
+                self.worker_fn(job.query_id, job.query_text, job.user_id, job.token)
+            except Exception as e:
+                print(f"[SCHEDULER ERROR] Query {job.query_id} raised: {str(e)}")
+            finally:
+                with self._cond:
+                    self._users[job.user_id].running -= 1
+                    self._jobs.pop(job.query_id, None)
+
+    # ------------------------------------------------------------
+    # Introspection
+    # ------------------------------------------------------------
+
+    def user_stats(self, user_id) -> Dict:
+        """Return queue depth and wait-time percentiles for one user"""
+        with self._cond:
+            state = self._users.get(user_id)
+            if state is None:
+                return {'user_id': user_id, 'queued': 0, 'running': 0, 'dispatched': 0,
+                        'wait_p50': 0.0, 'wait_p95': 0.0, 'wait_max': 0.0}
+            waits = list(state.waits)
+            queued = sum(len(queue) for queue in state.queues.values())
+            return {
+                'user_id': user_id,
+                'weight': state.weight,
+                'rate': state.bucket.rate,
+                'queued': queued,
+                'running': state.running,
+                'dispatched': state.dispatched,
+                'wait_p50': round(_percentile(waits, 50), 3),
+                'wait_p95': round(_percentile(waits, 95), 3),
+                'wait_max': round(max(waits), 3) if waits else 0.0
+            }
+
+    def stats(self) -> Dict:
+        """Return pool occupancy and per-user fairness statistics"""
+        with self._cond:
+            user_ids = list(self._users)
+            queued = sum(len(queue) for state in self._users.values()
+                         for queue in state.queues.values())
+            running = sum(state.running for state in self._users.values())
+        return {
+            'max_workers': self.max_workers,
+            'queued': queued,
+            'running': running,
+            'users': [self.user_stats(user_id) for user_id in user_ids]
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the workers; queued jobs that have not started are dropped"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        if wait:
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,324 @@
+"""
+Semantic Answer Cache
+Finds previously answered questions that are near-duplicates of a new one
+("differences between iOS and Android" vs "compare Android and iOS") using
+hashed n-gram vectors in a memory-mapped NumPy matrix
+"""
+
+import importlib.util
+import json
+import os
+import re
+import threading
+import zlib
+from typing import Iterable, Optional, Tuple
+
+# NumPy is imported on first use so processes that never touch the cache
+# start faster; without NumPy the cache is disabled
+np = None
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+
+def _numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: appends are only serialised within a process
+    fcntl = None
+
+
+# Words that carry no meaning for matching
+STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'with', 'is', 'are',
+    'was', 'were', 'be', 'what', 'whats', 'which', 'how', 'why', 'do', 'does', 'can',
+    'me', 'my', 'i', 'you', 'it', 'its', 'this', 'that', 'between', 'about', 'please',
+    'tell', 'give', 'some', 'there', 'their', 'they', 'them'
+}
+
+# Phrasings of the same intent collapse to one canonical term
+SYNONYMS = {
+    'vs': 'compare', 'versus': 'compare', 'comparison': 'compare', 'compared': 'compare',
+    'comparing': 'compare', 'difference': 'compare', 'differences': 'compare',
+    'different': 'compare', 'differ': 'compare', 'contrast': 'compare',
+    'explain': 'explain', 'explanation': 'explain', 'describe': 'explain',
+    'pros': 'advantage', 'advantages': 'advantage', 'benefits': 'advantage',
+    'cons': 'disadvantage', 'disadvantages': 'disadvantage', 'drawbacks': 'disadvantage'
+}
+
+WORD_WEIGHT = 1.0
+TRIGRAM_WEIGHT = 0.3
+
+
+def normalise_terms(text: str):
+    """Lowercase, map synonyms, drop stopwords and strip plural 's'"""
+    terms = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        word = SYNONYMS.get(word, word)
+        if word in STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+def _bucket(feature: str, dim: int) -> Tuple[int, float]:
+    # crc32 is stable across processes, unlike hash()
+    digest = zlib.crc32(feature.encode('utf-8'))
+    return digest % dim, (1.0 if digest & 0x80000000 else -1.0)
+
+
+def vectorize(text: str, dim: int):
+    """
+    Hashed bag of words plus character trigrams, L2-normalised
+
+    Word order is ignored so reordered paraphrases match; trigrams give
+    partial credit for morphological variants.
+    """
+    np = _numpy()
+    vector = np.zeros(dim, dtype=np.float32)
+    for term in set(normalise_terms(text)):
+        index, sign = _bucket('w:' + term, dim)
+        vector[index] += sign * WORD_WEIGHT
+        padded = f"^{term}$"
+        for i in range(len(padded) - 2):
+            index, sign = _bucket('c:' + padded[i:i + 3], dim)
+            vector[index] += sign * TRIGRAM_WEIGHT
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def numbers_match(text_a: str, text_b: str) -> bool:
+    """Versions, years and quantities must agree ("python 2" is not "python 3")"""
+    return set(re.findall(r"\d+", text_a)) == set(re.findall(r"\d+", text_b))
+
+
+class SemanticCache:
+    """
+    Append-only similarity index over completed queries
+
+    Files in `directory`:
+        vectors.f32  float32 matrix, one row per indexed query (memory-mapped)
+        keys.i64     int64 pairs (query_id, user_id) per row; query_id -1 = removed
+        meta.json    dimension, row count and capacity
+    """
+
+    def __init__(self, directory: str, dim: int = None, threshold: float = None,
+                 mode: str = None, scope: str = None):
+        """
+        Args:
+            directory: Where the index files live
+            dim: Vector size (SEMANTIC_CACHE_DIM, default 4096)
+            threshold: Minimum cosine similarity for a hit (SEMANTIC_CACHE_THRESHOLD, default 0.9)
+            mode: 'return' reuses the prior answer, 'offer' only suggests it,
+                  'off' disables the cache (SEMANTIC_CACHE_MODE, default 'return')
+            scope: 'user' only matches the asker's own queries; 'global' matches
+                   anyone's and shares answers across users, so it is opt-in
+                   (SEMANTIC_CACHE_SCOPE, default 'user')
+        """
+        self.directory = directory
+        self.dim = dim or int(os.getenv('SEMANTIC_CACHE_DIM', 4096))
+        self.threshold = threshold or float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.9))
+        self.mode = mode or os.getenv('SEMANTIC_CACHE_MODE', 'return')
+        self.scope = scope or os.getenv('SEMANTIC_CACHE_SCOPE', 'user')
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._keys = None
+        self._count = 0
+        self._capacity = 0
+        self._meta_mtime = None
+
+    @property
+    def enabled(self) -> bool:
+        return HAS_NUMPY and self.mode != 'off'
+
+    # ------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def exists(self) -> bool:
+        return os.path.exists(self._path('meta.json'))
+
+    def _write_meta(self):
+        tmp_path = self._path('meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'count': self._count, 'capacity': self._capacity}, f)
+        os.replace(tmp_path, self._path('meta.json'))
+        self._meta_mtime = os.path.getmtime(self._path('meta.json'))
+
+    def _map(self, capacity: int, create: bool = False):
+        """(Re)open the memory maps at the given capacity, growing files as needed"""
+        np = _numpy()
+        mode = 'w+' if create else 'r+'
+        self._vectors = np.memmap(self._path('vectors.f32'), dtype=np.float32, mode=mode,
+                                  shape=(capacity, self.dim))
+        self._keys = np.memmap(self._path('keys.i64'), dtype=np.int64, mode=mode,
+                               shape=(capacity, 2))
+        self._capacity = capacity
+
+    def _refresh(self):
+        """Pick up rows appended by other processes"""
+        meta_path = self._path('meta.json')
+        if not os.path.exists(meta_path):
+            return
+        mtime = os.path.getmtime(meta_path)
+        if mtime == self._meta_mtime and self._vectors is not None:
+            return
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta['dim'] != self.dim:
+            raise ValueError(f"Semantic cache at {self.directory} has dim {meta['dim']}, expected {self.dim}")
+        if self._vectors is None or meta['capacity'] != self._capacity:
+            self._map(meta['capacity'])
+        self._count = meta['count']
+        self._meta_mtime = mtime
+
+    def _grow(self):
+        new_capacity = max(1024, self._capacity * 2)
+        self._vectors.flush()
+        self._keys.flush()
+        self._vectors = self._keys = None
+        for name, row_bytes in (('vectors.f32', self.dim * 4), ('keys.i64', 16)):
+            with open(self._path(name), 'r+b') as f:
+                f.truncate(new_capacity * row_bytes)
+        self._map(new_capacity)
+
+    def _file_lock(self):
+        lock_file = open(self._path('append.lock'), 'a')
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    # ------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------
+
+    def rebuild(self, rows: Iterable[Tuple[int, int, str]]):
+        """
+        Replace the index with the given (query_id, user_id, query_text) rows
+        """
+        if not self.enabled:
+            return
+        rows = list(rows)
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._map(max(1024, len(rows)), create=True)
+            for row, (query_id, user_id, text) in enumerate(rows):
+                self._vectors[row] = vectorize(text, self.dim)
+                self._keys[row] = (query_id, user_id or 0)
+            self._count = len(rows)
+            self._vectors.flush()
+            self._keys.flush()
+            self._write_meta()
+
+    def add(self, query_id: int, user_id: int, query_text: str):
+        """Append one completed query to the index"""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        vector = vectorize(query_text, self.dim)
+        with self._lock:
+            lock_file = self._file_lock()
+            try:
+                if not self.exists():
+                    self._map(1024, create=True)
+                    self._count = 0
+                else:
+                    self._meta_mtime = None
+                    self._refresh()
+                if self._count >= self._capacity:
+                    self._grow()
+                self._vectors[self._count] = vector
+                self._keys[self._count] = (query_id, user_id or 0)
+                self._count += 1
+                self._vectors.flush()
+                self._keys.flush()
+                self._write_meta()
+            finally:
+                lock_file.close()
+
+    def remove(self, query_id: int):
+        """Tombstone a query so it is never returned again"""
+        if not self.enabled or not self.exists():
+            return
+        with self._lock:
+            self._refresh()
+            rows = _numpy().nonzero(self._keys[:self._count, 0] == query_id)[0]
+            if len(rows):
+                self._keys[rows, 0] = -1
+                self._keys.flush()
+
+    def remove_user(self, user_id: int):
+        """Tombstone every query of a deleted user (their ids may be reused later)"""
+        if not self.enabled or not self.exists():
+            return
+        with self._lock:
+            self._refresh()
+            rows = _numpy().nonzero(self._keys[:self._count, 1] == user_id)[0]
+            if len(rows):
+                self._keys[rows, 0] = -1
+                self._keys.flush()
+
+    # ------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------
+
+    def lookup(self, query_text: str, user_id: int = None, limit: int = 5):
+        """
+        Find indexed queries similar to query_text
+
+        Returns:
+            List of (query_id, similarity) at or above the threshold, best first
+        """
+        if not self.enabled or not self.exists():
+            return []
+        np = _numpy()
+        vector = vectorize(query_text, self.dim)
+        if not vector.any():
+            return []
+
+        with self._lock:
+            self._refresh()
+            count = self._count
+            if count == 0:
+                return []
+            scores = self._vectors[:count] @ vector
+            keys = np.array(self._keys[:count])
+
+        valid = keys[:, 0] >= 0
+        if self.scope == 'user' and user_id is not None:
+            valid &= keys[:, 1] == user_id
+        scores = np.where(valid, scores, -1.0)
+
+        top = np.argsort(-scores)[:limit]
+        return [(int(keys[row, 0]), float(scores[row])) for row in top if scores[row] >= self.threshold]
+
+    def best_match(self, query_text: str, user_id: int = None) -> Optional[Tuple[int, float]]:
+        matches = self.lookup(query_text, user_id, limit=1)
+        return matches[0] if matches else None
+
+    def stats(self):
+        if not self.enabled or not self.exists():
+            return {'enabled': self.enabled, 'mode': self.mode, 'rows': 0}
+        with self._lock:
+            self._refresh()
+            live = int((self._keys[:self._count, 0] >= 0).sum())
+        return {
+            'enabled': True,
+            'mode': self.mode,
+            'scope': self.scope,
+            'threshold': self.threshold,
+            'rows': self._count,
+            'live_rows': live,
+            'dim': self.dim
+        }
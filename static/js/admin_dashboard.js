@@ -0,0 +1,33 @@
+// Poll /admin/api/dashboard for sections that changed since the version this
+// page holds and patch them in place, instead of reloading the whole page
+const dashboard = document.getElementById('adminDashboard');
+let dashboardVersion = dashboard.dataset.version;
+
+function applyDashboardDelta(delta) {
+    Object.entries(delta.counters).forEach(([name, value]) => {
+        const counter = dashboard.querySelector(`[data-dashboard-counter="${name}"]`);
+        if (counter) {
+            counter.textContent = value;
+        }
+    });
+    Object.entries(delta.fragments).forEach(([name, html]) => {
+        const section = dashboard.querySelector(`[data-dashboard-section="${name}"]`);
+        if (section) {
+            section.innerHTML = html;
+        }
+    });
+    dashboardVersion = delta.version;
+}
+
+function refreshDashboard() {
+    if (document.hidden) {
+        return;
+    }
+    fetch(`/admin/api/dashboard?since=${encodeURIComponent(dashboardVersion)}`)
+        .then(response => response.json())
+        .then(applyDashboardDelta)
+        .catch(error => console.error('Error:', error));
+}
+
+setInterval(refreshDashboard, Number(dashboard.dataset.pollInterval));
+document.addEventListener('visibilitychange', refreshDashboard);
@@ -0,0 +1,85 @@
+// Document upload with per-file progress
+const uploadRows = {};
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text == null ? '' : String(text);
+    return div.innerHTML;
+}
+
+function renderUpload(upload) {
+    let row = uploadRows[upload.id];
+    if (!row) {
+        row = document.createElement('div');
+        row.className = 'upload-row';
+        document.getElementById('uploadProgress').appendChild(row);
+        uploadRows[upload.id] = row;
+    }
+    let label = upload.status;
+    if (upload.status === 'inserting') {
+        label = `inserting ${upload.chunks_inserted}/${upload.chunks_total}`;
+    } else if (upload.status === 'completed') {
+        label = `✓ ${upload.chunks_total} entries`;
+    } else if (upload.status === 'failed') {
+        label = `✗ ${upload.error || 'failed'}`;
+    }
+    row.classList.toggle('failed', upload.status === 'failed');
+    row.innerHTML = `
+        <span>${escapeHtml(upload.filename)}</span>
+        <div class="upload-bar"><div class="upload-bar-fill" style="width: ${upload.status === 'failed' ? 100 : upload.percent_complete}%"></div></div>
+        <span>${escapeHtml(label)}</span>`;
+}
+
+function pollUploads(ids) {
+    fetch(`/api/knowledge/uploads?ids=${ids.join(',')}`)
+        .then(response => response.json())
+        .then(data => {
+            data.uploads.forEach(renderUpload);
+            if (data.done) {
+                document.getElementById('uploadButton').disabled = false;
+            } else {
+                setTimeout(() => pollUploads(ids), 1000);
+            }
+        })
+        .catch(() => setTimeout(() => pollUploads(ids), 3000));
+}
+
+document.getElementById('uploadForm').addEventListener('submit', function(event) {
+    event.preventDefault();
+    const files = document.getElementById('uploadFiles').files;
+    if (!files.length) {
+        alert('Choose at least one file');
+        return;
+    }
+
+    const formData = new FormData();
+    for (const file of files) {
+        formData.append('files', file);
+    }
+    formData.append('category', document.getElementById('uploadCategory').value);
+
+    const button = document.getElementById('uploadButton');
+    button.disabled = true;
+
+    fetch('/api/knowledge/upload', { method: 'POST', body: formData })
+        .then(response => response.json())
+        .then(data => {
+            (data.rejected || []).forEach(item => alert(`${item.filename}: ${item.error}`));
+            const uploads = data.uploads || [];
+            uploads.forEach(renderUpload);
+            if (uploads.length) {
+                pollUploads(uploads.map(upload => upload.id));
+            } else {
+                button.disabled = false;
+            }
+            this.reset();
+        })
+        .catch(error => {
+            alert('Upload failed: ' + error);
+            button.disabled = false;
+        });
+});
+
+// Auto-refresh stats (optional)
+// Uncomment to refresh every 30 seconds
+// setInterval(() => location.reload(), 30000);
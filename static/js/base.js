@@ -0,0 +1,18 @@
+// Auto-refresh processing queries
+function checkQueryStatus(queryId) {
+    fetch(`/api/query-status/${queryId}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.status === 'processing') {
+                setTimeout(() => checkQueryStatus(queryId), 2000);
+            } else {
+                location.reload();
+            }
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+// Format date
+function formatDate(dateString) {
+    return new Date(dateString).toLocaleString();
+}
@@ -0,0 +1,81 @@
+// Full-text search over past queries (/api/queries/search), as you type
+const searchInput = document.getElementById('historySearch');
+const searchResults = document.getElementById('historySearchResults');
+let searchTimer = null;
+let searchSeq = 0;
+
+function renderSearchResults(data) {
+    searchResults.innerHTML = '';
+    if (!data.results.length) {
+        const empty = document.createElement('p');
+        empty.className = 'search-empty';
+        empty.textContent = 'No completed queries match your search.';
+        searchResults.appendChild(empty);
+        return;
+    }
+    data.results.forEach(result => {
+        const item = document.createElement('a');
+        item.className = 'search-result';
+        item.href = result.url;
+
+        // Snippets are HTML-escaped by the server apart from the <mark> highlights
+        const question = document.createElement('div');
+        question.className = 'question';
+        question.innerHTML = result.question_snippet;
+        item.appendChild(question);
+
+        if (result.answer_snippet) {
+            const answer = document.createElement('div');
+            answer.className = 'answer';
+            answer.innerHTML = result.answer_snippet;
+            item.appendChild(answer);
+        }
+
+        const meta = document.createElement('div');
+        meta.className = 'meta';
+        meta.textContent = [result.username, result.task_type, result.created_at && formatDate(result.created_at)]
+            .filter(Boolean).join(' · ');
+        item.appendChild(meta);
+
+        searchResults.appendChild(item);
+    });
+}
+
+function runSearch() {
+    const text = searchInput.value.trim();
+    const seq = ++searchSeq;
+    if (text.length < 2) {
+        searchResults.hidden = true;
+        return;
+    }
+    fetch(`/api/queries/search?q=${encodeURIComponent(text)}`)
+        .then(response => response.json())
+        .then(data => {
+            // Ignore answers to searches the user has already typed past
+            if (seq !== searchSeq) {
+                return;
+            }
+            renderSearchResults(data);
+            searchResults.hidden = false;
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+searchInput.addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(runSearch, 250);
+});
+
+// The filters only exist when there are queries to list
+const filterTaskType = document.getElementById('filterTaskType');
+const filterStatus = document.getElementById('filterStatus');
+if (filterTaskType && filterStatus) {
+    filterTaskType.addEventListener('change', filterQueries);
+    filterStatus.addEventListener('change', filterQueries);
+}
+
+function filterQueries() {
+    const taskType = document.getElementById('filterTaskType').value;
+    const status = document.getElementById('filterStatus').value;
+    console.log('Filter:', taskType, status);
+}
@@ -0,0 +1,51 @@
+document.getElementById('queryForm').addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const query = document.getElementById('query').value.trim();
+
+    if (!query) {
+        alert('Please enter a query');
+        return;
+    }
+
+    const submitBtn = document.getElementById('submitBtn');
+    const submitText = document.getElementById('submitText');
+    const submitSpinner = document.getElementById('submitSpinner');
+
+    submitBtn.disabled = true;
+    submitText.style.display = 'none';
+    submitSpinner.style.display = 'inline-block';
+
+    try {
+        const response = await fetch('/api/execute-query', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ query })
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            document.getElementById('query').value = '';
+
+            // Check status periodically
+            checkQueryStatus(data.query_id);
+
+            // Redirect to query detail after 1 second
+            setTimeout(() => {
+                window.location.href = `/query/${data.query_id}`;
+            }, 1000);
+        } else {
+            alert('Error: ' + data.error);
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        alert('An error occurred. Please try again.');
+    } finally {
+        submitBtn.disabled = false;
+        submitText.style.display = 'inline';
+        submitSpinner.style.display = 'none';
+    }
+});
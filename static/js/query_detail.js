@@ -0,0 +1,54 @@
+// Processing queries reload until they finish
+const autoRefresh = document.querySelector('[data-auto-refresh]');
+if (autoRefresh) {
+    setTimeout(() => location.reload(), Number(autoRefresh.dataset.autoRefresh));
+}
+
+function cancelQuery() {
+    if (!confirm('Cancel this query?')) {
+        return;
+    }
+    const cancelBtn = document.getElementById('cancelBtn');
+    cancelBtn.disabled = true;
+    fetch(cancelBtn.dataset.cancelUrl, { method: 'POST' })
+        .then(() => location.reload())
+        .catch(error => console.error('Error:', error));
+}
+
+function toggleReasoning() {
+    const reasoningBox = document.getElementById('reasoningBox');
+    const toggleText = document.getElementById('toggleText');
+
+    reasoningBox.classList.toggle('show');
+    toggleText.textContent = reasoningBox.classList.contains('show') ? 'Hide' : 'Show';
+}
+
+function toggleExportMenu() {
+    const exportMenu = document.getElementById('exportMenu');
+    exportMenu.classList.toggle('show');
+}
+
+document.addEventListener('click', function(event) {
+    const exportMenu = document.getElementById('exportMenu');
+    const exportDropdown = document.querySelector('.export-dropdown');
+
+    if (exportDropdown && !exportDropdown.contains(event.target)) {
+        exportMenu.classList.remove('show');
+    }
+});
+
+function copyToClipboard() {
+    const responseContent = document.querySelector('.response-content');
+    if (!responseContent) {
+        alert('No response to copy');
+        return;
+    }
+
+    const text = responseContent.innerText;
+    navigator.clipboard.writeText(text).then(() => {
+        alert('Response copied to clipboard! ✓');
+    }).catch(err => {
+        console.error('Failed to copy:', err);
+        alert('Failed to copy');
+    });
+}
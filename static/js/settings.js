@@ -0,0 +1,87 @@
+// Modal functions
+function openChangePasswordModal() {
+    document.getElementById('passwordModal').classList.add('active');
+    document.getElementById('changePasswordForm').reset();
+    document.getElementById('passwordMessage').innerHTML = '';
+}
+
+function closeChangePasswordModal() {
+    document.getElementById('passwordModal').classList.remove('active');
+    document.getElementById('changePasswordForm').reset();
+    document.getElementById('passwordMessage').innerHTML = '';
+}
+
+// Close modal when clicking outside
+document.getElementById('passwordModal').addEventListener('click', function(event) {
+    if (event.target === this) {
+        closeChangePasswordModal();
+    }
+});
+
+// Handle password change form submission
+document.getElementById('changePasswordForm').addEventListener('submit', async function(e) {
+    e.preventDefault();
+
+    const currentPassword = document.getElementById('currentPassword').value;
+    const newPassword = document.getElementById('newPassword').value;
+    const confirmPassword = document.getElementById('confirmPassword').value;
+    const messageDiv = document.getElementById('passwordMessage');
+
+    // Validation
+    if (newPassword !== confirmPassword) {
+        messageDiv.innerHTML = '<div class="alert alert-error">New passwords do not match!</div>';
+        return;
+    }
+
+    if (newPassword.length < 6) {
+        messageDiv.innerHTML = '<div class="alert alert-error">New password must be at least 6 characters long!</div>';
+        return;
+    }
+
+    try {
+        const response = await fetch('/api/change-password', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                currentPassword: currentPassword,
+                newPassword: newPassword
+            })
+        });
+
+        const data = await response.json();
+
+        if (response.ok) {
+            messageDiv.innerHTML = '<div class="alert alert-success">✓ Password changed successfully!</div>';
+            setTimeout(() => {
+                closeChangePasswordModal();
+                messageDiv.innerHTML = '';
+            }, 1500);
+        } else {
+            messageDiv.innerHTML = `<div class="alert alert-error">${data.error || 'Error changing password'}</div>`;
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        messageDiv.innerHTML = '<div class="alert alert-error">An error occurred. Please try again.</div>';
+    }
+});
+
+// Load statistics
+fetch('/api/statistics')
+    .then(response => response.json())
+    .then(data => {
+        document.getElementById('totalQueries').textContent = data.total_queries;
+        document.getElementById('completedQueries').textContent = data.completed_queries;
+        document.getElementById('failedQueries').textContent = data.failed_queries;
+
+        // Task breakdown
+        const taskBreakdown = document.getElementById('taskBreakdown');
+        for (const [task, count] of Object.entries(data.task_breakdown)) {
+            const badge = document.createElement('span');
+            badge.className = 'badge badge-primary';
+            badge.textContent = `${task}: ${count}`;
+            taskBreakdown.appendChild(badge);
+        }
+    })
+    .catch(error => console.error('Error loading statistics:', error));
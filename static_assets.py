@@ -0,0 +1,87 @@
+"""
+Static Assets
+Content-hashed URLs for files under static/ so browsers can cache them
+forever: a file's URL changes whenever its contents change, e.g.
+css/base.css -> /assets/css/base.3f2a9c1b7d4e.css
+"""
+
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+# One year; the URL changes with the content, so it never goes stale
+IMMUTABLE_MAX_AGE = 31536000
+
+# Hex characters of the SHA-256 digest kept in the file name
+DIGEST_LENGTH = 12
+
+_HASHED_NAME = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.[A-Za-z0-9]+)$' % DIGEST_LENGTH)
+
+
+class AssetManifest:
+    """Maps static files to content-hashed names and back"""
+
+    def __init__(self, static_folder: str, url_prefix: str = '/assets'):
+        """
+        Args:
+            static_folder: Directory the assets are read from
+            url_prefix: URL path the hashed assets are served under
+        """
+        self.static_folder = static_folder
+        self.url_prefix = url_prefix.rstrip('/')
+        # path -> (mtime_ns, size, digest); re-hashed only when the file changes
+        self._digests: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def _full_path(self, path: str) -> str:
+        full_path = os.path.realpath(os.path.join(self.static_folder, path))
+        root = os.path.realpath(self.static_folder)
+        if not full_path.startswith(root + os.sep):
+            raise FileNotFoundError(path)
+        return full_path
+
+    def digest(self, path: str) -> str:
+        """Short content hash of a static file"""
+        full_path = self._full_path(path)
+        stat = os.stat(full_path)
+        with self._lock:
+            cached = self._digests.get(path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                return cached[2]
+        with open(full_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:DIGEST_LENGTH]
+        with self._lock:
+            self._digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def hashed_name(self, path: str) -> str:
+        """css/base.css -> css/base.<digest>.css"""
+        stem, ext = os.path.splitext(path)
+        return f"{stem}.{self.digest(path)}{ext}"
+
+    def url(self, path: str) -> str:
+        """Public URL of a static file, for use in templates"""
+        return f"{self.url_prefix}/{self.hashed_name(path)}"
+
+    def resolve(self, hashed_path: str) -> Tuple[Optional[str], bool]:
+        """
+        Map a hashed name back to its source file
+
+        Args:
+            hashed_path: Path requested under url_prefix
+
+        Returns:
+            (source path, True if the digest is current) or (None, False)
+            if the name is not hashed or the file does not exist
+        """
+        directory, name = os.path.split(hashed_path)
+        match = _HASHED_NAME.match(name)
+        if not match:
+            return None, False
+        path = os.path.join(directory, match.group('stem') + match.group('ext'))
+        try:
+            return path, self.digest(path) == match.group('digest')
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return None, False
@@ -0,0 +1,55 @@
+"""
+Checks for company_search.make_snippet, including matches longer than the
+snippet window. Run with: python test_company_search.py
+"""
+import sys
+
+from company_search import SNIPPET_CHARS, make_snippet
+
+
+def check(name, condition, detail=''):
+    print(f"{'✅' if condition else '❌'} {name}{f' ({detail})' if detail else ''}")
+    return condition
+
+
+def run_checks():
+    results = []
+
+    text = 'The quick brown fox jumps over the lazy dog'
+    snippet = make_snippet(text, [(16, 19)])
+    results.append(check('Match is highlighted', '<mark>fox</mark>' in snippet, snippet))
+
+    snippet = make_snippet('<b>&</b> fox', [(9, 12)])
+    results.append(check('Text is escaped', snippet.startswith('&lt;b&gt;&amp;') and '<mark>fox</mark>' in snippet,
+                         snippet))
+
+    long_token = 'x' * 200
+    try:
+        snippet = make_snippet(long_token + ' hello', [(0, 200)])
+        error = None
+    except Exception as e:
+        snippet, error = '', e
+    results.append(check('Match longer than the window does not raise', error is None,
+                         type(error).__name__ if error else ''))
+    results.append(check('Long match is clipped to the window',
+                         snippet == f"<mark>{'x' * SNIPPET_CHARS}</mark>…", snippet[:40]))
+
+    try:
+        snippet = make_snippet('intro ' + long_token + ' and ' + long_token, [(6, 206), (211, 411)])
+        error = None
+    except Exception as e:
+        snippet, error = '', e
+    results.append(check('Several long matches do not raise', error is None and '<mark>' in snippet,
+                         type(error).__name__ if error else ''))
+
+    far = 'a ' * 300 + 'needle'
+    snippet = make_snippet(far, [(600, 606)])
+    results.append(check('Window moves to a distant match',
+                         snippet.startswith('…') and '<mark>needle</mark>' in snippet
+                         and len(snippet) <= SNIPPET_CHARS + 20))
+
+    return all(results)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_checks() else 1)
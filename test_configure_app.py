@@ -0,0 +1,52 @@
+"""
+Checks for configure_app(): config overrides are applied, and database engine
+overrides are rejected instead of re-registering Flask-SQLAlchemy.
+Run with: python test_configure_app.py
+"""
+import os
+import sys
+import tempfile
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='configure_app_'), 'app.db')
+os.environ.setdefault('SEMANTIC_CACHE_MODE', 'off')
+
+import app as web  # noqa: E402
+
+
+def check(name, condition, detail=''):
+    print(f"{'✅' if condition else '❌'} {name}{f' ({detail})' if detail else ''}")
+    return condition
+
+
+def run_checks():
+    results = []
+
+    application = web.configure_app({'MAX_BATCH_SIZE': 7})
+    results.append(check('Plain overrides are applied',
+                         application is web.app and application.config['MAX_BATCH_SIZE'] == 7))
+
+    current = web.app.config['SQLALCHEMY_DATABASE_URI']
+    application = web.configure_app({'SQLALCHEMY_DATABASE_URI': current})
+    results.append(check('Unchanged database URI is accepted', application is web.app))
+
+    try:
+        web.configure_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///elsewhere.db', 'MAX_BATCH_SIZE': 9})
+        error = None
+    except Exception as e:
+        error = e
+    results.append(check('Different database URI is rejected with ValueError',
+                         isinstance(error, ValueError), type(error).__name__ if error else 'no error'))
+    results.append(check('Rejected config is not partially applied',
+                         web.app.config['MAX_BATCH_SIZE'] == 7
+                         and web.app.config['SQLALCHEMY_DATABASE_URI'] == current))
+
+    web.init_db()
+    with web.app.app_context():
+        results.append(check('Engine still works afterwards',
+                             web.User.query.filter_by(username='admin').first() is not None))
+
+    return all(results)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_checks() else 1)
@@ -0,0 +1,73 @@
+"""
+Cold-start regression check: measures `import app` with -X importtime and
+fails if a lazily loaded dependency is imported eagerly again or the
+import exceeds its time budget. Run with: python test_import_time.py
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Must not be imported by `import app`; they load on first use
+LAZY_MODULES = ['reportlab', 'markdown', 'openai', 'numpy', 'docx', 'table_generator']
+
+# Median cold import budget in milliseconds (IMPORT_TIME_BUDGET_MS)
+BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', 1000))
+
+RUNS = int(os.getenv('IMPORT_TIME_RUNS', 5))
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def measure_import(module='app'):
+    """
+    Import `module` in a fresh interpreter
+
+    Returns:
+        Dict of top-level module -> (self_us, cumulative_us)
+    """
+    env = dict(os.environ, SEMANTIC_CACHE_MODE='off')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            timings[name] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def check(name, condition, detail=''):
+    print(f"{'✅' if condition else '❌'} {name}{f' ({detail})' if detail else ''}")
+    return condition
+
+
+def run_checks():
+    samples = [measure_import() for _ in range(RUNS)]
+    totals_ms = [timings['app'][1] / 1000 for timings in samples]
+    median_ms = statistics.median(totals_ms)
+
+    print(f"import app: median {median_ms:.0f} ms over {RUNS} runs "
+          f"(min {min(totals_ms):.0f}, max {max(totals_ms):.0f})")
+    print("Slowest modules (self time, last run):")
+    for name, (self_us, _) in sorted(samples[-1].items(), key=lambda item: -item[1][0])[:8]:
+        print(f"  {self_us / 1000:7.1f} ms  {name}")
+
+    imported = set(samples[-1])
+    results = []
+    for module in LAZY_MODULES:
+        eager = sorted(name for name in imported if name == module or name.startswith(module + '.'))
+        results.append(check(f"{module} is not imported at startup", not eager,
+                             f"{len(eager)} modules" if eager else ''))
+    results.append(check(f"import app within {BUDGET_MS:.0f} ms", median_ms <= BUDGET_MS,
+                         f"{median_ms:.0f} ms"))
+    return all(results)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_checks() else 1)
@@ -0,0 +1,149 @@
+"""
+Fault-injection checks for the LLM resilience layer against the local
+mock provider (mock_llm.py). Run with: python test_llm_resilience.py
+"""
+import sys
+import threading
+import time
+
+from openai import OpenAI
+
+from llm_resilience import CircuitBreaker, CircuitOpenError, ResilientCaller
+from mock_llm import FaultConfig, MockLLMServer
+from scheduler import CancelToken
+
+
+def make_caller(**overrides):
+    settings = dict(attempt_timeout=1.0, overall_deadline=5.0, max_attempts=4,
+                    base_delay=0.05, max_delay=0.2,
+                    breaker=CircuitBreaker(failure_threshold=3, recovery_timeout=0.5))
+    settings.update(overrides)
+    return ResilientCaller(**settings)
+
+
+def ask(caller, client):
+    return caller.call(
+        client.chat.completions.create,
+        model="mock",
+        messages=[{"role": "user", "content": "Hello!"}],
+        max_tokens=50
+    )
+
+
+def check(name, condition, detail=''):
+    print(f"{'✅' if condition else '❌'} {name}{f' ({detail})' if detail else ''}")
+    return condition
+
+
+def run_checks():
+    faults = FaultConfig(latency=0.01)
+    results = []
+
+    with MockLLMServer(faults=faults) as server:
+        client = OpenAI(base_url=server.base_url, api_key='mock', max_retries=0)
+
+        # 1. Transient 5xx errors are retried until the call succeeds
+        caller = make_caller()
+        faults.update(requests=0, fail_next=2, error_status=503)
+        response = ask(caller, client)
+        results.append(check('Transient 503s are retried',
+                             response.choices[0].message.content and faults.requests == 3,
+                             f'{faults.requests} attempts'))
+
+        # 2. Non-retryable client errors fail immediately
+        caller = make_caller()
+        faults.update(requests=0, fail_next=1, error_status=400)
+        try:
+            ask(caller, client)
+            failed = False
+        except Exception:
+            failed = True
+        results.append(check('400 is not retried', failed and faults.requests == 1,
+                             f'{faults.requests} attempts'))
+
+        # 3. A hanging provider is bounded by the per-attempt and overall deadlines
+        caller = make_caller(attempt_timeout=0.3, overall_deadline=1.0)
+        faults.update(requests=0, hang_rate=1.0, hang_seconds=5.0)
+        started = time.monotonic()
+        try:
+            ask(caller, client)
+            failed = False
+        except Exception:
+            failed = True
+        elapsed = time.monotonic() - started
+        faults.update(hang_rate=0.0)
+        results.append(check('Hanging provider hits the deadline', failed and elapsed < 1.5,
+                             f'{elapsed:.2f}s'))
+
+        # 4. Persistent failures open the breaker, which then fails fast
+        breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=0.5)
+        caller = make_caller(max_attempts=1, breaker=breaker)
+        faults.update(requests=0, error_rate=1.0, error_status=502)
+        for _ in range(3):
+            try:
+                ask(caller, client)
+            except Exception:
+                pass
+        requests_before = faults.requests
+        try:
+            ask(caller, client)
+            fast_failed = False
+        except CircuitOpenError:
+            fast_failed = True
+        results.append(check('Breaker opens and fails fast',
+                             fast_failed and faults.requests == requests_before
+                             and breaker.snapshot()['state'] == 'open'))
+
+        # 5. After the recovery timeout a successful trial closes the breaker
+        faults.update(error_rate=0.0)
+        time.sleep(0.6)
+        ask(caller, client)
+        results.append(check('Breaker recovers through half-open',
+                             breaker.snapshot()['state'] == 'closed'))
+
+        # 6. User cancels abort the in-flight call without counting against the breaker
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.5)
+        caller = make_caller(attempt_timeout=3.0, breaker=breaker)
+        faults.update(requests=0, hang_rate=1.0, hang_seconds=5.0)
+        for _ in range(3):
+            cancel_client = OpenAI(base_url=server.base_url, api_key='mock', max_retries=0)
+            token = CancelToken()
+            token.on_cancel(cancel_client.close)
+            threading.Timer(0.2, token.cancel).start()
+            try:
+                caller.call(cancel_client.chat.completions.create, cancel_token=token, model="mock",
+                            messages=[{"role": "user", "content": "Hello!"}], max_tokens=50)
+            except Exception:
+                pass
+        faults.update(hang_rate=0.0)
+        snapshot = breaker.snapshot()
+        results.append(check('Cancelled calls are not provider failures',
+                             snapshot['state'] == 'closed' and snapshot['total_failures'] == 0
+                             and faults.requests == 3,
+                             f"{snapshot['total_failures']} failures, {faults.requests} attempts"))
+
+        # 7. A client error during the half-open trial leaves the breaker half-open
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.3)
+        caller = make_caller(max_attempts=1, breaker=breaker)
+        faults.update(requests=0, fail_next=1, error_status=502)
+        try:
+            ask(caller, client)
+        except Exception:
+            pass
+        time.sleep(0.4)
+        faults.update(fail_next=1, error_status=400)
+        try:
+            ask(caller, client)
+        except Exception:
+            pass
+        state_after_400 = breaker.snapshot()['state']
+        ask(caller, client)
+        results.append(check('400 neither closes nor reopens a half-open breaker',
+                             state_after_400 == 'half_open' and breaker.snapshot()['state'] == 'closed',
+                             state_after_400))
+
+    return all(results)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_checks() else 1)
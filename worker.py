@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Query Worker
+Executes queued queries from the shared database queue (QueryJob) so the
+web tier and LLM execution scale separately. Run the web tier with
+QUERY_EXECUTION=worker so it only enqueues.
+
+Usage:
+    python worker.py [--processes 2] [--concurrency 4] [--poll-interval 1.0]
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+
+# Seconds a stopping worker waits for running queries before exiting;
+# anything still running is reclaimed by another worker after its lease expires
+SHUTDOWN_GRACE = int(os.getenv('WORKER_SHUTDOWN_GRACE', 30))
+
+# Queued jobs a worker process holds beyond its free slots, so the fair
+# scheduler has several users' work to choose from
+PREFETCH_FACTOR = 2
+
+
+def run_worker(concurrency: int, poll_interval: float):
+    """Main loop of one worker process"""
+    stopping = {'flag': False}
+
+    def request_stop(signum, frame):
+        stopping['flag'] = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    import app as web
+    from job_queue import WORKER_ID
+
+    web.configure_app()
+
+    # This process executes queries regardless of how the web tier is configured
+    web.app.config['QUERY_EXECUTION'] = 'inline'
+    web.query_scheduler.max_workers = concurrency
+
+    try:
+        web.recover_jobs()
+    except Exception as e:
+        # Another worker starting at the same time may have adopted the same jobs
+        print(f"[WORKER] {WORKER_ID} skipped recovery: {str(e)}")
+    print(f"[WORKER] {WORKER_ID} started with {concurrency} slots")
+
+    while not stopping['flag']:
+        try:
+            web.cancel_abandoned_jobs()
+            held = web.query_scheduler.active_ids()
+            room = concurrency * PREFETCH_FACTOR - len(held)
+            if room > 0:
+                with web.app.app_context():
+                    jobs = web.QueryJob.next_queued(room, exclude_ids=held)
+                    for job in jobs:
+                        web.dispatch_job(job)
+        except Exception as e:
+            print(f"[WORKER ERROR] {WORKER_ID}: {str(e)}")
+        time.sleep(poll_interval)
+
+    print(f"[WORKER] {WORKER_ID} stopping, waiting up to {SHUTDOWN_GRACE}s for running queries")
+    deadline = time.monotonic() + SHUTDOWN_GRACE
+    while web.query_scheduler.stats()['running'] and time.monotonic() < deadline:
+        time.sleep(0.5)
+    web.query_scheduler.shutdown(wait=False)
+    web.job_lease_keeper.stop()
+    print(f"[WORKER] {WORKER_ID} stopped")
+
+
+def supervise(processes: int, concurrency: int, poll_interval: float):
+    """Start worker processes and restart any that die until told to stop"""
+    context = multiprocessing.get_context('spawn')
+    stopping = {'flag': False}
+
+    def request_stop(signum, frame):
+        stopping['flag'] = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    def start(index):
+        process = context.Process(target=run_worker, args=(concurrency, poll_interval),
+                                  name=f'query-worker-{index}')
+        process.start()
+        return process
+
+    children = [start(index) for index in range(processes)]
+    print(f"[WORKER] Supervising {processes} processes x {concurrency} slots")
+
+    while not stopping['flag']:
+        for index, process in enumerate(children):
+            if not process.is_alive() and not stopping['flag']:
+                print(f"[WORKER] {process.name} exited with {process.exitcode}; restarting")
+                children[index] = start(index)
+        time.sleep(1)
+
+    for process in children:
+        if process.is_alive():
+            process.terminate()
+    for process in children:
+        process.join(SHUTDOWN_GRACE + 5)
+        if process.is_alive():
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Execute queued research queries')
+    parser.add_argument('--processes', type=int, default=int(os.getenv('WORKER_PROCESSES', 2)),
+                        help='Worker processes (WORKER_PROCESSES, default 2)')
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('MAX_CONCURRENT_QUERIES', 4)),
+                        help='Queries each process runs at once (MAX_CONCURRENT_QUERIES, default 4)')
+    parser.add_argument('--poll-interval', type=float, default=float(os.getenv('WORKER_POLL_INTERVAL', 1.0)),
+                        help='Seconds between queue polls (WORKER_POLL_INTERVAL, default 1)')
+    args = parser.parse_args()
+
+    # Create or upgrade the schema once, before any worker touches it
+    from app import init_db
+    init_db()
+
+    if args.processes <= 1:
+        run_worker(args.concurrency, args.poll_interval)
+    else:
+        supervise(args.processes, args.concurrency, args.poll_interval)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,22 @@
+"""
+WSGI entry point for the web tier
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+Queries run inside the web processes unless QUERY_EXECUTION=worker, in
+which case they only enqueue and worker.py executes them.
+"""
+
+from app import configure_app, executes_locally, recover_jobs, resume_document_uploads
+
+application = configure_app()
+
+# Each web process resumes its own share of interrupted work when it
+# executes queries itself (the schema is created by gunicorn.conf.py)
+try:
+    if executes_locally():
+        recover_jobs()
+    resume_document_uploads()
+except Exception as e:
+    # A sibling process starting at the same time may have resumed it already
+    print(f"[WSGI] Skipped recovery: {str(e)}")